@@ -25,6 +25,7 @@ import {
 import {
   useDocumentStore,
   selectIsInitialized,
+  isInProgress,
   type UploadedDoc,
   type PipelineStage,
   type BackendPipelineResult,
@@ -123,7 +124,15 @@ function CalculationsCard({ calculations }: { calculations: Record<string, unkno
 
 // ─── Insights card ────────────────────────────────────────────────────────────
 
-function InsightsCard({ ollama }: { ollama: Record<string, unknown> | null }) {
+function InsightsCard({ ollama, status }: { ollama: Record<string, unknown> | null; status: UploadedDoc["insightsStatus"] }) {
+  if (status === "queued" || status === "running") {
+    return (
+      <div className="mt-2 flex items-center gap-2 text-[11px] text-white/30 rounded-lg border border-dashed border-white/8 px-3 py-2">
+        <Brain size={11} className="text-indigo-400/40 shrink-0 animate-pulse" />
+        Generating AI insights…
+      </div>
+    );
+  }
   if (!ollama) return null;
   if (ollama.status === "pending") {
     return (
@@ -210,7 +219,7 @@ function DocRow({ doc, onDelete }: { doc: UploadedDoc; onDelete: (id: string) =>
       {doc.pipelineStage === "complete" && (
         <div className="mt-1 pl-12">
           <CalculationsCard calculations={doc.calculations} />
-          <InsightsCard ollama={doc.ollama} />
+          <InsightsCard ollama={doc.ollama} status={doc.insightsStatus} />
         </div>
       )}
     </div>
@@ -242,9 +251,7 @@ export default function DocumentsPage() {
   const pollingRef = useRef<ReturnType<typeof setInterval> | null>(null);
 
   const pollInProgress = useCallback(async () => {
-    const inProgress = docs.filter(
-      (d) => !["complete", "failed"].includes(d.pipelineStage)
-    );
+    const inProgress = docs.filter(isInProgress);
     if (!inProgress.length) return;
     for (const doc of inProgress) {
       try {
@@ -257,7 +264,7 @@ export default function DocumentsPage() {
   }, [docs, applyPipelineResult]);
 
   useEffect(() => {
-    const hasInProgress = docs.some((d) => !["complete", "failed"].includes(d.pipelineStage));
+    const hasInProgress = docs.some(isInProgress);
     if (hasInProgress && !pollingRef.current) {
       pollingRef.current = setInterval(pollInProgress, 2000);
     }
@@ -309,6 +316,7 @@ export default function DocumentsPage() {
           calculations:  null,
           analysis:      null,
           ollama:        null,
+          insightsStatus: null,
           error:         null,
         });
       } catch (err) {
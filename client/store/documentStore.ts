@@ -25,6 +25,9 @@ export type PipelineStage =
   | "complete"
   | "failed";
 
+/** Status of the Ollama insights follow-up that runs after "complete" */
+export type InsightsStatus = "queued" | "running" | "complete" | "pending" | "failed";
+
 /** Convenience status used in UI — derived from pipelineStage */
 export type DocStatus = "queued" | "processing" | "verified" | "failed";
 
@@ -41,6 +44,7 @@ export interface UploadedDoc {
   calculations:  Record<string, unknown> | null;
   analysis:      Record<string, unknown> | null;
   ollama:        Record<string, unknown> | null;
+  insightsStatus: InsightsStatus | null;
   error:         string | null;
 }
 
@@ -74,11 +78,18 @@ export interface BackendPipelineResult {
   calculations:   Record<string, unknown> | null;
   analysis:       Record<string, unknown> | null;
   ollama:         Record<string, unknown> | null;
+  insights_status?: InsightsStatus | null;
   error:          string | null;
   started_at:     string;
   completed_at:   string | null;
 }
 
+/** True while the backend still has work to report — the pipeline or its insights follow-up. */
+export function isInProgress(doc: Pick<UploadedDoc, "pipelineStage" | "insightsStatus">): boolean {
+  if (!["complete", "failed"].includes(doc.pipelineStage)) return true;
+  return doc.insightsStatus === "queued" || doc.insightsStatus === "running";
+}
+
 function stageToStatus(stage: PipelineStage): DocStatus {
   if (stage === "complete") return "verified";
   if (stage === "failed")   return "failed";
@@ -135,6 +146,7 @@ export const useDocumentStore = create<DocumentState>()(
               calculations:  result.calculations  ?? d.calculations,
               analysis:      result.analysis      ?? d.analysis,
               ollama:        result.ollama         ?? d.ollama,
+              insightsStatus: result.insights_status ?? null,
               error:         result.error          ?? null,
             };
           }),
@@ -168,6 +180,7 @@ export const useDocumentStore = create<DocumentState>()(
                 calculations:  result.calculations  ?? null,
                 analysis:      result.analysis      ?? null,
                 ollama:        result.ollama         ?? null,
+                insightsStatus: result.insights_status ?? null,
                 error:         result.error          ?? null,
               };
               if (idx >= 0) {
@@ -15,6 +15,8 @@ PUT    /admin/policies/{id}         → update a DRAFT (not active/archived)
 POST   /admin/policies/{id}/activate → activate policy (auto-archives previous active)
 POST   /admin/policies/{id}/archive  → manually archive a policy
 DELETE /admin/policies/{id}         → delete a DRAFT only
+GET    /admin/extraction-cache      → extraction cache hit / miss counters
+GET    /admin/pipeline-scheduler    → pipeline queue depth, workers and counters
 """
 
 from typing import List
@@ -203,6 +205,38 @@ def delete_policy(policy_id: int, db: Session = Depends(get_db)):
     db.commit()
 
 
+@router.get(
+    "/extraction-cache",
+    summary="Extraction cache hit / miss counters",
+    dependencies=[Depends(verify_admin)],
+)
+def extraction_cache_stats():
+    from app.services.extraction_cache import extraction_cache
+    return extraction_cache.stats()
+
+
+@router.get(
+    "/pipeline-scheduler",
+    summary="Pipeline queue depth, workers and counters",
+    dependencies=[Depends(verify_admin)],
+)
+def pipeline_scheduler_stats():
+    from app.services.scheduler import pipeline_scheduler
+    return pipeline_scheduler.stats()
+
+
+@router.get(
+    "/pipeline-recovery",
+    summary="Lease renewals, resumed tasks and swept uploads",
+    dependencies=[Depends(verify_admin)],
+)
+def pipeline_recovery_stats():
+    from app.services.recovery import pipeline_recovery
+    if pipeline_recovery is None:
+        return {"enabled": False}
+    return {"enabled": True, **pipeline_recovery.stats()}
+
+
 # ─── Public (no admin key) — active policy context for engines ─────────────────
 
 @router.get(
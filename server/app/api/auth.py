@@ -1,11 +1,11 @@
 from datetime import timedelta
-from typing import Any
+from typing import Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from jose import jwt, JWTError
 
-from app.db.session import get_db
+from app.db.session import SessionLocal, get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, User as UserSchema, Token, UserLogin
 from app.core import security
@@ -16,25 +16,42 @@ router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+def _user_from_token(token: Optional[str], db: Session) -> Optional[User]:
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        user_id: str = payload.get("sub")
+    except JWTError:
+        return None
+    if user_id is None:
+        return None
+    return db.query(User).filter(User.id == user_id).first()
+
 def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-        
-    user = db.query(User).filter(User.id == user_id).first()
+    user = _user_from_token(token, db)
     if user is None:
         raise credentials_exception
     return user
 
+def stream_user_id(token: Optional[str]) -> Optional[int]:
+    """
+    Authenticate a long-lived stream (SSE / WebSocket) once, on a session that
+    is closed straight away so the open stream does not pin a DB connection.
+    Returns the user's id, or None for a missing / invalid token.
+    """
+    db = SessionLocal()
+    try:
+        user = _user_from_token(token, db)
+        return user.id if user is not None else None
+    finally:
+        db.close()
+
 @router.post("/register", response_model=Token)
 def register(user_in: UserCreate, db: Session = Depends(get_db)) -> Any:
     """
@@ -7,101 +7,132 @@ Pipeline stages
 ---------------
 queued → ocr → validating → calculating → analyzing → complete | failed
 
-After every successful upload the full 5-step pipeline is triggered automatically
-in a FastAPI BackgroundTask.  The frontend polls GET /pipeline/{task_id} until
-pipeline_stage == "complete" or "failed".
+After every successful upload the full 5-step pipeline is queued on the
+bounded pipeline scheduler (see services/scheduler.py), or on Celery when
+PIPELINE_EXECUTOR="celery" (services/task_queue.py); a full queue answers
+503 with Retry-After.  The frontend polls GET /pipeline/{task_id} — which
+reports queue_position while the task waits — until pipeline_stage ==
+"complete" or "failed".
+
+Instead of polling, clients can subscribe to GET /pipeline/{task_id}/events
+(Server-Sent Events) or WS /pipeline/{task_id}/ws: small stage events as the
+task moves on, the full record once, then the insights when they land (see
+services/pipeline_events.py).
+Both authenticate once at connect, with the bearer token in the
+Authorization header or — since EventSource and browser WebSockets cannot
+set headers — in ?token=.  A query-string token is part of the URL, so it
+ends up in server and proxy access logs (and browser history): clients that
+can set the header should, and ?token= should carry a short-lived token.
 """
 
-from fastapi import APIRouter, Depends, UploadFile, File, BackgroundTasks, HTTPException
-from sqlalchemy.orm import Session
-from app.api.auth import get_current_user
-from app.db.session import SessionLocal
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection
+from app.api.auth import get_current_user, stream_user_id
 from app.models.user import User
+from app.services.ocr_service import delete_upload
 from app.services.pipeline import (
-    run_pipeline,
     initial_record,
-    USER_PIPELINE_RESULTS,
+    discard_record,
+    STAGE_QUEUED,
 )
+from app.services.pipeline_events import pipeline_events, TaskNotFoundError
+from app.services.result_store import result_store
+from app.services.scheduler import pipeline_scheduler, QueueFullError
+from app.services.upload_receiver import receive_upload, UploadFormatError, UploadTooLargeError
 from app.core.config import settings
-import os
 import uuid
-import shutil
-from typing import Any, Dict
 
 router = APIRouter()
 
-# Back-compat alias — used by insights.py which imported USER_DOC_RESULTS
-USER_DOC_RESULTS: Dict[int, Dict[str, Any]] = USER_PIPELINE_RESULTS   # type: ignore[assignment]
-
 _ALLOWED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", ".csv", ".xlsx"}
 
+# The body is streamed by upload_receiver rather than declared as an UploadFile
+# parameter, so the multipart schema is spelled out for the OpenAPI docs.
+_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                },
+            },
+        },
+    },
+}
 
-def _run_pipeline_bg(
-    file_path: str,
-    filename: str,
-    user_id: int,
-    task_id: str,
-) -> None:
-    """
-    Background runner — creates its own DB session so it is not tied to the
-    request lifecycle.  The session is closed when the pipeline finishes.
-    """
-    db: Session = SessionLocal()
-    try:
-        run_pipeline(file_path, filename, user_id, task_id, db)
-    finally:
-        db.close()
+
+def _queue_full(retry_after: int) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="The document pipeline is busy. Please retry shortly.",
+        headers={"Retry-After": str(retry_after)},
+    )
 
 
 # ---------------------------------------------------------------------------
 # POST /upload
 # ---------------------------------------------------------------------------
-@router.post("/upload")
+@router.post("/upload", openapi_extra=_UPLOAD_OPENAPI)
 async def upload_document(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...),
+    request: Request,
     current_user: User = Depends(get_current_user),
 ):
     """
     Secure document upload endpoint.
 
     Accepts: PDF, PNG, JPG, CSV, XLSX.
-    The file is saved to a temporary path, then the full 5-step pipeline
-    (OCR → validate → calculate → analyse → complete) runs in the background.
+    The multipart body is streamed without blocking the event loop: the size
+    limit (UPLOAD_MAX_BYTES → 413) is enforced and the content hash computed
+    while reading.  Small files are kept in memory (larger ones spill to a
+    temporary path), then the full 5-step pipeline
+    (OCR → validate → calculate → analyse → complete) is queued on the
+    pipeline scheduler.  A full queue answers 503 with Retry-After — checked
+    before the body is read, so a rejected client does not upload twice.
 
     Returns a task_id — poll GET /pipeline/{task_id} for live stage updates.
     """
-    ext = os.path.splitext(file.filename or "")[1].lower()
-    if ext not in _ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unsupported file type '{ext}'. Allowed: {', '.join(sorted(_ALLOWED_EXTENSIONS))}",
-        )
-
-    task_id   = str(uuid.uuid4())
-    safe_name = f"{task_id}{ext}"
-    file_path = os.path.join(settings.UPLOAD_DIR, safe_name)
+    if not await run_in_threadpool(pipeline_scheduler.has_capacity):     # broker I/O with Celery
+        raise _queue_full(pipeline_scheduler.retry_after())
 
-    with open(file_path, "wb") as buf:
-        shutil.copyfileobj(file.file, buf)
+    task_id = str(uuid.uuid4())
+    try:
+        upload = await receive_upload(request, task_id, _ALLOWED_EXTENSIONS)
+    except UploadTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    except UploadFormatError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
     # Create the initial "queued" record immediately so the frontend can start
-    # polling without waiting for the background task to start.
-    initial_record(current_user.id, task_id, file.filename or safe_name)
-
-    background_tasks.add_task(
-        _run_pipeline_bg,
-        file_path,
-        file.filename or safe_name,
-        current_user.id,
-        task_id,
-    )
+    # polling without waiting for the background task to start.  Result store
+    # writes block (SQL / Redis), so they run in a worker thread like submit.
+    await run_in_threadpool(initial_record, current_user.id, task_id, upload.filename, upload.digest)
+
+    try:
+        # In a worker thread: the Celery executor talks to its broker here
+        queue_position = await run_in_threadpool(
+            pipeline_scheduler.submit,
+            task_id, upload.source, upload.filename, current_user.id, upload.digest,
+        )
+    except QueueFullError as exc:
+        # Filled up while the body was streaming in
+        await run_in_threadpool(discard_record, current_user.id, task_id)
+        await run_in_threadpool(delete_upload, upload.source)
+        raise _queue_full(exc.retry_after)
 
     return {
         "message":  "File uploaded. Full pipeline is running in the background.",
         "task_id":  task_id,
-        "filename": file.filename,
+        "filename": upload.filename,
         "pipeline_stage": "queued",
+        "queue_position": queue_position,
     }
 
 
@@ -116,26 +147,125 @@ def get_pipeline_status(
     """
     Poll the full pipeline state for a single document task.
 
+    Response shape (when waiting for a worker):
+      { "pipeline_stage": "queued", "queue_position": 3, ... }
+
     Response shape (when running):
       { "pipeline_stage": "ocr | validating | calculating | analyzing", ... }
 
-    Response shape (when complete):
+    Response shape (when complete — calculations and analysis are ready;
+    Ollama insights follow as a separate job, tracked by insights_status):
       {
-        "pipeline_stage": "complete",
-        "document_type": "...",
-        "extraction":     { ...ExtractionResult fields... },
-        "calculations":   { ...TaxEngine.get_recommendation()... },
-        "analysis":       { ...AnalysisResponse... },
-        "ollama":         { "status": "complete|pending", "insights": [...] }
+        "pipeline_stage":  "complete",
+        "document_type":   "...",
+        "extraction":      { ...ExtractionResult fields... },
+        "calculations":    { ...TaxEngine.get_recommendation()... },
+        "analysis":        { ...AnalysisResponse... },
+        "insights_status": "queued | running | complete | pending | failed",
+        "ollama":          { "status": "complete|pending", "insights": [...] }   (once settled)
       }
 
     Response shape (when failed):
       { "pipeline_stage": "failed", "error": "..." }
     """
-    user_results = USER_PIPELINE_RESULTS.get(current_user.id, {})
-    if task_id not in user_results:
+    record = result_store.get(current_user.id, task_id)
+    if record is None:
         raise HTTPException(status_code=404, detail=f"Task '{task_id}' not found.")
-    return user_results[task_id]
+    if record.get("pipeline_stage") == STAGE_QUEUED:
+        return {**record, "queue_position": pipeline_scheduler.position(task_id)}
+    return record
+
+
+def _stream_token(conn: HTTPConnection, token: Optional[str]) -> Optional[str]:
+    scheme, _, value = conn.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and value:
+        return value
+    return token
+
+
+def _sse(name: str, data: dict) -> str:
+    if name == "ping":
+        return ": ping\n\n"
+    return f"event: {name}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+# ---------------------------------------------------------------------------
+# GET /pipeline/{task_id}/events  — Server-Sent Events
+# ---------------------------------------------------------------------------
+@router.get("/pipeline/{task_id}/events")
+async def stream_pipeline_events(
+    task_id: str,
+    request: Request,
+    token: Optional[str] = None,
+):
+    """
+    Live pipeline progress as text/event-stream, replacing the polling loop.
+
+      event: stage     data: {"task_id": ..., "pipeline_stage": "ocr"}
+      event: result    data: { ...full pipeline record... }
+      event: insights  data: {"task_id": ..., "insights_status": ..., "ollama": {...}}
+
+    The stream ends after "result" if the task failed, otherwise once the
+    insights follow-up settles and "insights" was sent.
+    The first stage event is the current stage (with queue_position while
+    queued); a ": ping" comment is sent every PIPELINE_EVENTS_HEARTBEAT_SECONDS.
+    A ?token= is written to access logs with the URL — prefer the header.
+    """
+    user_id = await run_in_threadpool(stream_user_id, _stream_token(request, token))
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    events = pipeline_events(user_id, task_id, pipeline_scheduler.position)
+    try:
+        first = await events.__anext__()
+    except TaskNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Task '{task_id}' not found.")
+
+    async def body():
+        yield _sse(*first)
+        async for name, data in events:
+            yield _sse(name, data)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ---------------------------------------------------------------------------
+# WS /pipeline/{task_id}/ws  — WebSocket
+# ---------------------------------------------------------------------------
+@router.websocket("/pipeline/{task_id}/ws")
+async def pipeline_websocket(
+    websocket: WebSocket,
+    task_id: str,
+    token: Optional[str] = None,
+):
+    """
+    Same events as /pipeline/{task_id}/events, one JSON message each:
+    {"event": "stage" | "ping" | "result" | "insights", "data": {...}}.  The
+    server closes the socket after the last event; close code 4401 = bad
+    token, 4404 = unknown task.  As with SSE, a ?token= lands in access logs.
+    """
+    user_id = await run_in_threadpool(stream_user_id, _stream_token(websocket, token))
+    if user_id is None:
+        await websocket.close(code=4401)
+        return
+    await websocket.accept()
+    try:
+        async for name, data in pipeline_events(user_id, task_id, pipeline_scheduler.position):
+            await websocket.send_text(json.dumps({"event": name, "data": data}, default=str))
+    except TaskNotFoundError:
+        await websocket.close(code=4404)
+        return
+    except WebSocketDisconnect:
+        return
+    await websocket.close()
 
 
 # ---------------------------------------------------------------------------
@@ -147,7 +277,7 @@ def get_all_pipeline_results(current_user: User = Depends(get_current_user)):
     Return all pipeline results for the authenticated user, keyed by task_id.
     Useful for the frontend to rebuild state after a hard refresh.
     """
-    return USER_PIPELINE_RESULTS.get(current_user.id, {})
+    return result_store.list_user(current_user.id)
 
 
 # ---------------------------------------------------------------------------
@@ -159,9 +289,8 @@ def get_document_status(
     current_user: User = Depends(get_current_user),
 ):
     """Legacy polling endpoint — prefer GET /pipeline/{task_id}."""
-    user_results = USER_PIPELINE_RESULTS.get(current_user.id, {})
-    if task_id in user_results:
-        r = user_results[task_id]
+    r = result_store.get(current_user.id, task_id)
+    if r is not None:
         # Map pipeline stage to old-style status
         stage = r.get("pipeline_stage", "processing")
         legacy_status = {
@@ -183,7 +312,7 @@ def get_document_status(
 @router.get("/results")
 def get_all_results(current_user: User = Depends(get_current_user)):
     """Legacy bulk-results endpoint — prefer GET /pipeline."""
-    return USER_PIPELINE_RESULTS.get(current_user.id, {})
+    return result_store.list_user(current_user.id)
 
 
 # ---------------------------------------------------------------------------
@@ -194,23 +323,19 @@ def delete_result(
     task_id: str,
     current_user: User = Depends(get_current_user),
 ):
-    """Remove a cached pipeline result."""
-    user_results = USER_PIPELINE_RESULTS.get(current_user.id, {})
-    if task_id not in user_results:
+    """Remove a stored pipeline result."""
+    if not result_store.delete(current_user.id, task_id):
         raise HTTPException(status_code=404, detail=f"Task '{task_id}' not found.")
-    del user_results[task_id]
     return {"message": f"Task '{task_id}' deleted."}
 
 # ---------------------------------------------------------------------------
 @router.delete("/results/{task_id}")
 def delete_result(task_id: str, current_user: User = Depends(get_current_user)):
     """
-    Remove a single extraction result from the in-memory store.
+    Remove a single extraction result from the result store.
     Raw file is already deleted by the extraction engine; this only
-    discards the cached structured output.
+    discards the stored structured output.
     """
-    user_results = USER_DOC_RESULTS.get(current_user.id, {})
-    if task_id not in user_results:
+    if not result_store.delete(current_user.id, task_id):
         raise HTTPException(status_code=404, detail="Task not found.")
-    del user_results[task_id]
     return {"message": "Result removed.", "task_id": task_id}
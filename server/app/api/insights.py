@@ -16,13 +16,13 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.api.auth import get_current_user
-from app.api.documents import USER_DOC_RESULTS          # shared in-memory store
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.analysis import AnalysisRequest, AnalysisResponse
 from app.schemas.extraction import ExtractionResult, DocumentMetadata, CapitalGains
 from app.services.ai_engine import run_analysis
 from app.services.policy_engine import get_active_context, PolicyStateError
+from app.services.result_store import result_store
 
 router = APIRouter()
 
@@ -78,21 +78,17 @@ def analyse_by_task(
     """
     Pull the stored extraction result for *task_id* and run the reasoning engine.
 
-    The extraction data comes from the in-memory ``USER_DOC_RESULTS`` dict
-    populated by the document upload pipeline.  Returns 404 when the task
+    The extraction data comes from the pipeline result store populated by
+    the document upload pipeline.  Returns 404 when the task
     is not found, or 422 when the task completed with an error status.
     """
-    user_key = str(current_user.id)
-    user_results: dict = USER_DOC_RESULTS.get(user_key, {})
-
-    if task_id not in user_results:
+    stored = result_store.get(current_user.id, task_id)   # pipeline record
+    if stored is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Task '{task_id}' not found for current user.",
         )
 
-    stored = user_results[task_id]   # dict returned by ocr_service.process_document
-
     # Abort early if the document processing itself failed
     if stored.get("status") == "error":
         raise HTTPException(
@@ -20,6 +20,78 @@ class Settings(BaseSettings):
 
     # Local fallback for document uploads
     UPLOAD_DIR: str = "./uploads"
+    # Largest accepted upload; enforced while the request body is streamed (413)
+    UPLOAD_MAX_BYTES: int = 25 * 1024 * 1024
+    # Uploads up to this size are processed in memory and never written to
+    # UPLOAD_DIR; larger ones are spilled there.  0 → always spill.
+    UPLOAD_IN_MEMORY_MAX_BYTES: int = 8 * 1024 * 1024
+
+    # Pipeline result store: "sql" (app database + LRU front cache), "redis"
+    # (shared across workers, pushes stage events) or "memory"
+    RESULT_STORE: str = "sql"
+    RESULT_TTL_SECONDS: int = 7 * 24 * 3600          # since the record's last update
+    RESULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024   # front cache ceiling (JSON bytes)
+    RESULT_PURGE_INTERVAL_SECONDS: int = 300
+    RESULT_REDIS_PREFIX: str = "taxmate:"
+
+    # Redis; "fakeredis://" runs an in-process fake (needs the fakeredis package)
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+    # Pipeline scheduler (bounded queue + per-stage worker pools)
+    PIPELINE_QUEUE_MAX: int = 100           # waiting jobs before uploads get a 503
+    PIPELINE_OCR_WORKERS: int = 0           # extraction → calculation threads; 0 → half the CPU cores
+    PIPELINE_LLM_WORKERS: int = 4           # Ollama insights (I/O-bound)
+    PIPELINE_LLM_QUEUE_MAX: int = 100       # insights jobs waiting for an llm worker
+    PIPELINE_RETRY_AFTER_SECONDS: int = 30  # Retry-After before any job has been timed
+    PIPELINE_EVENTS_HEARTBEAT_SECONDS: int = 15  # SSE / WebSocket keep-alive + stage re-check
+    PIPELINE_METRICS_WINDOW: int = 1024     # recent samples per series for /metrics quantiles
+    # "scheduler" (in-process pools above) or "celery" (ocr / calc / llm queues)
+    PIPELINE_EXECUTOR: str = "scheduler"
+
+    # Crash recovery (scheduler executor): each process holds a lease on the
+    # tasks it runs, renewed every third of PIPELINE_LEASE_SECONDS; unfinished
+    # tasks whose lease lapsed are resumed from their last checkpoint
+    PIPELINE_RECOVERY_ENABLED: bool = True
+    PIPELINE_LEASE_SECONDS: int = 60
+    # Files in UPLOAD_DIR older than this that no unfinished task needs are deleted
+    UPLOAD_ORPHAN_SECONDS: int = 3600
+
+    # Celery execution mode
+    CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/1")
+    CELERY_TASK_ALWAYS_EAGER: bool = False  # run stages in-process, no broker (tests / dev)
+
+    # PDF backend: "auto" (route by document class), "pdfplumber", "pdfium" or "camelot"
+    PDF_BACKEND: str = "auto"
+
+    # Page-sharded PDF extraction
+    OCR_PDF_WORKERS: int = 0              # process pool size; 0 → one per CPU core
+    OCR_PDF_PAGE_CONCURRENCY: int = 4     # max page shards in flight per document
+    OCR_PDF_SHARD_MIN_PAGES: int = 4      # smaller PDFs are parsed inline
+    OCR_PDF_FORCE_TABLES: bool = False    # run table extraction even on pages without rulings
+    OCR_PDF_MIN_TEXT_CHARS: int = 20      # image pages with less text than this are OCR'd
+    OCR_PDF_RASTER_DPI: int = 300         # render DPI for scanned pages (capped by OCR_IMAGE_MAX_PIXELS)
+
+    # Image OCR (receipts, photographed slips, scanned pages)
+    OCR_IMAGE_WORKERS: int = 2            # concurrent Tesseract engines
+    OCR_TESSERACT_PSM: int = 3            # page segmentation mode; 3 = auto, 4 = column, 6 = block
+    OCR_TESSERACT_LANG: str = "eng"
+    OCR_IMAGE_MAX_PIXELS: int = 4_000_000 # larger images are downscaled first
+    OCR_IMAGE_TARGET_DPI: int = 300       # low-DPI scans are upsampled towards this
+    OCR_IMAGE_BINARIZE: bool = True
+
+    # Learned statement header → column mappings, persisted as JSON (put it on
+    # storage shared by all workers).  Empty keeps them in memory per process
+    COLUMN_MAPPING_PATH: str = "./column_mappings.json"
+
+    # Run every field extractor in full, whatever the classified document type
+    EXTRACTION_EXHAUSTIVE: bool = False
+
+    # Content-addressed extraction cache (repeat uploads skip OCR)
+    EXTRACTION_CACHE_ENABLED: bool = True
+    EXTRACTION_CACHE_MEMORY_ITEMS: int = 256
+    EXTRACTION_CACHE_DIR: str = "./extraction_cache"
+    EXTRACTION_CACHE_DISK_MB: int = 256
+    EXTRACTION_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
 
     class Config:
         env_file = ".env"
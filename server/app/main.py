@@ -5,9 +5,7 @@ from app.db.session import engine
 from app.models import base
 from app.models.user import User, Questionnaire
 from app.models.tax_policy import TaxPolicy  # ensure table is created
-
-# Create database tables
-base.Base.metadata.create_all(bind=engine)
+from app.models.pipeline_result import PipelineTask, PipelineResultField  # ensure tables are created
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
@@ -27,6 +25,11 @@ app.include_router(api_router, prefix="/api")
 from app.db.session import SessionLocal
 from app.services.policy_engine import seed_default_policy
 
+@app.on_event("startup")
+def create_tables():
+    # At startup, not import: importing the app must not touch the database
+    base.Base.metadata.create_all(bind=engine)
+
 @app.on_event("startup")
 def startup_seed():
     db = SessionLocal()
@@ -35,6 +38,35 @@ def startup_seed():
     finally:
         db.close()
 
+@app.on_event("startup")
+def start_pipeline_recovery():
+    from app.services.recovery import pipeline_recovery
+    if pipeline_recovery is not None:
+        pipeline_recovery.start()
+
+@app.on_event("shutdown")
+def stop_pipeline_recovery():
+    from app.services.recovery import pipeline_recovery
+    if pipeline_recovery is not None:
+        pipeline_recovery.shutdown()
+
+@app.on_event("shutdown")
+def stop_pipeline_scheduler():
+    from app.services.scheduler import pipeline_scheduler
+    pipeline_scheduler.shutdown(wait=False)
+
+@app.on_event("shutdown")
+def stop_pipeline_events():
+    from app.services.pipeline_events import event_hub
+    event_hub.shutdown()
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Pipeline stage timings and throughput in Prometheus text format."""
+    from fastapi.responses import PlainTextResponse
+    from app.services.pipeline_metrics import pipeline_metrics
+    return PlainTextResponse(pipeline_metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to TaxMate API. Navigate to /docs for Swagger UI."}
@@ -0,0 +1,41 @@
+"""
+TaxMate — Pipeline result SQLAlchemy models
+===========================================
+
+One PipelineTask row per uploaded document plus one PipelineResultField row
+per top-level field of its pipeline record (pipeline_stage, extraction,
+calculations, ollama …).  Each field is stored as JSON text and rewritten
+only when its value changes; `version` increases on every write, so a reader
+holding a cached copy fetches just the fields newer than it.
+"""
+
+from sqlalchemy import Column, Float, Index, Integer, String, Text
+
+from app.models.base import Base
+
+
+class PipelineTask(Base):
+    __tablename__ = "pipeline_tasks"
+
+    task_id         = Column(String(36), primary_key=True)
+    user_id         = Column(Integer, nullable=False, index=True)
+    pipeline_stage  = Column(String(20), nullable=False)
+    version         = Column(Integer, nullable=False, default=1)
+
+    # Epoch seconds — TTL arithmetic is done in Python for every backend
+    created_at      = Column(Float, nullable=False)
+    updated_at      = Column(Float, nullable=False)
+    expires_at      = Column(Float, nullable=False, index=True)
+
+
+class PipelineResultField(Base):
+    __tablename__ = "pipeline_result_fields"
+
+    task_id     = Column(String(36), primary_key=True)
+    name        = Column(String(64), primary_key=True)
+    value_json  = Column(Text, nullable=False)
+    version     = Column(Integer, nullable=False)   # PipelineTask.version when written
+
+    __table_args__ = (
+        Index("ix_pipeline_result_fields_task_version", "task_id", "version"),
+    )
@@ -1,15 +1,22 @@
 """
 Pydantic models for the document extraction output schema.
 Matches the exact JSON contract defined in the extraction engine spec.
+
+The models are immutable (frozen, tuples for repeated fields): the pipeline
+builds one ExtractionResult in ocr_service and hands that same object to
+every later stage and thread, serialising it only where it leaves the
+process.
 """
 
 from __future__ import annotations
 
-from typing import List, Literal, Optional
-from pydantic import BaseModel, Field
+from typing import Literal, Optional, Tuple
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class BankTransaction(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     date: str = Field(..., description="ISO 8601 date: YYYY-MM-DD")
     amount: float
     description: str
@@ -17,22 +24,30 @@ class BankTransaction(BaseModel):
 
 
 class EMIPayment(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     date: str = Field(..., description="ISO 8601 date: YYYY-MM-DD")
     amount: float
     lender: str
 
 
 class OtherSpending(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     category: str
     amount: float
 
 
 class CapitalGains(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     stocks: Optional[float] = None
     mutual_funds: Optional[float] = None
 
 
 class DocumentMetadata(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     document_type: str
     status: Literal["parsed", "partial", "failed"]
 
@@ -42,12 +57,14 @@ class ExtractionResult(BaseModel):
     Top-level structured financial data object produced by the extraction engine.
     Downstream tax calculations and AI insights consume this schema directly.
     """
+    model_config = ConfigDict(frozen=True)
+
     salary: Optional[float] = None
-    bank_transactions: List[BankTransaction] = Field(default_factory=list)
+    bank_transactions: Tuple[BankTransaction, ...] = ()
     rent_paid: Optional[float] = None
-    emi_payments: List[EMIPayment] = Field(default_factory=list)
+    emi_payments: Tuple[EMIPayment, ...] = ()
     interest_income: Optional[float] = None
     capital_gains: CapitalGains = Field(default_factory=CapitalGains)
     annual_savings: Optional[float] = None
-    other_spendings: List[OtherSpending] = Field(default_factory=list)
-    document_metadata: List[DocumentMetadata] = Field(default_factory=list)
+    other_spendings: Tuple[OtherSpending, ...] = ()
+    document_metadata: Tuple[DocumentMetadata, ...] = ()
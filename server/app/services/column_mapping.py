@@ -0,0 +1,195 @@
+"""
+TaxMate — Learned Column Mappings for Statement Tables
+======================================================
+Every bank exports the same header row every time, so finding the date /
+amount / description columns only needs the keyword heuristic once per
+layout.  A header is fingerprinted (cells lower-cased, whitespace collapsed)
+and the mapping learned for that fingerprint is a dictionary lookup from
+then on.
+
+Only layouts that map to columns are learned.  With COLUMN_MAPPING_PATH set
+they are persisted there as JSON, so they are shared by every worker and
+survive restarts; writes merge with whatever other workers saved first and
+replace the file atomically, and a worker that misses in memory re-reads the
+file if it changed before falling back to the heuristic.
+
+Rows the heuristic rejects are never written anywhere: the first row of a
+continuation table is a transaction, i.e. user data.  They are remembered in
+a bounded in-memory set per process instead.  For the same reason a row
+whose cells look like a date or an amount is never learned: the heuristic
+still maps it exactly as it always has, but the mapping is not remembered or
+saved, so a data row that happens to contain keywords stays out of the file.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when a rule below changes — mappings learned by older rules are dropped.
+_RULES_VERSION = 1
+_MAX_LAYOUTS   = 5_000      # per kind; uploads are user-controlled, so cap growth
+_MAX_REJECTED  = 10_000     # per kind, in memory only; oldest forgotten first
+
+# Cells like these are transaction data — such rows are never learned
+_DATA_CELL = re.compile(r"\d{1,4}[/.-]\d{1,2}[/.-]\d{2,4}|\d[\d,]*\.\d{2}\b")
+
+
+@dataclass(frozen=True)
+class ColumnMap:
+    date: int
+    amount: int
+    detail: Optional[int]       # description / narration, or lender for EMI tables
+
+
+# kind → (date keywords, amount keywords, detail keywords).  The last matching
+# date / detail column wins; the first matching amount column wins.
+_RULES: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]] = {
+    "bank_table": (
+        ("date", "dt", "txn date", "value date"),
+        ("amount", "debit", "credit", "withdrawal", "deposit"),
+        ("description", "narration", "particulars", "remarks", "detail"),
+    ),
+    "bank_csv": (
+        ("date", "dt", "value date"),
+        ("amount", "debit", "credit", "withdrawal", "deposit", "txn amount"),
+        ("description", "narration", "particulars", "remarks"),
+    ),
+    "emi_table": (
+        ("date",),
+        ("emi", "amount", "instalment", "debit"),
+        ("lender", "bank", "institution", "loan", "towards"),
+    ),
+}
+
+
+def header_signature(header: Iterable) -> str:
+    """Layout fingerprint of a header row."""
+    return "\x1f".join(" ".join(str(c).lower().split()) if c else "" for c in header)
+
+
+def _infer(signature: str, kind: str) -> Optional[ColumnMap]:
+    """The keyword heuristic, run once per unseen layout."""
+    date_kws, amount_kws, detail_kws = _RULES[kind]
+    cells = signature.split("\x1f")
+    date_col = amt_col = detail_col = None
+    for i, h in enumerate(cells):
+        if any(x in h for x in date_kws):
+            date_col = i
+        if amt_col is None and any(x in h for x in amount_kws):
+            amt_col = i
+        if any(x in h for x in detail_kws):
+            detail_col = i
+    if date_col is None or amt_col is None:
+        return None
+    return ColumnMap(date_col, amt_col, detail_col)
+
+
+class ColumnMappingStore:
+    """In-memory layout → ColumnMap table, optionally backed by a shared JSON file."""
+
+    def __init__(self, path: Optional[str]):
+        self._path = path
+        self._lock = threading.Lock()
+        self._maps: Dict[str, Dict[str, ColumnMap]] = {kind: {} for kind in _RULES}
+        self._rejected: Dict[str, "OrderedDict[str, None]"] = {kind: OrderedDict() for kind in _RULES}
+        self._mtime = 0.0
+        self._reload()
+
+    def lookup(self, header: Iterable, kind: str) -> Optional[ColumnMap]:
+        """Column mapping for `header`, or None if it is not a `kind` table."""
+        return self.lookup_signature(header_signature(header), kind)
+
+    def lookup_signature(self, signature: str, kind: str) -> Optional[ColumnMap]:
+        known = self._maps[kind]
+        mapping = known.get(signature)
+        if mapping is not None:
+            return mapping
+        rejected = self._rejected[kind]
+        if signature in rejected:
+            return None
+
+        mapping = _infer(signature, kind)
+        if mapping is not None and _DATA_CELL.search(signature):
+            return mapping                          # a transaction row — never learned
+        with self._lock:
+            if mapping is None:
+                rejected[signature] = None
+                if len(rejected) > _MAX_REJECTED:
+                    rejected.popitem(last=False)
+                return None
+            self._reload()                          # another worker may have learned it
+            if signature not in known and len(known) < _MAX_LAYOUTS:
+                known[signature] = mapping
+                self._save(kind, signature, mapping)
+            return known.get(signature, mapping)
+
+    def is_known(self, header: Iterable, kind: str) -> bool:
+        """True if `header` is a learned `kind` header."""
+        return header_signature(header) in self._maps[kind]
+
+    # ── Persistence ────────────────────────────────────────────────────────────
+
+    def _read(self) -> Dict[str, Dict[str, List[Optional[int]]]]:
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as exc:
+            logger.warning("Column mappings at %s unreadable (%s) — relearning.", self._path, exc)
+            return {}
+        if data.get("version") != _RULES_VERSION:
+            return {}
+        return data.get("kinds", {})
+
+    def _reload(self) -> None:
+        if not self._path:
+            return
+        try:
+            mtime = os.path.getmtime(self._path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        self._merge(self._read())
+        self._mtime = mtime
+
+    def _merge(self, kinds: Dict[str, Dict[str, List[Optional[int]]]]) -> None:
+        for kind, layouts in kinds.items():
+            if kind in self._maps:
+                known = self._maps[kind]
+                for signature, cols in layouts.items():
+                    if cols and len(known) < _MAX_LAYOUTS:
+                        known[signature] = ColumnMap(*cols)
+
+    def _save(self, kind: str, signature: str, mapping: ColumnMap) -> None:
+        if not self._path:
+            return
+        kinds = self._read()
+        self._merge(kinds)                          # pick up other workers' layouts too
+        layouts = kinds.setdefault(kind, {})
+        for stale in [sig for sig, cols in layouts.items() if not cols]:
+            del layouts[stale]                      # rejections written by older versions
+        layouts[signature] = [mapping.date, mapping.amount, mapping.detail]
+        tmp = f"{self._path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": _RULES_VERSION, "kinds": kinds}, f)
+            os.replace(tmp, self._path)
+            self._mtime = os.path.getmtime(self._path)
+        except Exception as exc:
+            logger.warning("Could not persist column mappings to %s: %s", self._path, exc)
+
+
+column_mappings = ColumnMappingStore(settings.COLUMN_MAPPING_PATH or None)
@@ -0,0 +1,260 @@
+"""
+TaxMate — Content-Addressed Extraction Cache
+============================================
+
+Users often re-upload the same salary slip or statement.  Extraction output is
+a pure function of the uploaded bytes and the extractor version, so results
+are cached under  sha256(bytes) + EXTRACTOR_VERSION  and a repeat upload skips
+PDF parsing / OCR entirely.
+
+Tiers
+-----
+1. memory — LRU of recent results (kept as JSON text, so callers always get
+            a private copy), bounded by item count
+2. disk   — one JSON file per key in EXTRACTION_CACHE_DIR, bounded by total
+            size (oldest evicted first)
+Both tiers expire entries after EXTRACTION_CACHE_TTL_SECONDS.
+
+Privacy
+-------
+Only the structured ExtractionResult payload is stored — never the raw file.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+
+from app.core.config import settings
+from app.services.ocr_service import EXTRACTOR_VERSION
+
+logger = logging.getLogger(__name__)
+
+_HASH_CHUNK    = 1024 * 1024
+_SWEEP_SECONDS = 600        # disk tier re-counted / expired files dropped at least this often
+
+
+def file_digest(file_path: str) -> str:
+    """SHA-256 hex digest of a file, read in 1 MiB chunks."""
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def source_digest(source: Union[str, bytes]) -> str:
+    """SHA-256 hex digest of an upload — a path on disk, or its bytes in memory."""
+    if isinstance(source, str):
+        return file_digest(source)
+    return hashlib.sha256(source).hexdigest()
+
+
+class ExtractionCache:
+    """Two-tier (memory LRU + disk) cache of process_document results."""
+
+    def __init__(
+        self,
+        memory_items: int,
+        disk_dir: Optional[str],
+        disk_max_bytes: int,
+        ttl_seconds: int,
+    ):
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._memory_items = memory_items
+        self._disk_dir = disk_dir
+        self._disk_max_bytes = disk_max_bytes
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()                # memory tier, counters, disk byte total
+        self._sweep_lock = threading.Lock()          # one disk scan at a time
+        self._disk_ready = False                     # directory created (on the first write)
+        self._disk_bytes: Optional[int] = None       # running total; None until the first scan
+        self._last_sweep = 0.0
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    # ── Public API ─────────────────────────────────────────────────────────────
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for `digest`, or None on a miss."""
+        key = self._key(digest)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, payload = entry
+                if now - stored_at <= self._ttl:
+                    self._memory.move_to_end(key)
+                    self._counts["memory_hits"] += 1
+                    return json.loads(payload)
+                del self._memory[key]
+
+        payload = self._disk_get(key, now)          # file I/O outside the lock
+        with self._lock:
+            if payload is None:
+                self._counts["misses"] += 1
+                return None
+            self._remember(key, payload, now)
+            self._counts["disk_hits"] += 1
+        return json.loads(payload)
+
+    def put(self, digest: str, result: Dict[str, Any]) -> None:
+        """Store an extraction result in both tiers."""
+        key = self._key(digest)
+        payload = json.dumps(result)
+        with self._lock:
+            self._remember(key, payload, time.time())
+            self._counts["stores"] += 1
+        self._disk_put(key, payload)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit / miss counters and current tier sizes."""
+        if self._disk_dir and self._disk_bytes is None:
+            self._disk_sweep()                      # first call: learn the disk total
+        with self._lock:
+            hits = self._counts["memory_hits"] + self._counts["disk_hits"]
+            lookups = hits + self._counts["misses"]
+            return {
+                **self._counts,
+                "hits":            hits,
+                "hit_rate":        round(hits / lookups, 4) if lookups else 0.0,
+                "memory_items":    len(self._memory),
+                "disk_bytes":      self._disk_bytes or 0,
+                "extractor_version": EXTRACTOR_VERSION,
+            }
+
+    # ── Memory tier ────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _key(digest: str) -> str:
+        return f"{digest}-v{EXTRACTOR_VERSION}"
+
+    def _remember(self, key: str, payload: str, now: float) -> None:
+        self._memory[key] = (now, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_items:
+            self._memory.popitem(last=False)
+            self._counts["evictions"] += 1
+
+    # ── Disk tier ──────────────────────────────────────────────────────────────
+    # None of these run under self._lock except to adjust the byte total.
+    # The total is kept by this process's own writes and re-synced from a
+    # directory scan whenever it passes the limit or _SWEEP_SECONDS elapse,
+    # which also catches files written by other workers.
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._disk_dir, f"{key}.json")
+
+    def _disk_get(self, key: str, now: float) -> Optional[str]:
+        if not self._disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            if now - os.path.getmtime(path) > self._ttl:
+                self._remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                payload = f.read()
+            json.loads(payload)     # validate before trusting it
+            return payload
+        except FileNotFoundError:
+            return None
+        except Exception as exc:
+            logger.warning("Extraction cache: unreadable entry %s (%s) — dropping.", path, exc)
+            self._remove(path)
+            return None
+
+    def _disk_put(self, key: str, payload: str) -> None:
+        if not self._disk_dir:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if not self._disk_ready:
+                os.makedirs(self._disk_dir, exist_ok=True)
+                self._disk_ready = True
+            replaced = _size(path)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(payload)
+            written = os.path.getsize(tmp)
+            os.replace(tmp, path)   # atomic — concurrent readers never see a partial file
+        except Exception as exc:
+            logger.warning("Extraction cache: could not write %s: %s", path, exc)
+            self._remove(tmp)
+            return
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += written - replaced
+            due = (
+                self._disk_bytes is None
+                or self._disk_bytes > self._disk_max_bytes
+                or time.time() - self._last_sweep > _SWEEP_SECONDS
+            )
+        if due:
+            self._disk_sweep()
+
+    def _disk_entries(self):
+        """(mtime, size, path) for every cache file."""
+        entries = []
+        try:
+            it = os.scandir(self._disk_dir)
+        except FileNotFoundError:
+            return entries          # nothing written yet
+        with it:
+            for e in it:
+                if e.name.endswith(".json"):
+                    try:
+                        st = e.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, e.path))
+        return entries
+
+    def _disk_sweep(self) -> None:
+        """Re-count the directory, dropping expired files, then the oldest until under the size limit."""
+        if not self._sweep_lock.acquire(blocking=False):
+            return                  # another thread is already sweeping
+        try:
+            now = time.time()
+            entries = sorted(self._disk_entries())
+            total = sum(size for _, size, _ in entries)
+            evicted = 0
+            for mtime, size, path in entries:
+                if now - mtime <= self._ttl and total <= self._disk_max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+                evicted += 1
+            with self._lock:
+                self._disk_bytes = total
+                self._last_sweep = now
+                self._counts["evictions"] += evicted
+        finally:
+            self._sweep_lock.release()
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+extraction_cache = ExtractionCache(
+    memory_items=settings.EXTRACTION_CACHE_MEMORY_ITEMS,
+    disk_dir=settings.EXTRACTION_CACHE_DIR or None,
+    disk_max_bytes=settings.EXTRACTION_CACHE_DISK_MB * 1024 * 1024,
+    ttl_seconds=settings.EXTRACTION_CACHE_TTL_SECONDS,
+)
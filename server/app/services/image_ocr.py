@@ -0,0 +1,207 @@
+"""
+TaxMate — Image OCR Engine
+==========================
+Turns receipt / salary-slip images (and rasterized PDF pages) into text.
+
+Every image is normalised before Tesseract sees it:
+  1. EXIF orientation applied (phone photos are often stored sideways)
+  2. decoded straight to grayscale, downscaled to OCR_IMAGE_MAX_PIXELS
+     (JPEGs use draft mode, so a 12 MP photo is never fully decoded)
+  3. low-DPI scans upscaled towards OCR_IMAGE_TARGET_DPI
+  4. optionally binarized with an Otsu threshold
+
+Recognition runs on a bounded pool of OCR_IMAGE_WORKERS threads:
+  - with `tesserocr` installed, each worker keeps one Tesseract engine loaded
+    for its whole lifetime (no per-image process start or model load)
+  - otherwise each worker drives the `tesseract` binary through pytesseract;
+    the pool still caps how many run at once across all requests
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Deque, Iterable, List, Optional, Union
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# ── Optional heavy deps (graceful fallback if not installed) ──────────────────
+try:
+    from PIL import Image, ImageOps  # type: ignore
+    _PIL_OK = True
+except ImportError:
+    _PIL_OK = False
+
+try:
+    import tesserocr  # type: ignore
+    _TESSEROCR_OK = True
+except ImportError:
+    _TESSEROCR_OK = False
+
+try:
+    import pytesseract  # type: ignore
+    _PYTESSERACT_OK = True
+except ImportError:
+    _PYTESSERACT_OK = False
+
+OCR_AVAILABLE = _PIL_OK and (_TESSEROCR_OK or _PYTESSERACT_OK)
+if not OCR_AVAILABLE:
+    logger.warning("Pillow / Tesseract bindings not installed — image OCR disabled.")
+
+# Tesseract page-segmentation modes used by this app
+PSM_AUTO         = 3    # fully automatic layout analysis (Tesseract default)
+PSM_SINGLE_COL   = 4    # one column of variable-size text — receipts
+PSM_UNIFORM      = 6    # one uniform block of text — salary slips, table crops
+PSM_SPARSE       = 11   # scattered text, no particular order
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Preprocessing
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _otsu_threshold(histogram: List[int]) -> int:
+    """Grey level that best separates ink from paper (Otsu's method)."""
+    total = sum(histogram)
+    sum_all = sum(level * count for level, count in enumerate(histogram))
+    sum_bg = weight_bg = 0
+    best_level, best_var = 127, -1.0
+    for level, count in enumerate(histogram):
+        weight_bg += count
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += level * count
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between > best_var:
+            best_level, best_var = level, between
+    return best_level
+
+
+def preprocess(image: "Image.Image") -> "Image.Image":
+    """
+    Normalise an image for OCR: orientation, grayscale, pixel budget, DPI and
+    (optionally) binarization.  Returns a new grayscale image whose
+    info["dpi"] is the resolution it actually has after any resizing (an
+    image without one is taken to be at OCR_IMAGE_TARGET_DPI to begin with).
+    """
+    max_pixels = settings.OCR_IMAGE_MAX_PIXELS
+    target_dpi = settings.OCR_IMAGE_TARGET_DPI
+    dpi = image.info.get("dpi", (0, 0))[0] or 0
+    source_pixels = image.width * image.height
+
+    # JPEG: let the decoder downsample by 1/2, 1/4 or 1/8 while reading
+    if image.format == "JPEG" and image.width * image.height > max_pixels:
+        scale = math.sqrt(max_pixels / (image.width * image.height))
+        image.draft("L", (int(image.width * scale), int(image.height * scale)))
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "L":
+        image = image.convert("L")
+
+    scale = 1.0
+    if dpi and dpi < target_dpi:
+        scale = target_dpi / dpi                        # small scan → upsample
+    pixels = image.width * image.height * scale * scale
+    if pixels > max_pixels:
+        scale *= math.sqrt(max_pixels / pixels)         # never exceed the budget
+    if abs(scale - 1.0) > 0.05:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.LANCZOS if scale < 1 else Image.BICUBIC)
+
+    if settings.OCR_IMAGE_BINARIZE:
+        threshold = _otsu_threshold(image.histogram())
+        image = image.point([0] * (threshold + 1) + [255] * (255 - threshold))
+
+    # JPEG draft and resize both change the resolution; so may neither
+    effective = (dpi or target_dpi) * math.sqrt(image.width * image.height / source_pixels)
+    image.info["dpi"] = (max(1, round(effective)),) * 2
+    return image
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Worker pool
+# ─────────────────────────────────────────────────────────────────────────────
+
+_POOL: Optional[ThreadPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+_local = threading.local()      # per-worker tesserocr engine
+
+
+def _pool() -> ThreadPoolExecutor:
+    """Lazily create the thread pool shared by all image OCR calls."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(
+                max_workers=max(1, settings.OCR_IMAGE_WORKERS),
+                thread_name_prefix="ocr",
+            )
+        return _POOL
+
+
+def _engine() -> "tesserocr.PyTessBaseAPI":
+    """This worker's long-lived Tesseract engine (created on first use)."""
+    api = getattr(_local, "api", None)
+    if api is None:
+        api = tesserocr.PyTessBaseAPI(lang=settings.OCR_TESSERACT_LANG)
+        _local.api = api
+    return api
+
+
+def _recognize(image: "Image.Image", psm: int) -> str:
+    """Runs on a pool worker."""
+    image = preprocess(image)
+    dpi = image.info["dpi"][0]          # after preprocessing, not the target
+    if _TESSEROCR_OK:
+        api = _engine()
+        api.SetPageSegMode(psm)
+        api.SetImage(image)
+        api.SetSourceResolution(dpi)
+        return api.GetUTF8Text()
+    return pytesseract.image_to_string(
+        image,
+        lang=settings.OCR_TESSERACT_LANG,
+        config=f"--psm {psm} --dpi {dpi}",
+    )
+
+
+def _recognize_file(file: Union[str, BinaryIO], psm: int) -> str:
+    with Image.open(file) as image:
+        return _recognize(image, psm)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+def ocr_image_file(file: Union[str, BinaryIO], psm: Optional[int] = None) -> str:
+    """OCR one image file (path or binary file object) on the worker pool and return its text."""
+    psm = settings.OCR_TESSERACT_PSM if psm is None else psm
+    return _pool().submit(_recognize_file, file, psm).result()
+
+
+def ocr_images(images: Iterable["Image.Image"], psm: Optional[int] = None) -> List[str]:
+    """
+    OCR several images in parallel; texts are returned in input order.
+    `images` is consumed lazily with at most two images per worker in flight,
+    so a generator of rasterized pages never has every page in memory at once.
+    """
+    psm = settings.OCR_TESSERACT_PSM if psm is None else psm
+    window = 2 * max(1, settings.OCR_IMAGE_WORKERS)
+    in_flight: Deque[Future] = deque()
+    texts: List[str] = []
+    for image in images:
+        if len(in_flight) >= window:
+            texts.append(in_flight.popleft().result())
+        in_flight.append(_pool().submit(_recognize, image, psm))
+    texts.extend(f.result() for f in in_flight)
+    return texts
@@ -10,36 +10,75 @@ Rules:
 - Mark missing / unclear fields as null.
 - Preserve original dates and descriptions.
 - Normalize currencies to INR.
-- Delete raw file from disk immediately after extraction (privacy).
+- Keep small uploads in memory; delete raw files from disk immediately
+  after extraction (privacy).
 """
 
 from __future__ import annotations
 
+import bisect
 import csv
 import io
+import itertools
 import logging
+import multiprocessing
 import os
 import re
-from datetime import datetime
-from typing import List, Optional
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from app.core.config import settings
+from app.services import image_ocr, pdf_backends
+from app.services.column_mapping import column_mappings
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever extraction output can change for the same input bytes —
+# cached extractions from other versions are then ignored.
+EXTRACTOR_VERSION = "10"
+
 # ── Optional heavy deps (graceful fallback if not installed) ──────────────────
 try:
-    import pdfplumber  # type: ignore
-    _PDF_OK = True
+    import pypdfium2 as pdfium  # type: ignore
+    _PDFIUM_OK = True
 except ImportError:
-    _PDF_OK = False
-    logger.warning("pdfplumber not installed — PDF parsing disabled.")
+    _PDFIUM_OK = False
+    logger.warning("pypdfium2 not installed — OCR fallback for scanned PDFs disabled.")
 
 try:
-    import pytesseract  # type: ignore
-    from PIL import Image  # type: ignore
-    _OCR_OK = True
+    import openpyxl  # type: ignore
+    _XLSX_OK = True
 except ImportError:
-    _OCR_OK = False
-    logger.warning("pytesseract / Pillow not installed — image OCR disabled.")
+    _XLSX_OK = False
+    logger.warning("openpyxl not installed — XLSX parsing disabled.")
+
+_OCR_OK = image_ocr.OCR_AVAILABLE     # Pillow + tesserocr / pytesseract
+
+
+# ── Document sources ──────────────────────────────────────────────────────────
+# Small uploads are handed over in memory and never touch disk; larger ones
+# arrive as the path of the file they were spilled to.
+DocumentSource = Union[str, bytes, bytearray, memoryview, BinaryIO]
+Source = pdf_backends.Source        # normalised: a path, or immutable bytes
+
+
+def load_source(source: DocumentSource) -> Source:
+    """
+    Normalise a document source.  Buffers become one bytes object, which every
+    parser can reopen as often as it needs and pool workers can receive.
+    """
+    if isinstance(source, (str, bytes)):
+        return source
+    if isinstance(source, (bytearray, memoryview)):
+        return bytes(source)
+    if isinstance(source, io.BytesIO):
+        return source.getvalue()
+    return source.read()
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -68,6 +107,50 @@ _MONTHS = {
     "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
 }
 
+# ── Field tokenizer patterns (matched against lowercased text) ────────────────
+_TOK_VALUE    = r"[\d,]+(?:\.\d{1,2})?"
+_TOK_SEP      = r"\s*[:\-₹rs\.]*\s*"
+_TOK_CURRENCY = r"(?:(?:₹|rs\.?|inr)\s*)?"
+
+# Labelled key/value pairs: "<label> : <amount>"
+_FIELD_LABELS = {
+    "net_pay":       r"net\s*pay|take\s*home|in\s*hand",
+    "gross_pay":     r"gross\s*salary|gross\s*pay|ctc",
+    "basic_pay":     r"basic\s*salary|basic\s*pay",
+    "rent":          r"rent\s*paid|monthly\s*rent|house\s*rent|rental\s*amount",
+    "interest":      r"interest\s*(?:income|earned|credited|received)|fd\s*interest|savings\s*interest",
+    "stcg":          r"stcg|short[\s\-]?term\s*(?:capital\s*)?gain",
+    "ltcg":          r"ltcg|long[\s\-]?term\s*(?:capital\s*)?gain",
+    "stocks":        r"(?:equity|shares|stocks?)\s*(?:gain|profit|proceeds)",
+    "mutual_funds":  r"(?:mutual\s*fund|mf|elss)\s*(?:redemption|gain|profit|proceeds)",
+    "savings_total": r"total\s*(?:80c\s*)?(?:investments?|deductions?|savings?)|annual\s*savings?",
+    "savings_80c":   r"80c|80\s*c",
+}
+
+# Value-first pairs: "<prefix> <amount> <suffix>"
+_FIELD_SUFFIXED = {
+    "rent_suffixed":     (r"(?:amount|total)" + _TOK_SEP, r"\s*(?:towards\s*rent|as\s*rent)"),
+    "interest_suffixed": (_TOK_CURRENCY,                  r"\s*(?:credited\s*as\s*interest|as\s*interest\s*income)"),
+}
+
+_TOK_DATE = (
+    r"\b(?:\d{4}-\d{2}-\d{2}|\d{2}[/-]\d{2}[/-]\d{4}"
+    r"|\d{2}[\s-]?(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[\s-]?\d{4})\b"
+)
+
+# One alternation, tried in order at each offset: labelled fields, suffixed
+# fields, dates, then bare amounts.  The value group of each field is named
+# after its kind, so m.lastgroup identifies the token type directly.  A
+# labelled field consumes only its label (the value sits in a lookahead), so
+# the value is still tokenized as an amount and may start another label.
+_RE_TOKENS = re.compile("|".join(
+    [f"(?:{label})(?={_TOK_SEP}(?P<{kind}>{_TOK_VALUE}))" for kind, label in _FIELD_LABELS.items()]
+    + [f"{pre}(?P<{kind}>{_TOK_VALUE}){post}" for kind, (pre, post) in _FIELD_SUFFIXED.items()]
+    # a currency prefix never swallows the digits of a digit-initial label ("Rs. 80C 1,50,000")
+    + [f"(?P<date>{_TOK_DATE})", rf"(?:(?:₹|rs\.?|inr)\s*(?!80\s*c))?(?P<amount>{_TOK_VALUE})"]
+))
+_RE_AMOUNT_LOWER = re.compile(_TOK_CURRENCY + f"({_TOK_VALUE})")
+
 # Keywords per category (lowercase)
 _KW_SALARY     = {"salary", "payslip", "pay slip", "net pay", "gross pay", "basic pay",
                    "ctc", "take home", "in hand", "earnings", "remuneration"}
@@ -83,6 +166,66 @@ _KW_CAP_GAINS  = {"capital gain", "capital gains", "stcg", "ltcg", "short term",
 _KW_INVEST     = {"80c", "lic", "ppf", "epf", "nsc", "elss", "nps", "80ccd",
                    "investment proof", "insurance premium", "provident fund"}
 
+# Document categories in classifier priority order (ties go to the earlier one)
+_CATEGORY_KEYWORDS = {
+    "Salary Slips":                   _KW_SALARY,
+    "Bank Statements":                _KW_BANK,
+    "Rent Receipts":                  _KW_RENT,
+    "Monthly EMI":                    _KW_EMI,
+    "Interest Income (FD, Savings)":  _KW_INTEREST,
+    "Capital Gains (Stocks, MFs)":    _KW_CAP_GAINS,
+    "Annual Savings / Investments":   _KW_INVEST,
+}
+
+_KW_CATEGORIES: Dict[str, List[str]] = {}   # keyword → categories it belongs to
+for _cat, _kws in _CATEGORY_KEYWORDS.items():
+    for _kw in _kws:
+        _KW_CATEGORIES.setdefault(_kw, []).append(_cat)
+del _cat, _kws, _kw
+
+# Every keyword as one alternation, longest first, matched against lowercased
+# text (IGNORECASE is an order of magnitude slower in `re`).  finditer only
+# reports non-overlapping matches, so each keyword carries a table of the
+# other keywords that can start inside it — contained ones are certain hits,
+# ones running past its end are confirmed with a startswith().  Together this
+# reproduces plain `kw in text.lower()` semantics for every keyword in one scan.
+_RE_KEYWORDS = re.compile(
+    "|".join(re.escape(kw) for kw in sorted(_KW_CATEGORIES, key=len, reverse=True))
+)
+
+
+def _overlaps(kw: str):
+    """
+    Keywords that can start inside `kw`, as (contained, run_over):
+      contained : [(offset, other)] — `other` lies wholly inside `kw`
+      run_over  : {next_char: [(offset, other)]} — `other` starts inside `kw` and
+                  continues past its end; only possible when the character after
+                  the match is `next_char`, and still confirmed with startswith()
+    """
+    contained, run_over = [], {}
+    for offset in range(len(kw)):
+        tail = kw[offset:]
+        for other in _KW_CATEGORIES:
+            if offset == 0 and other == kw:
+                continue
+            if tail.startswith(other):
+                contained.append((offset, other))
+            elif offset and other.startswith(tail):
+                run_over.setdefault(other[len(tail)], []).append((offset, other))
+    return contained, run_over
+
+
+_KW_OVERLAPS = {kw: _overlaps(kw) for kw in _KW_CATEGORIES}
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def _lower(text: str) -> str:
+    """Lowercase `text` without changing any offsets."""
+    lower = text.lower()
+    if len(lower) != len(text):          # rare non-ASCII case mappings change length
+        lower = text.translate(_ASCII_LOWER)
+    return lower
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Utility functions
@@ -126,9 +269,70 @@ def _parse_date(text: str) -> Optional[str]:
     return None
 
 
-def _keyword_hit(text: str, keywords: set) -> bool:
-    lower = text.lower()
-    return any(kw in lower for kw in keywords)
+class _KeywordScan:
+    """
+    Every category keyword found in a document, from a single regex pass.
+
+    hits      : category → distinct keywords present
+    positions : keyword  → start offsets in the text
+    Line-level checks are answered from the offset index instead of
+    rescanning each line.
+    """
+
+    __slots__ = ("hits", "positions", "_spans")
+
+    def __init__(self, text: str, lower: Optional[str] = None):
+        lower = lower if lower is not None else _lower(text)
+        positions: Dict[str, List[int]] = {}
+        for m in _RE_KEYWORDS.finditer(lower):
+            start, end, kw = m.start(), m.end(), m.group()
+            positions.setdefault(kw, []).append(start)
+            contained, run_over = _KW_OVERLAPS[kw]
+            for offset, other in contained:
+                positions.setdefault(other, []).append(start + offset)
+            for offset, other in run_over.get(lower[end:end + 1], ()):
+                if lower.startswith(other, start + offset):
+                    positions.setdefault(other, []).append(start + offset)
+
+        self.positions = positions
+        self.hits = {cat: set() for cat in _CATEGORY_KEYWORDS}
+        for kw in positions:
+            for cat in _KW_CATEGORIES[kw]:
+                self.hits[cat].add(kw)
+        self._spans = None   # (start, end, keyword) of every occurrence — built on first use
+
+    def count(self, category: str) -> int:
+        return len(self.hits[category])
+
+    def has(self, category: str) -> bool:
+        return bool(self.hits[category])
+
+    def in_span(self, start: int, end: int, category: Optional[str] = None) -> bool:
+        """True if a keyword (of `category`, or any category) lies wholly inside text[start:end]."""
+        if self._spans is None:
+            self._spans = sorted(
+                (pos, pos + len(kw), kw) for kw, starts in self.positions.items() for pos in starts
+            )
+        spans = self._spans
+        i = bisect.bisect_left(spans, (start,))
+        while i < len(spans) and spans[i][0] < end:
+            _, kw_end, kw = spans[i]
+            if kw_end <= end and (category is None or category in _KW_CATEGORIES[kw]):
+                return True
+            i += 1
+        return False
+
+
+_LINE_BREAKS = "\r\n\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+
+def _iter_lines(text: str):
+    """Yield (start, end, line) for each line of `text`, as str.splitlines() splits it."""
+    pos = 0
+    for raw in text.splitlines(keepends=True):
+        end = pos + len(raw)
+        yield pos, end, raw.rstrip(_LINE_BREAKS)
+        pos = end
 
 
 def _deduplicate(records: list, key_fn) -> list:
@@ -143,88 +347,541 @@ def _deduplicate(records: list, key_fn) -> list:
     return out
 
 
-def _largest_amount(text: str) -> Optional[float]:
+class _BoundedSeen:
     """
-    Scan text for all INR amounts and return the largest one.
-    Useful for salary slips, rent receipts, etc.
+    Dedup set for streamed records that remembers at most `maxsize` keys,
+    forgetting the oldest first.  Duplicates in bank exports are adjacent
+    re-exports of the same rows, so a recent window catches them.
     """
-    amounts = []
-    for m in _RE_AMOUNT.finditer(text):
-        raw = m.group(1).replace(",", "")
-        try:
-            amounts.append(float(raw))
-        except ValueError:
-            pass
-    return max(amounts) if amounts else None
+
+    __slots__ = ("_keys", "_order", "_maxsize")
+
+    def __init__(self, maxsize: int):
+        self._keys: set = set()
+        self._order: deque = deque()
+        self._maxsize = maxsize
+
+    def add(self, key) -> bool:
+        """Record `key`; return False if it was already present."""
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        self._order.append(key)
+        if len(self._order) > self._maxsize:
+            self._keys.discard(self._order.popleft())
+        return True
+
+
+def _to_float(raw: str) -> Optional[float]:
+    try:
+        return float(raw.replace(",", ""))
+    except ValueError:
+        return None
+
+
+# ── Column normalizers (table / CSV cells) ────────────────────────────────────
+# Statement date columns repeat one format, and mostly the same few hundred
+# values, thousands of times.  A column parser sniffs the format from its
+# first values, then parses cells with a slicing fast path for that one format
+# behind a bounded per-column memo.  Cells the fast path does not accept go to
+# the generic regex parser, so results always equal _parse_date.
+
+_SNIFF_VALUES = 8           # non-empty cells inspected before a format is locked in
+_MEMO_SIZE    = 4096        # distinct cell strings remembered per column
+_MISS         = object()    # fast path declined — use the generic parser
+
+
+def _fast_dmy(sep: str) -> Callable[[str], object]:
+    """DD<sep>MM<sep>YYYY"""
+    def parse(raw: str):
+        t = raw.strip()
+        if len(t) == 10 and t[2] == sep and t[5] == sep:
+            d, m, y = t[:2], t[3:5], t[6:]
+            if d.isdecimal() and m.isdecimal() and y.isdecimal():
+                return f"{y}-{m}-{d}"
+        return _MISS
+    return parse
+
+
+def _fast_ymd(raw: str):
+    """YYYY-MM-DD"""
+    t = raw.strip()
+    if len(t) == 10 and t[4] == "-" and t[7] == "-":
+        y, m, d = t[:4], t[5:7], t[8:]
+        if d.isdecimal() and m.isdecimal() and y.isdecimal():
+            return f"{y}-{m}-{d}"
+    return _MISS
+
+
+def _fast_dmony(raw: str):
+    """DD-Mon-YYYY / DD Mon YYYY"""
+    t = raw.strip()
+    if len(t) == 11 and t[2] == t[6] and t[2] in " -":
+        d, mon, y = t[:2], _MONTHS.get(t[3:6].lower()), t[7:]
+        if mon and d.isdecimal() and y.isdecimal():
+            return f"{y}-{mon:02d}-{d}"
+    return _MISS
+
+
+_DATE_FORMATS: Dict[str, Callable[[str], object]] = {
+    "dd/mm/yyyy":  _fast_dmy("/"),
+    "dd-mm-yyyy":  _fast_dmy("-"),
+    "yyyy-mm-dd":  _fast_ymd,
+    "dd-mon-yyyy": _fast_dmony,
+}
+
+
+class _ColumnParser:
+    """
+    Normalizer for one table / CSV column.  The first `_SNIFF_VALUES`
+    non-empty cells go through the generic parser while each candidate fast
+    format is tried on them; the format that fits a majority is locked in
+    (or none, for mixed columns — those still get the memo).
+    """
+
+    __slots__ = ("_formats", "_generic", "_fast", "_votes", "_sniffed", "_memo")
+
+    def __init__(self, formats: Dict[str, Callable[[str], object]], generic: Callable[[str], object]):
+        self._formats = formats
+        self._generic = generic
+        self._fast: Optional[Callable[[str], object]] = None
+        self._votes: Dict[str, int] = {}
+        self._sniffed = 0
+        self._memo: Dict[str, object] = {}
+
+    def __call__(self, raw: str):
+        value = self._memo.get(raw, _MISS)
+        if value is not _MISS:
+            return value
+        value = _MISS
+        if self._fast is not None:
+            value = self._fast(raw)
+        elif self._sniffed < _SNIFF_VALUES and raw.strip():
+            self._sniff(raw)
+        if value is _MISS:
+            value = self._generic(raw)
+        if len(self._memo) < _MEMO_SIZE:
+            self._memo[raw] = value
+        return value
+
+    def _sniff(self, raw: str) -> None:
+        for name, fast in self._formats.items():
+            if fast(raw) is not _MISS:
+                self._votes[name] = self._votes.get(name, 0) + 1
+                break
+        self._sniffed += 1
+        if self._sniffed == _SNIFF_VALUES:
+            best = max(self._votes, key=self._votes.get, default=None)
+            if best is not None and self._votes[best] * 2 > _SNIFF_VALUES:
+                self._fast = self._formats[best]
+
+
+def _date_column() -> _ColumnParser:
+    """Parser for a column of dates → YYYY-MM-DD (same results as _parse_date)."""
+    return _ColumnParser(_DATE_FORMATS, _parse_date)
+
+
+def _amount_column() -> Callable[[str], Optional[float]]:
+    """
+    Parser for a column of INR amounts.  Amounts are nearly all distinct, so a
+    memo never pays for itself, and every pure-Python fast path measured
+    slower than the one C-level regex search in _parse_amount — use it as is.
+    """
+    return _parse_amount
+
+
+class _DocTokens:
+    """
+    Typed tokens from a single tokenizer pass over a document.
+
+    keywords : _KeywordScan — category keyword hits and offsets
+    fields   : kind → [(offset, value)] for labelled key/value pairs
+               (value is None when the matched digits do not parse)
+    amounts  : [(offset, value)] for every INR amount, in text order
+    dates    : [(offset, iso_date)]
+
+    Field extractors read from these lists instead of re-running their own
+    regexes over the full text.
+    """
+
+    __slots__ = ("keywords", "fields", "amounts", "dates")
+
+    def __init__(self, text: str):
+        lower = _lower(text)
+        self.keywords = _KeywordScan(text, lower)
+        self.fields: Dict[str, List[Tuple[int, Optional[float]]]] = {}
+        self.amounts: List[Tuple[int, float]] = []
+        self.dates: List[Tuple[int, str]] = []
+
+        for m in _RE_TOKENS.finditer(lower):
+            kind = m.lastgroup
+            if kind == "amount":
+                value = _to_float(m.group(kind))
+                if value is not None:
+                    self.amounts.append((m.start(), value))
+                continue
+            if kind == "date":
+                iso = _parse_date(m.group())
+                if iso:
+                    self.dates.append((m.start(), iso))
+            else:
+                self.fields.setdefault(kind, []).append((m.start(kind), _to_float(m.group(kind))))
+            # Amounts inside the consumed span (day/month digits, "80c", a suffixed value)
+            for a in _RE_AMOUNT_LOWER.finditer(lower, m.start(), m.end()):
+                value = _to_float(a.group(1))
+                if value is not None:
+                    self.amounts.append((a.start(1), value))
+
+    def first(self, *kinds: str) -> Optional[float]:
+        """Value of the first token of the first kind (in priority order) that parsed."""
+        for kind in kinds:
+            found = self.fields.get(kind)
+            if found and found[0][1] is not None:
+                return found[0][1]
+        return None
+
+    def largest_amount(self) -> Optional[float]:
+        """Largest INR amount anywhere in the document."""
+        return max((v for _, v in self.amounts), default=None)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Raw text extraction (PDF / Image / CSV → plain text + rows)
 # ─────────────────────────────────────────────────────────────────────────────
 
+@dataclass(slots=True)
 class _RawExtract:
-    """Container for raw content pulled from a single file."""
+    """
+    Container for raw content pulled from a single file.
+    One instance per extraction call — nothing is shared between documents.
+    """
     text: str = ""
-    tables: List[List[List[str]]] = []   # list of tables; each table is list of rows
-    csv_rows: List[List[str]] = []
+    tables: List[List[List[str]]] = field(default_factory=list)   # each table is a list of rows
+    # Streamed row sources (CSV / XLSX): returns one row iterator per sheet,
+    # re-reading the file on each call so rows are never all held in memory.
+    sheets: Optional[Callable[[], Iterator[Iterator[List[str]]]]] = None
     parse_error: Optional[str] = None
 
 
-def _extract_raw_pdf(file_path: str) -> _RawExtract:
+_PageResult = pdf_backends.PageResult
+
+_PDF_POOL: Optional[ProcessPoolExecutor] = None
+_PDF_POOL_LOCK = threading.Lock()
+
+
+def _pdf_pool() -> ProcessPoolExecutor:
+    """
+    Lazily create the process pool shared by all page-sharded PDF parses.
+    Workers come from a fork server (spawn where there is none), never a
+    fork of this process: the API process runs scheduler, recovery and
+    event threads whose locks a forked child would inherit mid-acquire.
+    """
+    global _PDF_POOL
+    with _PDF_POOL_LOCK:
+        if _PDF_POOL is None:
+            workers = settings.OCR_PDF_WORKERS or os.cpu_count() or 1
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _PDF_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+        return _PDF_POOL
+
+
+def _discard_pdf_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next sharded parse builds a fresh one."""
+    global _PDF_POOL
+    with _PDF_POOL_LOCK:
+        if _PDF_POOL is pool:
+            _PDF_POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_pdf_pages(source: Source, page_indexes: List[int], backend: str) -> List[_PageResult]:
+    """
+    Parse a contiguous shard of pages from one PDF with the named backend.
+    Runs inside a pool worker, so the backend opens its own handle on the
+    file (or on its own copy of the in-memory bytes).
+    """
+    return pdf_backends.BACKENDS[backend].extract_pages(source, page_indexes)
+
+
+def _shard_pages(page_count: int, shards: int) -> List[List[int]]:
+    """Split page indexes into at most `shards` contiguous, near-equal runs."""
+    shards = max(1, min(shards, page_count))
+    size, extra = divmod(page_count, shards)
+    runs, start = [], 0
+    for n in range(shards):
+        end = start + size + (1 if n < extra else 0)
+        runs.append(list(range(start, end)))
+        start = end
+    return runs
+
+
+def _extract_pdf_sharded(source: Source, page_count: int, backend: str) -> List[_PageResult]:
+    """
+    Fan page shards out to the process pool and merge them back in page order.
+    Falls back to inline parsing only if the pool itself fails (a worker
+    died, or no worker could be started); a broken pool is discarded so the
+    next call starts a new one.  Parse errors raised by a shard propagate —
+    re-parsing a corrupt PDF inline would only fail a second time.
+    """
+    runs = _shard_pages(page_count, settings.OCR_PDF_PAGE_CONCURRENCY)
+    pool: Optional[ProcessPoolExecutor] = None
+    futures = []
+    try:
+        pool = _pdf_pool()
+        for run in runs:
+            futures.append(pool.submit(_extract_pdf_pages, source, run, backend))
+        pages = [page for fut in futures for page in fut.result()]
+    except BrokenProcessPool as e:              # a worker died (checked before RuntimeError, its base)
+        return _extract_pdf_inline(source, page_count, backend, pool, e)
+    except (OSError, RuntimeError) as e:
+        if len(futures) == len(runs):
+            raise                               # raised by the parse itself, in a worker
+        return _extract_pdf_inline(source, page_count, backend, pool, e)   # could not submit
+    finally:
+        for fut in futures:
+            fut.cancel()                        # remaining shards of a failed parse
+    pages.sort(key=lambda p: p[0])
+    return pages
+
+
+def _extract_pdf_inline(
+    source: Source, page_count: int, backend: str, pool: Optional[ProcessPoolExecutor], error: Exception,
+) -> List[_PageResult]:
+    logger.warning("PDF process pool failed (%s) — parsing inline.", error)
+    if pool is not None:
+        _discard_pdf_pool(pool)
+    return _extract_pdf_pages(source, list(range(page_count)), backend)
+
+
+def _needs_ocr(page: _PageResult) -> bool:
+    """A page is treated as scanned when it carries images but (almost) no text layer."""
+    _, text, _, has_images = page
+    return has_images and len(text.strip()) < settings.OCR_PDF_MIN_TEXT_CHARS
+
+
+def _rasterize_pdf_pages(source: Source, page_indexes: List[int]) -> Iterator["image_ocr.Image.Image"]:
+    """
+    Render the given pages to grayscale images at OCR_PDF_RASTER_DPI, capped so
+    no page exceeds OCR_IMAGE_MAX_PIXELS.  Pages are rendered one at a time as
+    the consumer asks for them; PDFIUM_LOCK is held per render, not while the
+    consumer OCRs the page.
+    """
+    with pdf_backends.PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(source)
+    try:
+        for idx in page_indexes:
+            with pdf_backends.PDFIUM_LOCK:
+                page = pdf[idx]
+                try:
+                    width_pt, height_pt = page.get_size()
+                    scale = min(
+                        settings.OCR_PDF_RASTER_DPI / 72,
+                        (settings.OCR_IMAGE_MAX_PIXELS / (width_pt * height_pt)) ** 0.5,
+                    )
+                    image = page.render(scale=scale, grayscale=True).to_pil()
+                finally:
+                    page.close()
+            image.info["dpi"] = (round(72 * scale),) * 2
+            yield image
+    finally:
+        with pdf_backends.PDFIUM_LOCK:
+            pdf.close()
+
+
+def _ocr_scanned_pages(source: Source, pages: List[_PageResult]) -> List[_PageResult]:
+    """
+    Replace the empty text layer of scanned pages with OCR output.  Only those
+    pages are rasterized; they are recognised in parallel on the image OCR pool.
+    Pages with a native text layer are returned untouched.
+    """
+    scanned = [p[0] for p in pages if _needs_ocr(p)]
+    if not scanned:
+        return pages
+    if not (_OCR_OK and _PDFIUM_OK):
+        logger.warning("%d scanned PDF page(s) left without text — OCR unavailable.", len(scanned))
+        return pages
+    try:
+        texts = dict(zip(scanned, image_ocr.ocr_images(_rasterize_pdf_pages(source, scanned))))
+    except Exception as e:
+        logger.warning("OCR of scanned PDF pages failed: %s", e)
+        return pages
+    logger.info("OCR'd %d of %d PDF pages without a text layer.", len(scanned), len(pages))
+    return [
+        (idx, texts[idx], tables, has_images) if idx in texts else (idx, text, tables, has_images)
+        for idx, text, tables, has_images in pages
+    ]
+
+
+# Document class → PDF backends in preference order (first available wins).
+# From benchmarks/bench_pdf_backends.py: the text-only pdfium backend matched
+# pdfplumber's extracted fields on every text-class document at a fraction of
+# the cost; statements and EMI schedules are read from tables, which only the
+# table backends produce.
+_PDF_ROUTES: Dict[str, Tuple[str, ...]] = {
+    "Bank Statements":  ("pdfplumber", "camelot"),
+    "Monthly EMI":      ("pdfplumber", "camelot"),
+}
+_PDF_DEFAULT_ROUTE = ("pdfium", "pdfplumber")
+_PDF_TABLE_BACKENDS = ("pdfplumber", "camelot")
+_ROUTE_SAMPLE_PAGES = 3     # pages of text layer used to classify before routing
+
+
+def _route_pdf(source: Source) -> pdf_backends.PdfBackend:
+    """
+    Pick the backend for one PDF.  With PDF_BACKEND = "auto" the first pages'
+    text layer is read with the fast pdfium backend and classified, and the
+    document goes to the first available backend routed for that class.
+    """
+    if settings.PDF_BACKEND != "auto":
+        return pdf_backends.first_available((settings.PDF_BACKEND,))
+    sniffer = pdf_backends.BACKENDS["pdfium"]
+    if not sniffer.available:
+        return pdf_backends.first_available(_PDF_TABLE_BACKENDS)
+    sample = range(min(_ROUTE_SAMPLE_PAGES, sniffer.page_count(source)))
+    text = "".join(page_text for _, page_text, _, _ in sniffer.extract_pages(source, list(sample)))
+    doc_type = _classify_document(text)
+    return pdf_backends.first_available(_PDF_ROUTES.get(doc_type, _PDF_DEFAULT_ROUTE))
+
+
+def _misrouted(backend: pdf_backends.PdfBackend, pages: List[_PageResult]) -> bool:
+    """
+    True if a document sent to a text-only backend on the strength of its
+    first pages turns out, on its full text, to be a class read from tables
+    (a statement behind a few pages of cover letter, say).  Its text layer
+    may still yield some transactions by line scanning, but far fewer than
+    its tables, so any such document is re-read with a table backend.
+    """
+    if backend.extracts_tables or settings.PDF_BACKEND != "auto":
+        return False
+    text = "".join(page_text + "\n" for _, page_text, _, _ in pages if page_text)
+    return _classify_document(text) in _PDF_ROUTES
+
+
+def _extract_pdf(source: Source, backend: pdf_backends.PdfBackend) -> List[_PageResult]:
+    page_count = backend.page_count(source)
+    if page_count >= settings.OCR_PDF_SHARD_MIN_PAGES and settings.OCR_PDF_PAGE_CONCURRENCY > 1:
+        return _extract_pdf_sharded(source, page_count, backend.name)
+    return _extract_pdf_pages(source, list(range(page_count)), backend.name)
+
+
+def _extract_raw_pdf(source: Source) -> _RawExtract:
     out = _RawExtract()
-    if not _PDF_OK:
-        out.parse_error = "pdfplumber not installed"
-        return out
     try:
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    out.text += page_text + "\n"
-                # Table extraction
-                tables = page.extract_tables()
-                if tables:
-                    out.tables.extend(tables)
+        backend = _route_pdf(source)
+        pages = _extract_pdf(source, backend)
+        if _misrouted(backend, pages):
+            table_backend = pdf_backends.first_available(_PDF_TABLE_BACKENDS)
+            logger.info("PDF routed to %s is a table document on its full text — re-reading with %s.",
+                        backend.name, table_backend.name)
+            pages = _extract_pdf(source, table_backend)
+        pages = _ocr_scanned_pages(source, pages)
+
+        out.text = "".join(page_text + "\n" for _, page_text, _, _ in pages if page_text)
+        out.tables = [table for _, _, tables, _ in pages for table in tables]
     except Exception as e:
         out.parse_error = str(e)
     return out
 
 
-def _extract_raw_image(file_path: str) -> _RawExtract:
+def _extract_raw_image(source: Source) -> _RawExtract:
     out = _RawExtract()
     if not _OCR_OK:
-        out.parse_error = "pytesseract / Pillow not installed"
+        out.parse_error = "Pillow / Tesseract bindings not installed"
         return out
     try:
-        image = Image.open(file_path)
-        out.text = pytesseract.image_to_string(image)
+        out.text = image_ocr.ocr_image_file(pdf_backends.as_file(source))
+    except Exception as e:
+        out.parse_error = str(e)
+    return out
+
+
+# Rows per sheet copied into the text blob used for keyword classification
+_SAMPLE_ROWS = 200
+
+
+def _open_text(source: Source):
+    if isinstance(source, str):
+        return open(source, "r", encoding="utf-8-sig", errors="replace", newline="")
+    return io.TextIOWrapper(io.BytesIO(source), encoding="utf-8-sig", errors="replace", newline="")
+
+
+def _iter_csv_rows(source: Source, max_rows: Optional[int] = None) -> Iterator[List[str]]:
+    """Stream non-empty CSV rows; the file stays open only while iterating."""
+    with _open_text(source) as f:
+        rows = (row for row in csv.reader(f) if any(cell.strip() for cell in row))
+        yield from itertools.islice(rows, max_rows)
+
+
+def _extract_raw_csv(source: Source) -> _RawExtract:
+    out = _RawExtract()
+    try:
+        # Flat text blob for keyword matching, from a sampled prefix only
+        out.text = "\n".join(",".join(r) for r in _iter_csv_rows(source, _SAMPLE_ROWS))
+        out.sheets = lambda: iter([_iter_csv_rows(source)])
     except Exception as e:
         out.parse_error = str(e)
     return out
 
 
-def _extract_raw_csv(file_path: str) -> _RawExtract:
+def _xlsx_cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+def _iter_xlsx_sheets(source: Source, max_rows: Optional[int] = None) -> Iterator[Iterator[List[str]]]:
+    """
+    Yield one row iterator per worksheet, streaming cells in read-only mode.
+    Each sheet's iterator must be consumed before advancing to the next.
+    """
+    wb = openpyxl.load_workbook(pdf_backends.as_file(source), read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            yield _iter_xlsx_rows(ws, max_rows)
+    finally:
+        wb.close()
+
+
+def _iter_xlsx_rows(ws, max_rows: Optional[int]) -> Iterator[List[str]]:
+    for n, row in enumerate(ws.iter_rows(values_only=True)):
+        if max_rows is not None and n >= max_rows:
+            return
+        cells = [_xlsx_cell(v) for v in row]
+        if any(c.strip() for c in cells):
+            yield cells
+
+
+def _extract_raw_xlsx(source: Source) -> _RawExtract:
     out = _RawExtract()
+    if not _XLSX_OK:
+        out.parse_error = "openpyxl not installed"
+        return out
     try:
-        with open(file_path, "r", encoding="utf-8-sig", errors="replace") as f:
-            reader = csv.reader(f)
-            rows = [row for row in reader if any(cell.strip() for cell in row)]
-        out.csv_rows = rows
-        # Also produce a flat text blob for keyword matching
-        out.text = "\n".join(",".join(r) for r in rows)
+        # Keyword text from a sampled prefix of each sheet; rows are streamed later
+        out.text = "\n".join(
+            ",".join(row)
+            for rows in _iter_xlsx_sheets(source, _SAMPLE_ROWS)
+            for row in rows
+        )
+        out.sheets = lambda: _iter_xlsx_sheets(source)
     except Exception as e:
         out.parse_error = str(e)
     return out
 
 
-def _extract_raw(file_path: str, filename: str) -> _RawExtract:
+def _extract_raw(source: DocumentSource, filename: str) -> _RawExtract:
+    source = load_source(source)
     ext = os.path.splitext(filename)[1].lower()
     if ext == ".pdf":
-        return _extract_raw_pdf(file_path)
+        return _extract_raw_pdf(source)
     if ext in (".jpg", ".jpeg", ".png"):
-        return _extract_raw_image(file_path)
-    if ext in (".csv", ".xlsx"):
-        return _extract_raw_csv(file_path)
+        return _extract_raw_image(source)
+    if ext == ".csv":
+        return _extract_raw_csv(source)
+    if ext == ".xlsx":
+        return _extract_raw_xlsx(source)
     out = _RawExtract()
     out.parse_error = f"Unsupported file extension: {ext}"
     return out
@@ -234,18 +891,10 @@ def _extract_raw(file_path: str, filename: str) -> _RawExtract:
 # Category classifiers
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _classify_document(text: str) -> str:
+def _classify_document(text: str, scan: Optional[_KeywordScan] = None) -> str:
     """Return the most likely document category based on keyword density."""
-    lower = text.lower()
-    scores = {
-        "Salary Slips":                   sum(1 for kw in _KW_SALARY    if kw in lower),
-        "Bank Statements":                sum(1 for kw in _KW_BANK      if kw in lower),
-        "Rent Receipts":                  sum(1 for kw in _KW_RENT      if kw in lower),
-        "Monthly EMI":                    sum(1 for kw in _KW_EMI       if kw in lower),
-        "Interest Income (FD, Savings)":  sum(1 for kw in _KW_INTEREST  if kw in lower),
-        "Capital Gains (Stocks, MFs)":    sum(1 for kw in _KW_CAP_GAINS if kw in lower),
-        "Annual Savings / Investments":   sum(1 for kw in _KW_INVEST    if kw in lower),
-    }
+    scan = scan or _KeywordScan(text)
+    scores = {cat: scan.count(cat) for cat in _CATEGORY_KEYWORDS}
     best = max(scores, key=lambda k: scores[k])
     return best if scores[best] > 0 else "Other Spending Proofs"
 
@@ -254,30 +903,24 @@ def _classify_document(text: str) -> str:
 # Field extractors — each operates on raw text + tables
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _extract_salary(text: str) -> Optional[float]:
+def _extract_salary(
+    text: str, tokens: Optional[_DocTokens] = None, fallback: bool = True,
+) -> Optional[float]:
     """
     Look for explicit net/gross pay lines and return that amount.
-    Falls back to the largest number if salary keywords are present.
+    Falls back to the largest number if salary keywords are present
+    (unless `fallback` is False — labelled values only).
     """
-    patterns = [
-        r"(?:net\s*pay|take\s*home|in\s*hand)\s*[:\-₹Rs\.]*\s*([\d,]+(?:\.\d{1,2})?)",
-        r"(?:gross\s*salary|gross\s*pay|ctc)\s*[:\-₹Rs\.]*\s*([\d,]+(?:\.\d{1,2})?)",
-        r"(?:basic\s*salary|basic\s*pay)\s*[:\-₹Rs\.]*\s*([\d,]+(?:\.\d{1,2})?)",
-    ]
-    for pat in patterns:
-        m = re.search(pat, text, re.IGNORECASE)
-        if m:
-            raw = m.group(1).replace(",", "")
-            try:
-                return float(raw)
-            except ValueError:
-                pass
-    if _keyword_hit(text, _KW_SALARY):
-        return _largest_amount(text)
+    tokens = tokens or _DocTokens(text)
+    salary = tokens.first("net_pay", "gross_pay", "basic_pay")
+    if salary is not None:
+        return salary
+    if fallback and tokens.keywords.has("Salary Slips"):
+        return tokens.largest_amount()
     return None
 
 
-def _extract_bank_transactions(text: str, tables: List) -> list:
+def _extract_bank_transactions(text: str, tables: List, scan: Optional[_KeywordScan] = None) -> list:
     """
     Parse bank transactions from table rows or line-by-line text.
     Each entry must have: date, amount, description.
@@ -288,21 +931,13 @@ def _extract_bank_transactions(text: str, tables: List) -> list:
     for table in tables:
         if not table:
             continue
-        # Heuristic: header row typically contains "date" / "amount" / "description"
-        header = [str(c).lower().strip() if c else "" for c in table[0]]
-        date_col = amt_col = desc_col = None
-        for i, h in enumerate(header):
-            if any(x in h for x in ("date", "dt", "txn date", "value date")):
-                date_col = i
-            if any(x in h for x in ("amount", "debit", "credit", "withdrawal", "deposit")):
-                if amt_col is None:
-                    amt_col = i
-            if any(x in h for x in ("description", "narration", "particulars", "remarks", "detail")):
-                desc_col = i
-
-        if date_col is None or amt_col is None:
+        # Header row typically contains "date" / "amount" / "description"
+        cols = column_mappings.lookup(table[0], "bank_table")
+        if cols is None:
             continue
+        date_col, amt_col, desc_col = cols.date, cols.amount, cols.detail
 
+        parse_date, parse_amount = _date_column(), _amount_column()
         for row in table[1:]:
             if not row or len(row) <= max(filter(None, [date_col, amt_col, desc_col])):
                 continue
@@ -313,8 +948,8 @@ def _extract_bank_transactions(text: str, tables: List) -> list:
             if not raw_date or not raw_amt:
                 continue
 
-            iso_date = _parse_date(raw_date)
-            amount   = _parse_amount(raw_amt)
+            iso_date = parse_date(raw_date)
+            amount   = parse_amount(raw_amt)
             if iso_date and amount and amount > 0:
                 transactions.append({
                     "date": iso_date,
@@ -325,13 +960,14 @@ def _extract_bank_transactions(text: str, tables: List) -> list:
 
     # 2. Fallback: line-by-line regex scan
     if not transactions:
-        for line in text.splitlines():
+        scan = scan or _KeywordScan(text)
+        for start, end, line in _iter_lines(text):
             line = line.strip()
             if not line:
                 continue
             iso_date = _parse_date(line)
             amount   = _parse_amount(line)
-            if iso_date and amount and amount > 0 and _keyword_hit(line, _KW_BANK):
+            if iso_date and amount and amount > 0 and scan.in_span(start, end, "Bank Statements"):
                 transactions.append({
                     "date": iso_date,
                     "amount": amount,
@@ -347,56 +983,44 @@ def _extract_bank_transactions(text: str, tables: List) -> list:
     return transactions
 
 
-def _extract_rent(text: str) -> Optional[float]:
-    patterns = [
-        r"(?:rent\s*paid|monthly\s*rent|house\s*rent|rental\s*amount)\s*[:\-₹Rs\.]*\s*([\d,]+(?:\.\d{1,2})?)",
-        r"(?:amount|total)\s*[:\-₹Rs\.]*\s*([\d,]+(?:\.\d{1,2})?)\s*(?:towards\s*rent|as\s*rent)",
-    ]
-    for pat in patterns:
-        m = re.search(pat, text, re.IGNORECASE)
-        if m:
-            raw = m.group(1).replace(",", "")
-            try:
-                return float(raw)
-            except ValueError:
-                pass
-    if _keyword_hit(text, _KW_RENT):
-        return _largest_amount(text)
+def _extract_rent(
+    text: str, tokens: Optional[_DocTokens] = None, fallback: bool = True,
+) -> Optional[float]:
+    tokens = tokens or _DocTokens(text)
+    rent = tokens.first("rent", "rent_suffixed")
+    if rent is not None:
+        return rent
+    if fallback and tokens.keywords.has("Rent Receipts"):
+        return tokens.largest_amount()
     return None
 
 
-def _extract_emi_payments(text: str, tables: List) -> list:
+def _extract_emi_payments(text: str, tables: List, scan: Optional[_KeywordScan] = None) -> list:
     payments = []
 
     # Table-based
     for table in tables:
         if not table:
             continue
-        header = [str(c).lower().strip() if c else "" for c in table[0]]
-        date_col = amt_col = lender_col = None
-        for i, h in enumerate(header):
-            if "date" in h:
-                date_col = i
-            if any(x in h for x in ("emi", "amount", "instalment", "debit")):
-                if amt_col is None:
-                    amt_col = i
-            if any(x in h for x in ("lender", "bank", "institution", "loan", "towards")):
-                lender_col = i
-        if date_col is None or amt_col is None:
+        cols = column_mappings.lookup(table[0], "emi_table")
+        if cols is None:
             continue
+        date_col, amt_col, lender_col = cols.date, cols.amount, cols.detail
+        parse_date, parse_amount = _date_column(), _amount_column()
         for row in table[1:]:
             if not row:
                 continue
-            iso_date = _parse_date(str(row[date_col] or ""))
-            amount   = _parse_amount(str(row[amt_col] or ""))
+            iso_date = parse_date(str(row[date_col] or ""))
+            amount   = parse_amount(str(row[amt_col] or ""))
             lender   = str(row[lender_col] or "Unknown").strip() if lender_col is not None else "Unknown"
             if iso_date and amount and amount > 0:
                 payments.append({"date": iso_date, "amount": amount, "lender": lender})
 
     # Line-based fallback
     if not payments:
-        for line in text.splitlines():
-            if _keyword_hit(line, _KW_EMI):
+        scan = scan or _KeywordScan(text)
+        for start, end, line in _iter_lines(text):
+            if scan.in_span(start, end, "Monthly EMI"):
                 iso_date = _parse_date(line)
                 amount   = _parse_amount(line)
                 if iso_date and amount and amount > 0:
@@ -408,95 +1032,59 @@ def _extract_emi_payments(text: str, tables: List) -> list:
     return _deduplicate(payments, lambda p: (p["date"], p["amount"], p["lender"]))
 
 
-def _extract_interest_income(text: str) -> Optional[float]:
-    patterns = [
-        r"(?:interest\s*(?:income|earned|credited|received)|fd\s*interest|savings\s*interest)\s*[:\-₹Rs\.]*\s*([\d,]+(?:\.\d{1,2})?)",
-        r"([\d,]+(?:\.\d{1,2})?)\s*(?:credited\s*as\s*interest|as\s*interest\s*income)",
-    ]
-    for pat in patterns:
-        m = re.search(pat, text, re.IGNORECASE)
-        if m:
-            raw = m.group(1).replace(",", "")
-            try:
-                return float(raw)
-            except ValueError:
-                pass
-    if _keyword_hit(text, _KW_INTEREST):
-        return _largest_amount(text)
+def _extract_interest_income(
+    text: str, tokens: Optional[_DocTokens] = None, fallback: bool = True,
+) -> Optional[float]:
+    tokens = tokens or _DocTokens(text)
+    interest = tokens.first("interest", "interest_suffixed")
+    if interest is not None:
+        return interest
+    if fallback and tokens.keywords.has("Interest Income (FD, Savings)"):
+        return tokens.largest_amount()
     return None
 
 
-def _extract_capital_gains(text: str) -> dict:
+def _extract_capital_gains(
+    text: str, tokens: Optional[_DocTokens] = None, fallback: bool = True,
+) -> dict:
     """Return {"stocks": float|None, "mutual_funds": float|None}."""
-    stocks = mfs = None
+    tokens = tokens or _DocTokens(text)
 
-    pat_stcg = re.compile(
-        r"(?:stcg|short[\s\-]?term\s*(?:capital\s*)?gain)\s*[:\-₹Rs\.]*\s*([\d,]+(?:\.\d{1,2})?)",
-        re.IGNORECASE,
-    )
-    pat_ltcg = re.compile(
-        r"(?:ltcg|long[\s\-]?term\s*(?:capital\s*)?gain)\s*[:\-₹Rs\.]*\s*([\d,]+(?:\.\d{1,2})?)",
-        re.IGNORECASE,
-    )
-    pat_stocks = re.compile(
-        r"(?:equity|shares|stocks?)\s*(?:gain|profit|proceeds)\s*[:\-₹Rs\.]*\s*([\d,]+(?:\.\d{1,2})?)",
-        re.IGNORECASE,
-    )
-    pat_mf = re.compile(
-        r"(?:mutual\s*fund|mf|elss)\s*(?:redemption|gain|profit|proceeds)\s*[:\-₹Rs\.]*\s*([\d,]+(?:\.\d{1,2})?)",
-        re.IGNORECASE,
-    )
+    stocks = tokens.first("stocks") or tokens.first("stcg") or tokens.first("ltcg")
+    mfs    = tokens.first("mutual_funds")
 
-    def _first_float(pat: re.Pattern) -> Optional[float]:
-        m = pat.search(text)
-        if m:
-            try:
-                return float(m.group(1).replace(",", ""))
-            except ValueError:
-                pass
-        return None
-
-    stocks = _first_float(pat_stocks) or _first_float(pat_stcg) or _first_float(pat_ltcg)
-    mfs    = _first_float(pat_mf)
-
-    if stocks is None and mfs is None and _keyword_hit(text, _KW_CAP_GAINS):
-        largest = _largest_amount(text)
+    if fallback and stocks is None and mfs is None and tokens.keywords.has("Capital Gains (Stocks, MFs)"):
+        largest = tokens.largest_amount()
         stocks = largest  # best-guess: attribute to stocks
 
     return {"stocks": stocks, "mutual_funds": mfs}
 
 
-def _extract_annual_savings(text: str) -> Optional[float]:
-    patterns = [
-        r"(?:total\s*(?:80c\s*)?(?:investments?|deductions?|savings?)|annual\s*savings?)\s*[:\-₹Rs\.]*\s*([\d,]+(?:\.\d{1,2})?)",
-        r"(?:80c|80\s*c)\s*[:\-₹Rs\.]*\s*([\d,]+(?:\.\d{1,2})?)",
-    ]
-    for pat in patterns:
-        m = re.search(pat, text, re.IGNORECASE)
-        if m:
-            raw = m.group(1).replace(",", "")
-            try:
-                return float(raw)
-            except ValueError:
-                pass
-    if _keyword_hit(text, _KW_INVEST):
-        return _largest_amount(text)
+def _extract_annual_savings(
+    text: str, tokens: Optional[_DocTokens] = None, fallback: bool = True,
+) -> Optional[float]:
+    tokens = tokens or _DocTokens(text)
+    savings = tokens.first("savings_total", "savings_80c")
+    if savings is not None:
+        return savings
+    if fallback and tokens.keywords.has("Annual Savings / Investments"):
+        return tokens.largest_amount()
     return None
 
 
-def _extract_other_spendings(text: str, tables: List) -> list:
+def _extract_other_spendings(text: str, tables: List, scan: Optional[_KeywordScan] = None) -> list:
     """
     Catch-all: extract spending lines that don't fit the above categories.
     Returns [{category, amount}] pairs.
     """
     spendings = []
-    _skip_kw = _KW_SALARY | _KW_BANK | _KW_RENT | _KW_EMI | _KW_INTEREST | _KW_CAP_GAINS | _KW_INVEST
+    scan = scan or _KeywordScan(text)
 
-    for line in text.splitlines():
+    for start, end, line in _iter_lines(text):
         line = line.strip()
         if not line or len(line) < 6:
             continue
-        if _keyword_hit(line, _skip_kw):
+        if scan.in_span(start, end):   # any category keyword → handled elsewhere
             continue
         amount = _parse_amount(line)
         if amount and amount > 0:
@@ -514,74 +1102,162 @@ def _extract_other_spendings(text: str, tables: List) -> list:
 # CSV-specialised parser (row-based)
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _parse_csv_transactions(rows: List[List[str]]) -> list:
+# Streamed transactions are emitted in chunks of this many rows, and
+# deduplicated against a window of the most recent keys
+_CSV_CHUNK_ROWS = 1000
+_DEDUP_WINDOW   = 50_000
+
+
+def _txn_key(t: dict) -> tuple:
+    return (t["date"], t["amount"], t["description"][:40])
+
+
+def _iter_csv_transactions(
+    rows: Iterable[List[str]],
+    seen: Optional[_BoundedSeen] = None,
+    chunk_size: int = _CSV_CHUNK_ROWS,
+) -> Iterator[list]:
     """
     Row-based CSV parsing for bank statement / transaction exports.
-    Auto-detects header row and maps columns.
-    """
-    if not rows:
-        return []
-
-    # Find header row (first row with ≥3 non-empty cells)
-    header_idx = 0
-    for i, row in enumerate(rows[:5]):
-        if len([c for c in row if c.strip()]) >= 3:
-            header_idx = i
-            break
-
-    header = [c.lower().strip() for c in rows[header_idx]]
-    date_col = amt_col = desc_col = None
-    for i, h in enumerate(header):
-        if any(x in h for x in ("date", "dt", "value date")):
-            date_col = i
-        if any(x in h for x in ("amount", "debit", "credit", "withdrawal", "deposit", "txn amount")):
-            if amt_col is None:
-                amt_col = i
-        if any(x in h for x in ("description", "narration", "particulars", "remarks")):
-            desc_col = i
-
-    if date_col is None or amt_col is None:
-        return []
-
-    transactions = []
-    for row in rows[header_idx + 1:]:
-        if len(row) <= max(filter(None, [date_col, amt_col, desc_col or 0])):
+    Auto-detects the header from the first rows, maps columns, then yields
+    deduplicated transactions in chunks — peak memory depends on
+    `chunk_size` and the dedup window, not on the size of the export.
+    """
+    rows = iter(rows)
+    head = list(itertools.islice(rows, 5))
+    if not head:
+        return
+
+    # Find header row: a layout seen before, else the first row with ≥3 non-empty cells
+    header_idx = next((i for i, row in enumerate(head) if column_mappings.is_known(row, "bank_csv")), None)
+    if header_idx is None:
+        header_idx = 0
+        for i, row in enumerate(head):
+            if len([c for c in row if c.strip()]) >= 3:
+                header_idx = i
+                break
+
+    cols = column_mappings.lookup(head[header_idx], "bank_csv")
+    if cols is None:
+        return
+    date_col, amt_col, desc_col = cols.date, cols.amount, cols.detail
+
+    seen = seen if seen is not None else _BoundedSeen(_DEDUP_WINDOW)
+    min_len = max(filter(None, [date_col, amt_col, desc_col or 0]))
+    parse_date, parse_amount = _date_column(), _amount_column()
+    chunk = []
+    for row in itertools.chain(head[header_idx + 1:], rows):
+        if len(row) <= min_len:
             continue
-        iso_date = _parse_date(row[date_col])
-        amount   = _parse_amount(row[amt_col])
+        iso_date = parse_date(row[date_col])
+        amount   = parse_amount(row[amt_col])
         desc     = row[desc_col].strip() if desc_col is not None else "—"
         if iso_date and amount and amount > 0:
-            transactions.append({
+            txn = {
                 "date": iso_date,
                 "amount": amount,
                 "description": desc,
                 "source": "bank_statement",
-            })
-    return _deduplicate(transactions, lambda t: (t["date"], t["amount"], t["description"][:40]))
+            }
+            if seen.add(_txn_key(txn)):
+                chunk.append(txn)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parse_csv_transactions(rows: Iterable[List[str]]) -> list:
+    """Collect every chunk from _iter_csv_transactions into one list."""
+    return [t for chunk in _iter_csv_transactions(rows) for t in chunk]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Type-directed extractor dispatch
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Field → extractor.  Called as fn(text, tables, tokens, full): with full=False
+# scalar fields take only explicitly labelled values (no largest-amount guess)
+# and the line-scanning list extractors are skipped.
+_FIELD_EXTRACTORS: Dict[str, Callable[[str, List, _DocTokens, bool], object]] = {
+    "salary":            lambda text, tables, tokens, full: _extract_salary(text, tokens, full),
+    "rent_paid":         lambda text, tables, tokens, full: _extract_rent(text, tokens, full),
+    "interest_income":   lambda text, tables, tokens, full: _extract_interest_income(text, tokens, full),
+    "annual_savings":    lambda text, tables, tokens, full: _extract_annual_savings(text, tokens, full),
+    "capital_gains":     lambda text, tables, tokens, full: _extract_capital_gains(text, tokens, full),
+    "bank_transactions": lambda text, tables, tokens, full:
+        _extract_bank_transactions(text, tables, tokens.keywords) if full else [],
+    "emi_payments":      lambda text, tables, tokens, full:
+        _extract_emi_payments(text, tables, tokens.keywords) if full else [],
+    "other_spendings":   lambda text, tables, tokens, full:
+        _extract_other_spendings(text, tables, tokens.keywords) if full else [],
+}
+
+# Document type → fields that get the full extractor.  Every other scalar
+# field only gets the cheap labelled-value pass.
+_TYPE_EXTRACTORS: Dict[str, frozenset] = {
+    "Salary Slips":                   frozenset({"salary"}),
+    "Bank Statements":                frozenset({"bank_transactions", "emi_payments", "interest_income"}),
+    "Rent Receipts":                  frozenset({"rent_paid"}),
+    "Monthly EMI":                    frozenset({"emi_payments"}),
+    "Interest Income (FD, Savings)":  frozenset({"interest_income"}),
+    "Capital Gains (Stocks, MFs)":    frozenset({"capital_gains"}),
+    "Annual Savings / Investments":   frozenset({"annual_savings"}),
+    "Other Spending Proofs":          frozenset({"other_spendings"}),
+}
+
+
+def _run_extractors(
+    doc_type: str, text: str, tables: List, tokens: _DocTokens, row_based: bool = False,
+) -> Dict[str, object]:
+    """
+    Run the extractors registered for `doc_type` in full and the rest in
+    labelled-only mode.  EXTRACTION_EXHAUSTIVE runs every extractor in full.
+    `row_based` documents (CSV / XLSX) have their transactions parsed from
+    rows, so the text line scan for them is never run.
+    """
+    if settings.EXTRACTION_EXHAUSTIVE:
+        selected = set(_FIELD_EXTRACTORS)
+    else:
+        selected = set(_TYPE_EXTRACTORS.get(doc_type, ()))
+    if row_based:
+        selected.discard("bank_transactions")
+    return {
+        name: extractor(text, tables, tokens, name in selected)
+        for name, extractor in _FIELD_EXTRACTORS.items()
+    }
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Public API
 # ─────────────────────────────────────────────────────────────────────────────
 
-def process_document(file_path: str, filename: str) -> dict:
+def process_document(source: DocumentSource, filename: str) -> dict:
     """
     Entry point called by the upload background task.
 
+    `source` is the path of an uploaded file, or the upload itself as bytes /
+    bytearray / memoryview / a binary file object — in-memory uploads are
+    parsed without ever being written to disk.
+
     Steps:
-      1. Extract raw text / tables / CSV rows from the file.
+      1. Extract raw text / tables / CSV rows from the document.
       2. Classify the document type by keyword density.
-      3. Run targeted field extractors.
+      3. Run the extractors registered for that type in full, and cheap
+         labelled-value passes for every other scalar field.
       4. Merge results into the canonical ExtractionResult JSON schema.
-      5. Delete the raw file from disk (privacy).
-      6. Return the structured dict plus lightweight metadata.
+      5. Delete the raw file from disk, if there is one (privacy).
+      6. Return the ExtractionResult (as "extraction", not dumped — callers
+         serialise it where it leaves the process) plus lightweight metadata.
     """
     from app.schemas.extraction import (
         ExtractionResult, BankTransaction, EMIPayment,
         OtherSpending, CapitalGains, DocumentMetadata,
     )
 
-    raw = _extract_raw(file_path, filename)
+    source = load_source(source)
+    raw = _extract_raw(source, filename)
     text = raw.text or ""
 
     # Determine parse status
@@ -592,65 +1268,82 @@ def process_document(file_path: str, filename: str) -> dict:
     else:
         doc_status = "parsed"
 
-    doc_type = _classify_document(text) if text.strip() else "Unknown"
-
-    # ── Field extraction ──────────────────────────────────────────────────
-    salary          = _extract_salary(text)           if doc_status != "failed" else None
-    rent_paid       = _extract_rent(text)             if doc_status != "failed" else None
-    interest_income = _extract_interest_income(text)  if doc_status != "failed" else None
-    annual_savings  = _extract_annual_savings(text)   if doc_status != "failed" else None
-    cap_gains_raw   = _extract_capital_gains(text)    if doc_status != "failed" else {"stocks": None, "mutual_funds": None}
+    # One tokenizer pass, shared by the classifier and every extractor below
+    tokens = _DocTokens(text)
+    doc_type = _classify_document(text, tokens.keywords) if text.strip() else "Unknown"
 
-    # Bank transactions — prefer CSV row-based parser when available
-    if raw.csv_rows:
-        txn_dicts = _parse_csv_transactions(raw.csv_rows)
+    # ── Field extraction (full extractors only for this doc_type) ─────────
+    if doc_status != "failed":
+        fields = _run_extractors(doc_type, text, raw.tables, tokens, raw.sheets is not None)
     else:
-        txn_dicts = _extract_bank_transactions(text, raw.tables)
-
-    emi_dicts      = _extract_emi_payments(text, raw.tables) if doc_status != "failed" else []
-    spending_dicts = _extract_other_spendings(text, raw.tables) if doc_status != "failed" else []
+        fields = {
+            "salary": None, "rent_paid": None, "interest_income": None, "annual_savings": None,
+            "capital_gains": {"stocks": None, "mutual_funds": None},
+            "bank_transactions": [], "emi_payments": [], "other_spendings": [],
+        }
+
+    # Bank transactions — row-based sources (CSV / XLSX) are streamed chunk
+    # by chunk straight into schema objects; documents use the text/table parser
+    if raw.sheets is not None:
+        bank_transactions = []
+        seen = _BoundedSeen(_DEDUP_WINDOW)
+        try:
+            for rows in raw.sheets():
+                for chunk in _iter_csv_transactions(rows, seen):
+                    bank_transactions.extend(BankTransaction(**t) for t in chunk)
+        except Exception as e:
+            logger.warning("Row streaming failed for %s: %s", filename, e)
+            if doc_status == "parsed":
+                doc_status = "partial"      # rows after the failure are missing
+    else:
+        bank_transactions = [BankTransaction(**t) for t in fields["bank_transactions"]]
 
     # ── Build typed schema objects ─────────────────────────────────────────
-    bank_transactions = [
-        BankTransaction(**t) for t in txn_dicts
-    ]
     emi_payments = [
-        EMIPayment(**e) for e in emi_dicts
+        EMIPayment(**e) for e in fields["emi_payments"]
     ]
     other_spendings = [
-        OtherSpending(**s) for s in spending_dicts
+        OtherSpending(**s) for s in fields["other_spendings"]
     ]
     capital_gains = CapitalGains(
-        stocks=cap_gains_raw["stocks"],
-        mutual_funds=cap_gains_raw["mutual_funds"],
+        stocks=fields["capital_gains"]["stocks"],
+        mutual_funds=fields["capital_gains"]["mutual_funds"],
     )
     metadata = DocumentMetadata(document_type=doc_type, status=doc_status)
 
     result = ExtractionResult(
-        salary=salary,
+        salary=fields["salary"],
         bank_transactions=bank_transactions,
-        rent_paid=rent_paid,
+        rent_paid=fields["rent_paid"],
         emi_payments=emi_payments,
-        interest_income=interest_income,
+        interest_income=fields["interest_income"],
         capital_gains=capital_gains,
-        annual_savings=annual_savings,
+        annual_savings=fields["annual_savings"],
         other_spendings=other_spendings,
         document_metadata=[metadata],
     )
 
     # ── Privacy: delete raw file from disk ────────────────────────────────
-    try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        deleted_from_disk = True
-    except Exception as del_err:
-        logger.warning("Could not delete uploaded file %s: %s", file_path, del_err)
-        deleted_from_disk = False
+    deleted_from_disk = delete_upload(source)
 
     return {
         "filename": filename,
         "status": doc_status,
         "document_type": doc_type,
         "deleted_from_disk": deleted_from_disk,
-        "extraction": result.model_dump(),
+        "extraction": result,
     }
+
+
+def delete_upload(source: DocumentSource) -> bool:
+    """Remove an uploaded file from disk (privacy).  Returns False if it could not be removed."""
+    if not isinstance(source, str):
+        return True                 # in-memory upload — never written to disk
+    file_path = source
+    try:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        return True
+    except Exception as del_err:
+        logger.warning("Could not delete uploaded file %s: %s", file_path, del_err)
+        return False
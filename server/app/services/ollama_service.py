@@ -19,6 +19,9 @@ from typing import Any, Dict, Optional
 
 import httpx
 
+from app.schemas.extraction import ExtractionResult
+from app.schemas.tax_policy import ActivePolicyContext
+
 logger = logging.getLogger(__name__)
 
 # Ollama default endpoint — override via OLLAMA_HOST env var in production
@@ -36,13 +39,15 @@ def is_ollama_available() -> bool:
 
 
 def generate_financial_insights(
-    extraction_summary: Dict[str, Any],
+    extraction: ExtractionResult,
     calculations: Dict[str, Any],
-    policy_context: Dict[str, Any],
+    policy: Optional[ActivePolicyContext],
     document_types: list[str],
 ) -> Dict[str, Any]:
     """
     Call Ollama with the structured financial context and return parsed insights.
+    `extraction` and `policy` are the pipeline's validated models, read as
+    they are; with no policy the prompt falls back to FY 2025-26 defaults.
 
     Returns
     -------
@@ -62,24 +67,28 @@ def generate_financial_insights(
         return _pending_response()
 
     # ── Build prompt ──────────────────────────────────────────────────────────
-    fy           = policy_context.get("financial_year", "FY 2025-26")
-    policy_id    = policy_context.get("policy_id", "unknown")
-    std_ded      = policy_context.get("standard_deduction", 75000)
-    ded_limits   = policy_context.get("deduction_limits", {})
-    old_rebate   = policy_context.get("old_regime", {}).get("rebate_limit", 500000)
-    new_rebate   = policy_context.get("new_regime", {}).get("rebate_limit", 1200000)
+    if policy is not None:
+        fy           = policy.financial_year
+        policy_id    = policy.policy_id
+        std_ded      = policy.standard_deduction
+        ded_limits   = policy.deduction_limits
+        old_rebate   = policy.old_regime.get("rebate_limit", 500000)
+        new_rebate   = policy.new_regime.get("rebate_limit", 1200000)
+    else:
+        fy, policy_id, std_ded, ded_limits = "FY 2025-26", "unknown", 75000, {}
+        old_rebate, new_rebate = 500000, 1200000
 
     gross_income = calculations.get("gross_income", 0)
     old_tax      = calculations.get("old_regime", {}).get("tax_liability", 0)
     new_tax      = calculations.get("new_regime", {}).get("tax_liability", 0)
     recommendation = calculations.get("recommendation", "Unknown")
 
-    salary        = extraction_summary.get("salary")
-    rent_paid     = extraction_summary.get("rent_paid")
-    interest      = extraction_summary.get("interest_income")
-    annual_savings = extraction_summary.get("annual_savings")
-    emi_count     = len(extraction_summary.get("emi_payments", []))
-    bank_txn_count = len(extraction_summary.get("bank_transactions", []))
+    salary        = extraction.salary
+    rent_paid     = extraction.rent_paid
+    interest      = extraction.interest_income
+    annual_savings = extraction.annual_savings
+    emi_count     = len(extraction.emi_payments)
+    bank_txn_count = len(extraction.bank_transactions)
 
     prompt = f"""You are a professional Indian tax advisor assistant for TaxMate.
 You have been given verified financial data extracted from the user's uploaded documents.
@@ -0,0 +1,268 @@
+"""
+TaxMate — PDF Extraction Backends
+=================================
+Raw page extraction (text layer, tables, "has images" flag) behind one small
+interface, so ocr_service can route each document to the cheapest backend
+that is accurate enough for it.
+
+Backends
+--------
+pdfplumber — text + lattice tables from ruling lines.  Accurate, slowest.
+pdfium     — text layer only, via pypdfium2 (already a pdfplumber
+             dependency).  Tens of times faster; no tables.
+camelot    — lattice tables from camelot-py plus the pdfium text layer, for
+             ruled statements.  Needs camelot-py[cv] and Ghostscript.
+
+Every backend returns one PageResult per requested page, and opens its own
+handle on the source — a file path, or the document's bytes for uploads kept
+in memory — so shards can run in pool worker processes.
+
+PDFium is not thread-safe — not even across different documents — so every
+call into it in a process holds PDFIUM_LOCK.  Scheduler threads parsing
+small PDFs inline therefore take turns on pdfium; sharded parses run in
+pool processes, each with its own PDFium and its own lock.
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import os
+import tempfile
+import threading
+from typing import BinaryIO, Dict, List, Tuple, Union
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# ── Optional heavy deps (graceful fallback if not installed) ──────────────────
+try:
+    import pdfplumber  # type: ignore
+    _PDFPLUMBER_OK = True
+except ImportError:
+    _PDFPLUMBER_OK = False
+
+try:
+    import pypdfium2 as pdfium  # type: ignore
+    import pypdfium2.raw as pdfium_c  # type: ignore
+    _PDFIUM_OK = True
+except ImportError:
+    _PDFIUM_OK = False
+
+try:
+    import camelot  # type: ignore
+    _CAMELOT_OK = True
+except ImportError:
+    _CAMELOT_OK = False
+
+# (page index, text layer, tables, page has embedded images)
+PageResult = Tuple[int, str, List[List[List[str]]], bool]
+
+# A document on disk (path) or in memory (bytes)
+Source = Union[str, bytes]
+
+# Held around every pypdfium2 call in this process (ocr_service's rasterizer too)
+PDFIUM_LOCK = threading.RLock()
+
+
+def as_file(source: Source) -> Union[str, BinaryIO]:
+    """Something pdfplumber / Pillow / openpyxl can open: the path, or a fresh BytesIO."""
+    return source if isinstance(source, str) else io.BytesIO(source)
+
+
+class PdfBackend:
+    """Interface every PDF backend implements."""
+
+    name = ""
+    extracts_tables = False
+
+    @property
+    def available(self) -> bool:
+        raise NotImplementedError
+
+    def page_count(self, source: Source) -> int:
+        raise NotImplementedError
+
+    def extract_pages(self, source: Source, page_indexes: List[int]) -> List[PageResult]:
+        raise NotImplementedError
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# pdfplumber
+# ─────────────────────────────────────────────────────────────────────────────
+
+_TABLE_TOL = 3      # pdfplumber's default snap / join / intersection tolerance (pt)
+
+
+def _ruling_levels(edges: List[dict], pos: str, start: str, end: str) -> List[Tuple[float, float, float, float]]:
+    """
+    Collapse parallel edges that pdfplumber would snap together into levels of
+    (first position, last position, extent start, extent end).  Extents are
+    unioned, so a level never crosses fewer rulings than pdfplumber's joined
+    segments would.
+    """
+    levels: List[List[float]] = []
+    for e in sorted(edges, key=lambda e: e[pos]):
+        if levels and e[pos] - levels[-1][1] <= _TABLE_TOL:
+            level = levels[-1]
+            level[1] = e[pos]
+            level[2] = min(level[2], e[start])
+            level[3] = max(level[3], e[end])
+        else:
+            levels.append([e[pos], e[pos], e[start], e[end]])
+    return [tuple(level) for level in levels]
+
+
+def may_have_tables(page) -> bool:
+    """
+    Cheap pre-check before page.extract_tables().  The default (lattice) table
+    finder builds cells only from ruling lines, and every table consumer reads
+    a header row plus data rows, so a useful table needs three horizontal
+    rulings that each cross at least two vertical ones.  Text-only pages and
+    pages with just a frame or a few underlines skip table extraction.
+
+    It runs on every page of every document: it costs a fraction of a
+    millisecond even on a ruled page, against tens of milliseconds for
+    extract_tables, so short documents have nothing to gain from skipping it
+    (benchmarks/bench_table_precheck.py reports both).
+    """
+    if settings.OCR_PDF_FORCE_TABLES:
+        return True
+    edges = page.edges
+    h_edges = [e for e in edges if e["orientation"] == "h"]
+    v_edges = [e for e in edges if e["orientation"] == "v"]
+    if len(h_edges) < 3 or len(v_edges) < 2:
+        return False
+
+    rows = _ruling_levels(h_edges, "top", "x0", "x1")
+    cols = _ruling_levels(v_edges, "x0", "top", "bottom")
+    tol = _TABLE_TOL
+    ruled_rows = 0
+    for y0, y1, left, right in rows:
+        crossings = sum(
+            1 for x0, x1, top, bottom in cols
+            if left - tol <= x1 and x0 <= right + tol and top - tol <= y1 and y0 <= bottom + tol
+        )
+        if crossings >= 2:
+            ruled_rows += 1
+            if ruled_rows >= 3:
+                return True
+    return False
+
+
+class PdfPlumberBackend(PdfBackend):
+    name = "pdfplumber"
+    extracts_tables = True
+
+    @property
+    def available(self) -> bool:
+        return _PDFPLUMBER_OK
+
+    def page_count(self, source: Source) -> int:
+        with pdfplumber.open(as_file(source)) as pdf:
+            return len(pdf.pages)
+
+    def extract_pages(self, source: Source, page_indexes: List[int]) -> List[PageResult]:
+        results: List[PageResult] = []
+        with pdfplumber.open(as_file(source), pages=[i + 1 for i in page_indexes]) as pdf:
+            for idx, page in zip(page_indexes, pdf.pages):
+                tables = (page.extract_tables() or []) if may_have_tables(page) else []
+                results.append((idx, page.extract_text() or "", tables, bool(page.images)))
+                page.flush_cache()
+        return results
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# pypdfium2 (text layer only)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _pdfium_page(page) -> Tuple[str, bool]:
+    """Text layer (with \\n line breaks, like pdfplumber) and image flag of one page."""
+    textpage = page.get_textpage()
+    try:
+        text = textpage.get_text_range().replace("\r\n", "\n")
+    finally:
+        textpage.close()
+    has_images = next(iter(page.get_objects(filter=(pdfium_c.FPDF_PAGEOBJ_IMAGE,))), None) is not None
+    return text, has_images
+
+
+class PdfiumTextBackend(PdfBackend):
+    name = "pdfium"
+
+    @property
+    def available(self) -> bool:
+        return _PDFIUM_OK
+
+    def page_count(self, source: Source) -> int:
+        with PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(source)
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+
+    def extract_pages(self, source: Source, page_indexes: List[int]) -> List[PageResult]:
+        results: List[PageResult] = []
+        with PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(source)
+            try:
+                for idx in page_indexes:
+                    page = pdf[idx]
+                    try:
+                        text, has_images = _pdfium_page(page)
+                    finally:
+                        page.close()
+                    results.append((idx, text, [], has_images))
+            finally:
+                pdf.close()
+        return results
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# camelot (lattice tables) + pdfium text
+# ─────────────────────────────────────────────────────────────────────────────
+
+class CamelotLatticeBackend(PdfiumTextBackend):
+    name = "camelot"
+    extracts_tables = True
+
+    @property
+    def available(self) -> bool:
+        return _CAMELOT_OK and _PDFIUM_OK
+
+    def extract_pages(self, source: Source, page_indexes: List[int]) -> List[PageResult]:
+        pages = super().extract_pages(source, page_indexes)
+        tables: Dict[int, List[List[List[str]]]] = {}
+        pages_arg = ",".join(str(i + 1) for i in page_indexes)
+        if isinstance(source, str):
+            found = camelot.read_pdf(source, pages=pages_arg, flavor="lattice")
+        else:
+            # camelot only reads from a path — give in-memory documents a
+            # private temp file for the duration of the call
+            fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(source)
+                found = camelot.read_pdf(tmp_path, pages=pages_arg, flavor="lattice")
+            finally:
+                os.remove(tmp_path)
+        for table in found:
+            tables.setdefault(int(table.page) - 1, []).append(table.df.astype(str).values.tolist())
+        return [(idx, text, tables.get(idx, []), has_images) for idx, text, _, has_images in pages]
+
+
+BACKENDS: Dict[str, PdfBackend] = {
+    backend.name: backend
+    for backend in (PdfPlumberBackend(), PdfiumTextBackend(), CamelotLatticeBackend())
+}
+
+
+def first_available(names) -> PdfBackend:
+    """The first backend in `names` that can run here."""
+    for name in names:
+        backend = BACKENDS.get(name)
+        if backend is not None and backend.available:
+            return backend
+    raise RuntimeError(f"no PDF backend available among {', '.join(names)}")
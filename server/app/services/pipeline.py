@@ -7,31 +7,69 @@ Stages (in order)
 1. OCR      — extract structured financial data from the uploaded file
 2. validate — ensure at least one financial field exists + doc status is valid
 3. calculate — run TaxEngine with the ACTIVE policy
-4. analyze  — run AI reasoning engine + Ollama (degrades gracefully)
-5. complete — all data stored; dashboard unlocked for this user
-
-The pipeline state is stored in USER_PIPELINE_RESULTS, keyed by
-(user_id, task_id).  Downstream endpoints read from this dict.
+4. analyze  — run the rule-based AI reasoning engine
+5. complete — calculations + analysis stored; dashboard unlocked for this user
+
+Insights (follow-up job)
+------------------------
+Ollama insights can take up to a minute, so they are not part of the path to
+"complete".  The executor schedules run_insight_stage as a separate job once
+the pipeline is complete; it only touches the record's insights fields:
+insights_status  queued → running → complete | pending (Ollama unavailable) | failed
+
+The pipeline state is kept in result_store (see services/result_store.py),
+keyed by (user_id, task_id).  Downstream endpoints read from the store.
+
+Checkpoints
+-----------
+Each stage's output is written to the record as soon as it exists, and the
+record's "checkpoint" field names the last one a resumed run can start from:
+  extracted  — document_type + extraction stored; OCR never runs again
+  calculated — calculations + policy_id stored as well
+  (analysis is written together with "complete")
+run_extraction_stages reads the checkpoint first, so a task resumed after a
+restart (services/recovery.py) or redelivered by Celery only re-runs the
+stages after it.  lease_owner / lease_expires say which process is running
+the task; recovery takes over tasks whose lease lapsed.
+
+Hand-offs
+---------
+Stages pass one validated, frozen ExtractionResult along — inside an
+ExtractedDocument (stages 1–2 → 3) and an InsightRequest (→ insights) —
+instead of re-dumping and rebuilding it at every step.  It is serialised
+only where it leaves the process: once per task for the record and the
+extraction cache, and via to_payload() for a Celery hand-off.
 
 Fail-safe rules (enforced here)
 --------------------------------
 - NEVER show data without OCR + parsing   → gate at stage "validate"
 - NEVER run AI before structured data     → gate at stage "calculate"
 - NEVER unlock dashboard on upload alone  → only "complete" unlocks
-- Upload ≠ Processing ≠ Insights
+- Upload ≠ Processing ≠ Insights        → insights never block "complete"
 """
 
 from __future__ import annotations
 
 import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
-from app.services.ocr_service import process_document
+from app.core.config import settings
+from app.schemas.extraction import ExtractionResult
+from app.schemas.tax_policy import ActivePolicyContext
+from app.services.extraction_cache import extraction_cache, source_digest
+from app.services.ocr_service import DocumentSource, delete_upload, load_source, process_document
+from app.services.pipeline_metrics import pipeline_metrics
+from app.services.result_store import result_store
 from app.services.tax_engine import TaxEngine
-from app.services.policy_engine import get_active_context
+from app.services.policy_engine import PolicyNotFoundError, get_active_context, get_policy
 from app.services.ollama_service import generate_financial_insights
 
 logger = logging.getLogger(__name__)
@@ -46,44 +84,219 @@ STAGE_ANALYZING  = "analyzing"
 STAGE_COMPLETE   = "complete"
 STAGE_FAILED     = "failed"
 
+# Timed follow-up after "complete" (the Ollama call); never a pipeline_stage value
+STAGE_INSIGHTS   = "insights"
+
+# insights_status values set here; "complete" / "pending" come from ollama_service
+INSIGHTS_QUEUED  = "queued"
+INSIGHTS_RUNNING = "running"
+INSIGHTS_FAILED  = "failed"
+
+# checkpoint values — the last stage whose output the record holds
+CHECKPOINT_EXTRACTED  = "extracted"
+CHECKPOINT_CALCULATED = "calculated"
+
+# lease_owner of the tasks this process runs
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
 
-# ── In-memory result store ─────────────────────────────────────────────────────
-# { user_id (int) → { task_id (str) → PipelineResult (dict) } }
-USER_PIPELINE_RESULTS: Dict[int, Dict[str, Any]] = {}
 
+# ── Result store access ────────────────────────────────────────────────────────
+# These block on the store (SQL / Redis round trips): async code calls them
+# through run_in_threadpool.
 
-def _store(user_id: int, task_id: str, result: Dict[str, Any]) -> None:
-    if user_id not in USER_PIPELINE_RESULTS:
-        USER_PIPELINE_RESULTS[user_id] = {}
-    USER_PIPELINE_RESULTS[user_id][task_id] = result
+def discard_record(user_id: int, task_id: str) -> None:
+    """Drop a task that was recorded but never scheduled (e.g. queue full)."""
+    result_store.delete(user_id, task_id)
 
 
 def _update(user_id: int, task_id: str, **kwargs: Any) -> None:
-    existing = USER_PIPELINE_RESULTS.get(user_id, {}).get(task_id, {})
-    existing.update(kwargs)
-    _store(user_id, task_id, existing)
+    """Record stage progress; the store writes only the fields that changed."""
+    result_store.update(user_id, task_id, kwargs)
 
 
-def _fail(user_id: int, task_id: str, reason: str) -> None:
+def _fail(user_id: int, task_id: str, reason: str, **fields: Any) -> None:
     _update(
         user_id, task_id,
         pipeline_stage=STAGE_FAILED,
         error=reason,
         completed_at=datetime.now(timezone.utc).isoformat(),
+        **fields,
     )
+    pipeline_metrics.task_finished(STAGE_FAILED)
     logger.warning("Pipeline failed for task %s: %s", task_id, reason)
 
 
+def record_failure(user_id: int, task_id: str, reason: str) -> None:
+    """Mark a task failed from outside the stage functions (e.g. a crashed worker)."""
+    _fail(user_id, task_id, reason)
+
+
+def record_insights_failure(user_id: int, task_id: str, reason: str) -> None:
+    """Mark the insights follow-up failed; the completed pipeline itself is left alone."""
+    _update(user_id, task_id, insights_status=INSIGHTS_FAILED, insights_error=reason)
+    logger.warning("Insights failed for task %s: %s", task_id, reason)
+
+
+# ── Stage timing ───────────────────────────────────────────────────────────────
+
+class StageClock:
+    """
+    Times the stages of one task.  start() closes the running stage — its
+    {"started_at", "ended_at", "seconds"} entry goes into `timings`, with the
+    duration taken from the monotonic clock — and opens the next.  Timings
+    ride along on the record writes the stages make anyway (as
+    stage_timings) and feed pipeline_metrics.  Use as a context manager so a
+    crash still closes the running stage.
+    """
+
+    def __init__(
+        self,
+        user_id: int,
+        task_id: str,
+        file_type: str,
+        document_type: Optional[str] = None,
+        timings: Optional[Dict[str, Dict[str, float]]] = None,
+    ):
+        self.user_id = user_id
+        self.task_id = task_id
+        self.file_type = file_type
+        self.document_type = document_type
+        self.timings: Dict[str, Dict[str, float]] = dict(timings or {})
+        self._stage: Optional[str] = None
+        self._started_at = 0.0
+        self._start = 0.0
+
+    def __enter__(self) -> "StageClock":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def queued_since(self, queued_at: Optional[float]) -> None:
+        """Record the wait between upload acceptance (epoch seconds) and now."""
+        if queued_at is None:
+            return
+        now = time.time()
+        self.timings["queued"] = {"started_at": queued_at, "ended_at": now, "seconds": round(now - queued_at, 6)}
+        pipeline_metrics.queue_wait(now - queued_at, self.file_type)
+
+    def start(self, stage: str, **fields: Any) -> None:
+        """Close the running stage, open `stage`, and write `fields` (if any) with the timings."""
+        self.stop()
+        self._stage, self._started_at, self._start = stage, time.time(), time.perf_counter()
+        pipeline_metrics.stage_started(stage)
+        if fields:
+            _update(self.user_id, self.task_id, stage_timings=dict(self.timings), **fields)
+
+    def stop(self) -> None:
+        if self._stage is None:
+            return
+        seconds = time.perf_counter() - self._start
+        self.timings[self._stage] = {
+            "started_at": self._started_at,
+            "ended_at":   self._started_at + seconds,
+            "seconds":    round(seconds, 6),
+        }
+        pipeline_metrics.stage_finished(self._stage, seconds, self.document_type or "Unknown", self.file_type)
+        self._stage = None
+
+    def fail(self, reason: str) -> None:
+        self.stop()
+        _fail(self.user_id, self.task_id, reason, stage_timings=dict(self.timings))
+
+    def finish(self, **fields: Any) -> None:
+        """Close the running stage and write `fields` with the timings."""
+        self.stop()
+        _update(self.user_id, self.task_id, stage_timings=dict(self.timings), **fields)
+
+    def complete(self, **fields: Any) -> None:
+        self.finish(
+            pipeline_stage=STAGE_COMPLETE,
+            completed_at=datetime.now(timezone.utc).isoformat(),
+            **fields,
+        )
+        pipeline_metrics.task_finished(STAGE_COMPLETE)
+
+
+# ── Stage hand-offs ────────────────────────────────────────────────────────────
+
+def _shallow_dict(obj: Any) -> Dict[str, Any]:
+    # dataclasses.asdict would deep-copy the ExtractionResult on the way
+    return {name: getattr(obj, name) for name in obj.__dataclass_fields__}
+
+
+@dataclass(frozen=True)
+class ExtractedDocument:
+    """Stages 1–2 → 3: the validated extraction, plus checkpointed calculations when resumed."""
+
+    document_type: str
+    extraction: ExtractionResult
+    file_type: str
+    stage_timings: Dict[str, Dict[str, float]]
+    calculations: Optional[Dict[str, Any]] = None
+    policy_id: Optional[int] = None
+
+    def to_payload(self) -> Dict[str, Any]:
+        """JSON-safe form, for a Celery hand-off."""
+        return {**_shallow_dict(self), "extraction": self.extraction.model_dump(mode="json")}
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "ExtractedDocument":
+        return cls(**{**payload, "extraction": ExtractionResult.model_validate(payload["extraction"])})
+
+
+@dataclass(frozen=True)
+class InsightRequest:
+    """Stage 5 → insights follow-up: everything generate_financial_insights reads."""
+
+    extraction: ExtractionResult
+    calculations: Dict[str, Any]
+    policy: Optional[ActivePolicyContext]
+    document_types: Tuple[str, ...]
+    file_type: str
+    stage_timings: Dict[str, Dict[str, float]]
+
+    def to_payload(self) -> Dict[str, Any]:
+        """JSON-safe form, for a Celery hand-off."""
+        return {
+            **_shallow_dict(self),
+            "extraction": self.extraction.model_dump(mode="json"),
+            "policy":     self.policy.model_dump(mode="json") if self.policy else None,
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "InsightRequest":
+        policy = payload.get("policy")
+        return cls(**{
+            **payload,
+            "extraction":     ExtractionResult.model_validate(payload["extraction"]),
+            "policy":         ActivePolicyContext.model_validate(policy) if policy else None,
+            "document_types": tuple(payload.get("document_types") or ()),
+        })
+
+
+def lease_fields() -> Dict[str, Any]:
+    """Record fields claiming a task for this process for the next PIPELINE_LEASE_SECONDS."""
+    return {"lease_owner": INSTANCE_ID, "lease_expires": time.time() + settings.PIPELINE_LEASE_SECONDS}
+
+
+def _file_type(filename: str) -> str:
+    return os.path.splitext(filename)[1].lower().lstrip(".") or "unknown"
+
+
 def initial_record(
     user_id: int,
     task_id: str,
     filename: str,
+    digest: Optional[str] = None,
 ) -> None:
     """
     Create the initial "queued" record immediately after upload acceptance.
-    The frontend can poll this right away.
+    The frontend can poll this right away.  `digest` (the upload's SHA-256)
+    lets a resumed task find its extraction in the cache once the upload
+    itself is gone.
     """
-    _store(user_id, task_id, {
+    result_store.create(user_id, task_id, {
         "task_id":        task_id,
         "filename":       filename,
         "document_type":  None,
@@ -95,143 +308,372 @@ def initial_record(
         "error":          None,
         "started_at":     datetime.now(timezone.utc).isoformat(),
         "completed_at":   None,
+        "checkpoint":     None,
+        "source_digest":  digest,
+        **lease_fields(),
     })
 
 
 def run_pipeline(
-    file_path: str,
+    source: Optional[DocumentSource],
     filename: str,
     user_id: int,
     task_id: str,
     db: Session,
+    digest: Optional[str] = None,
+    queued_at: Optional[float] = None,
 ) -> None:
     """
-    Full synchronous pipeline — intended to be called inside a BackgroundTask.
+    Full synchronous pipeline — every stage in the calling thread.
 
     Parameters
     ----------
-    file_path : absolute path to the uploaded file (will be deleted by ocr_service)
+    source    : the upload's bytes (small uploads, never written to disk),
+                the absolute path it was spilled to (deleted by ocr_service),
+                or None when resuming a task whose upload was lost
     filename  : original uploaded filename
     user_id   : authenticated user's DB id
     task_id   : unique task identifier issued at upload time
     db        : SQLAlchemy session (used to resolve the active policy)
+    digest    : SHA-256 of the upload, if already computed while receiving it
+    queued_at : epoch seconds the upload was accepted, for the queue-wait timing
+
+    The scheduler runs the same two halves on separate pools:
+    run_processing_stages (CPU-bound, ends with the task complete) then the
+    run_insight_stage follow-up (Ollama, I/O-bound).
+    The Celery executor splits the first half again, into
+    run_extraction_stages and run_calculation_stages, on its own queues.
+    Every stage is timed into the record's stage_timings and pipeline_metrics.
+    """
+    insight_request = run_processing_stages(source, filename, user_id, task_id, db, digest, queued_at)
+    if insight_request is not None:
+        run_insight_stage(user_id, task_id, insight_request)
+
+
+def run_processing_stages(
+    source: Optional[DocumentSource],
+    filename: str,
+    user_id: int,
+    task_id: str,
+    db: Session,
+    digest: Optional[str] = None,
+    queued_at: Optional[float] = None,
+) -> Optional[InsightRequest]:
+    """
+    Stages 1–5: OCR + extraction, validation, tax calculation and the
+    rule-based analysis; the task is complete when this returns.  Returns the
+    inputs for the insights follow-up, or None if the pipeline failed (the
+    failure is already recorded).
+    """
+    extracted = run_extraction_stages(source, filename, user_id, task_id, digest, queued_at)
+    if extracted is None:
+        return None
+    return run_calculation_stages(user_id, task_id, extracted, db)
+
+
+def run_extraction_stages(
+    source: Optional[DocumentSource],
+    filename: str,
+    user_id: int,
+    task_id: str,
+    digest: Optional[str] = None,
+    queued_at: Optional[float] = None,
+) -> Optional[ExtractedDocument]:
+    """
+    Stages 1–2: OCR + extraction, then validation.  Returns the
+    ExtractedDocument hand-off for run_calculation_stages, or None if a gate
+    failed (the failure is already recorded) or the task has already finished.
+
+    Starts from the record's checkpoint: once the extraction is stored, OCR
+    is skipped (`source` may then be None) and only validation re-runs; at
+    "calculated" the hand-off also carries the stored calculations and
+    policy_id, so stage 3 is skipped too.
     """
+    record = result_store.get(user_id, task_id) or {}
+    if record.get("pipeline_stage") in (STAGE_COMPLETE, STAGE_FAILED):
+        delete_upload(source)
+        return None
+    checkpoint = record.get("checkpoint")
+
+    with StageClock(
+        user_id, task_id, _file_type(filename), record.get("document_type"), record.get("stage_timings"),
+    ) as clock:
+        clock.queued_since(queued_at)
+        if checkpoint is None:
+            validated = _extraction_stages(clock, source, filename, digest or record.get("source_digest"))
+        else:
+            logger.info("[pipeline:%s] Resuming from checkpoint %r", task_id, checkpoint)
+            delete_upload(source)
+            extraction = ExtractionResult.model_validate(record.get("extraction") or {})
+            validated = (record.get("document_type") or "Unknown", extraction) if _validation_stage(clock, extraction) else None
+
+    if validated is None:
+        return None
+    doc_type, extraction = validated
+    resumed = checkpoint == CHECKPOINT_CALCULATED
+    return ExtractedDocument(
+        document_type=doc_type,
+        extraction=extraction,
+        file_type=clock.file_type,
+        stage_timings=dict(clock.timings),
+        calculations=record.get("calculations") if resumed else None,
+        policy_id=record.get("policy_id") if resumed else None,
+    )
+
+
+def _extraction_stages(
+    clock: StageClock,
+    source: Optional[DocumentSource],
+    filename: str,
+    digest: Optional[str],
+) -> Optional[Tuple[str, ExtractionResult]]:
+    user_id, task_id = clock.user_id, clock.task_id
+
+    if source is None and not _extraction_cached(digest):
+        clock.fail("Processing was interrupted and the upload was not kept — please upload the document again.")
+        return None
 
     # ─── Stage 1: OCR + extraction ─────────────────────────────────────────────
-    _update(user_id, task_id, pipeline_stage=STAGE_OCR, ocr_status="running")
+    clock.start(STAGE_OCR, pipeline_stage=STAGE_OCR, ocr_status="running")
     logger.info("[pipeline:%s] Stage 1 — OCR + extraction", task_id)
 
     try:
-        ocr_result = process_document(file_path, filename)
+        ocr_result, extraction_json = _extract_with_cache(source, filename, task_id, digest)
     except Exception as exc:
-        _fail(user_id, task_id, f"OCR crashed: {exc}")
-        return
+        clock.fail(f"OCR crashed: {exc}")
+        return None
 
     doc_type   = ocr_result.get("document_type", "Unknown")
     doc_status = ocr_result.get("status", "failed")   # "parsed" | "partial" | "failed"
-    extraction = ocr_result.get("extraction", {})
+    extraction: ExtractionResult = ocr_result["extraction"]
+    clock.document_type = doc_type
 
     _update(
         user_id, task_id,
         document_type=doc_type,
         ocr_status=doc_status,
-        extraction=extraction,
+        extraction=extraction_json,
+        checkpoint=CHECKPOINT_EXTRACTED if doc_status != "failed" else None,
     )
 
     if doc_status == "failed":
-        _fail(user_id, task_id, "OCR failed — document could not be parsed.")
-        return
+        clock.fail("OCR failed — document could not be parsed.")
+        return None
 
+    if not _validation_stage(clock, extraction):
+        return None
+    return doc_type, extraction
+
+
+def _validation_stage(clock: StageClock, extraction: ExtractionResult) -> bool:
     # ─── Stage 2: Validate structured data ────────────────────────────────────
-    _update(user_id, task_id, pipeline_stage=STAGE_VALIDATING)
-    logger.info("[pipeline:%s] Stage 2 — validation", task_id)
+    clock.start(STAGE_VALIDATING, pipeline_stage=STAGE_VALIDATING)
+    logger.info("[pipeline:%s] Stage 2 — validation", clock.task_id)
 
     if not _has_financial_data(extraction):
-        _fail(
-            user_id, task_id,
+        clock.fail(
             "Document uploaded and parsed but no financial fields were found. "
             "Re-upload a clearer copy or a supported document type.",
         )
-        return
-
-    # ─── Stage 3: Deterministic tax calculation ────────────────────────────────
-    _update(user_id, task_id, pipeline_stage=STAGE_CALCULATING)
-    logger.info("[pipeline:%s] Stage 3 — tax calculation", task_id)
-
-    try:
-        policy_ctx = get_active_context(db)
-    except Exception as exc:
-        # Policy state error — store it but continue (calculations use fallback)
-        logger.warning("[pipeline:%s] Policy error: %s — using fallback slabs", task_id, exc)
-        policy_ctx = None
-
-    calculations = _run_calculations(extraction, policy_ctx)
-    _update(user_id, task_id, calculations=calculations, policy_id=policy_ctx.policy_id if policy_ctx else None)
-
-    # ─── Stage 4: AI reasoning + Ollama ───────────────────────────────────────
-    _update(user_id, task_id, pipeline_stage=STAGE_ANALYZING)
-    logger.info("[pipeline:%s] Stage 4 — AI analysis + Ollama", task_id)
-
-    # 4a. Rule-based analysis (ai_engine — always runs)
-    rule_analysis = _run_ai_engine(extraction, policy_ctx)
+        return False
+    return True
 
-    # 4b. Ollama (optional — degrades gracefully)
-    policy_dict = policy_ctx.model_dump() if policy_ctx else {}
-    doc_types   = [doc_type] if doc_type else []
 
-    ollama_result = generate_financial_insights(
-        extraction_summary=extraction,
+def run_calculation_stages(
+    user_id: int,
+    task_id: str,
+    extracted: ExtractedDocument,
+    db: Session,
+) -> InsightRequest:
+    """
+    Stages 3–5: tax calculation and the rule-based analysis on validated
+    data from run_extraction_stages, then mark the task complete with its
+    insights queued.  Returns the inputs for the insights follow-up.
+    Stage 3 is skipped when the hand-off carries checkpointed calculations.
+    """
+    doc_type     = extracted.document_type
+    extraction   = extracted.extraction
+    calculations = extracted.calculations
+
+    with StageClock(user_id, task_id, extracted.file_type, doc_type, extracted.stage_timings) as clock:
+        if calculations is None:
+            # ─── Stage 3: Deterministic tax calculation ────────────────────────
+            clock.start(STAGE_CALCULATING, pipeline_stage=STAGE_CALCULATING)
+            logger.info("[pipeline:%s] Stage 3 — tax calculation", task_id)
+
+            policy_ctx = _policy_context(db, task_id)
+            calculations = _run_calculations(extraction, policy_ctx)
+            _update(
+                user_id, task_id,
+                calculations=calculations,
+                policy_id=policy_ctx.policy_id if policy_ctx else None,
+                checkpoint=CHECKPOINT_CALCULATED,
+            )
+        else:
+            # Analyse under the policy the checkpointed calculations used
+            policy_ctx = _policy_context(db, task_id, extracted.policy_id)
+
+        # ─── Stage 4: Rule-based AI reasoning ─────────────────────────────────
+        clock.start(STAGE_ANALYZING, pipeline_stage=STAGE_ANALYZING)
+        logger.info("[pipeline:%s] Stage 4 — AI analysis", task_id)
+        rule_analysis = _run_ai_engine(extraction, policy_ctx)
+
+        # ─── Stage 5: Complete — Ollama insights follow separately ───────────
+        clock.complete(analysis=rule_analysis, insights_status=INSIGHTS_QUEUED)
+        logger.info("[pipeline:%s] Pipeline complete ✓ (insights queued)", task_id)
+
+    return InsightRequest(
+        extraction=extraction,
         calculations=calculations,
-        policy_context=policy_dict,
-        document_types=doc_types,
+        policy=policy_ctx,
+        document_types=(doc_type,) if doc_type else (),
+        file_type=clock.file_type,
+        stage_timings=dict(clock.timings),
     )
 
-    _update(
-        user_id, task_id,
-        analysis=rule_analysis,
-        ollama=ollama_result,
-        insights_status=ollama_result.get("status", "pending"),
+
+def resume_insight_request(user_id: int, task_id: str, db: Session) -> Optional[InsightRequest]:
+    """
+    Rebuild the insights follow-up inputs of a complete task from its record
+    (after a restart lost the job), or None if its insights already settled.
+    """
+    record = result_store.get(user_id, task_id)
+    if record is None or record.get("pipeline_stage") != STAGE_COMPLETE:
+        return None
+    if record.get("insights_status") not in (INSIGHTS_QUEUED, INSIGHTS_RUNNING):
+        return None
+    doc_type = record.get("document_type")
+    return InsightRequest(
+        extraction=ExtractionResult.model_validate(record.get("extraction") or {}),
+        calculations=record.get("calculations") or {},
+        policy=_policy_context(db, task_id, record.get("policy_id")),
+        document_types=(doc_type,) if doc_type else (),
+        file_type=_file_type(record.get("filename") or ""),
+        stage_timings=record.get("stage_timings") or {},
     )
 
-    # ─── Stage 5: Complete ────────────────────────────────────────────────────
-    _update(
+
+def run_insight_stage(user_id: int, task_id: str, insight_request: InsightRequest) -> None:
+    """
+    Insights follow-up for a completed task: Ollama (degrades gracefully to
+    "pending").  Writes only the insights fields — pipeline_stage stays
+    "complete" whatever happens here.
+    """
+    document_types = insight_request.document_types
+    with StageClock(
         user_id, task_id,
-        pipeline_stage=STAGE_COMPLETE,
-        completed_at=datetime.now(timezone.utc).isoformat(),
-    )
-    logger.info("[pipeline:%s] Pipeline complete ✓", task_id)
+        insight_request.file_type,
+        document_types[0] if document_types else None,
+        insight_request.stage_timings,
+    ) as clock:
+        clock.start(STAGE_INSIGHTS, insights_status=INSIGHTS_RUNNING)
+        try:
+            ollama_result = generate_financial_insights(
+                extraction=insight_request.extraction,
+                calculations=insight_request.calculations,
+                policy=insight_request.policy,
+                document_types=list(document_types),
+            )
+        except Exception as exc:
+            logger.exception("[pipeline:%s] Insights crashed: %s", task_id, exc)
+            clock.finish(insights_status=INSIGHTS_FAILED, insights_error=f"Insights crashed: {exc}")
+            return
+
+        clock.finish(
+            ollama=ollama_result,
+            insights_status=ollama_result.get("status", "pending"),
+            insights_completed_at=datetime.now(timezone.utc).isoformat(),
+        )
+    logger.info("[pipeline:%s] Insights %s", task_id, ollama_result.get("status", "pending"))
 
 
 # ── Private helpers ────────────────────────────────────────────────────────────
 
-def _has_financial_data(extraction: Dict[str, Any]) -> bool:
+def _extract_with_cache(
+    source: Optional[DocumentSource], filename: str, task_id: str, digest: Optional[str] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Stage 1 with the content-addressed extraction cache in front of it.
+    A hit skips parsing / OCR entirely; a raw file on disk is still deleted.
+    Only parsed / partial results are cached — failures are always retried.
+
+    Returns (ocr_result, extraction_json): ocr_result["extraction"] is the
+    ExtractionResult; extraction_json its one JSON dump, shared by the cache
+    entry and the record.
+    """
+    if not settings.EXTRACTION_CACHE_ENABLED:
+        ocr_result = process_document(source, filename)
+        return ocr_result, ocr_result["extraction"].model_dump(mode="json")
+
+    if source is not None:                  # None: resumed, the cache entry stands in for it
+        source = load_source(source)
+    digest = digest or source_digest(source)
+    cached = extraction_cache.get(digest)
+    if cached is not None:
+        logger.info("[pipeline:%s] Extraction cache hit (%s…)", task_id, digest[:12])
+        extraction_json = cached["extraction"]
+        return {
+            **cached,
+            "extraction":        ExtractionResult.model_validate(extraction_json),
+            "filename":          filename,
+            "deleted_from_disk": delete_upload(source),
+        }, extraction_json
+
+    ocr_result = process_document(source, filename)
+    extraction_json = ocr_result["extraction"].model_dump(mode="json")
+    if ocr_result.get("status") in ("parsed", "partial"):
+        extraction_cache.put(digest, {
+            **{k: v for k, v in ocr_result.items() if k not in ("filename", "deleted_from_disk")},
+            "extraction": extraction_json,
+        })
+    return ocr_result, extraction_json
+
+
+def _extraction_cached(digest: Optional[str]) -> bool:
+    return bool(digest) and settings.EXTRACTION_CACHE_ENABLED and extraction_cache.get(digest) is not None
+
+
+def _policy_context(db: Session, task_id: str, policy_id: Optional[int] = None):
+    """
+    The policy `policy_id` (a resumed task's) or else the active one, as an
+    ActivePolicyContext — None on a policy state error (calculations then
+    use the fallback slabs).
+    """
+    try:
+        if policy_id is not None:
+            try:
+                return ActivePolicyContext(**get_policy(db, policy_id).to_context_dict())
+            except PolicyNotFoundError:
+                logger.warning("[pipeline:%s] Policy %s is gone — using the active policy", task_id, policy_id)
+        return get_active_context(db)
+    except Exception as exc:
+        logger.warning("[pipeline:%s] Policy error: %s — using fallback slabs", task_id, exc)
+        return None
+
+
+def _has_financial_data(extraction: ExtractionResult) -> bool:
     """
     Return True if at least one meaningful financial field is present.
     A document that produces only document_metadata with no figures fails this check.
     """
-    candidates = [
-        extraction.get("salary"),
-        extraction.get("rent_paid"),
-        extraction.get("interest_income"),
-        extraction.get("annual_savings"),
-        extraction.get("bank_transactions"),
-        extraction.get("emi_payments"),
-        extraction.get("other_spendings"),
-    ]
-    cg = extraction.get("capital_gains", {})
-    if isinstance(cg, dict):
-        candidates += [cg.get("stocks"), cg.get("mutual_funds")]
-
-    return any(
-        (v is not None and v != [] and v != {})
-        for v in candidates
-        if v is not None
+    cg = extraction.capital_gains
+    scalars = (
+        extraction.salary,
+        extraction.rent_paid,
+        extraction.interest_income,
+        extraction.annual_savings,
+        cg.stocks,
+        cg.mutual_funds,
+    )
+    return (
+        any(v is not None for v in scalars)
+        or bool(extraction.bank_transactions or extraction.emi_payments or extraction.other_spendings)
     )
 
 
 def _run_calculations(
-    extraction: Dict[str, Any],
-    policy_ctx,   # ActivePolicyContext | None
+    extraction: ExtractionResult,
+    policy_ctx: Optional[ActivePolicyContext],
 ) -> Dict[str, Any]:
     """
     Build income_details and deductions dicts from extraction, then run TaxEngine.
@@ -240,30 +682,27 @@ def _run_calculations(
     income_details: Dict[str, float] = {}
     deductions:     Dict[str, float] = {}
 
-    if extraction.get("salary"):
-        income_details["salary"] = float(extraction["salary"])
+    if extraction.salary:
+        income_details["salary"] = float(extraction.salary)
 
-    if extraction.get("interest_income"):
-        income_details["interest"] = float(extraction["interest_income"])
+    if extraction.interest_income:
+        income_details["interest"] = float(extraction.interest_income)
 
-    cg = extraction.get("capital_gains", {})
-    if isinstance(cg, dict):
-        stocks = cg.get("stocks")
-        mf     = cg.get("mutual_funds")
-        if stocks:
-            income_details["capital_gains_stocks"] = float(stocks)
-        if mf:
-            income_details["capital_gains_mf"] = float(mf)
+    cg = extraction.capital_gains
+    if cg.stocks:
+        income_details["capital_gains_stocks"] = float(cg.stocks)
+    if cg.mutual_funds:
+        income_details["capital_gains_mf"] = float(cg.mutual_funds)
 
-    if extraction.get("annual_savings"):
+    if extraction.annual_savings:
         deductions["80C_savings"] = min(
-            float(extraction["annual_savings"]),
+            float(extraction.annual_savings),
             150000.0,   # hard cap — actual limit from policy used in engine
         )
 
-    if extraction.get("rent_paid") and extraction.get("salary"):
+    if extraction.rent_paid and extraction.salary:
         # Conservative HRA estimate: 40 % of salary or rent paid, whichever is lower
-        hra_estimate = min(float(extraction["rent_paid"]), float(extraction.get("salary", 0)) * 0.40)
+        hra_estimate = min(float(extraction.rent_paid), float(extraction.salary) * 0.40)
         if hra_estimate > 0:
             deductions["hra"] = hra_estimate
 
@@ -291,8 +730,8 @@ def _run_calculations(
 
 
 def _run_ai_engine(
-    extraction: Dict[str, Any],
-    policy_ctx,   # ActivePolicyContext | None
+    extraction: ExtractionResult,
+    policy_ctx: Optional[ActivePolicyContext],
 ) -> Optional[Dict[str, Any]]:
     """
     Run the rule-based ai_engine and return its response as a dict.
@@ -301,44 +740,8 @@ def _run_ai_engine(
     try:
         from app.services.ai_engine import run_analysis
         from app.schemas.analysis import AnalysisRequest
-        from app.schemas.extraction import (
-            ExtractionResult, CapitalGains, DocumentMetadata,
-        )
-
-        cg_raw = extraction.get("capital_gains", {})
-        cg = CapitalGains(
-            stocks=cg_raw.get("stocks") if isinstance(cg_raw, dict) else None,
-            mutual_funds=cg_raw.get("mutual_funds") if isinstance(cg_raw, dict) else None,
-        )
 
-        meta_raw = extraction.get("document_metadata", [])
-        meta_list = []
-        for m in meta_raw:
-            if isinstance(m, dict):
-                meta_list.append(DocumentMetadata(
-                    filename=m.get("filename", "unknown"),
-                    document_type=m.get("document_type", "Unknown"),
-                    status=m.get("status", "failed"),
-                    confidence=m.get("confidence", 0.5),
-                    pages_processed=m.get("pages_processed", 0),
-                ))
-
-        ext_model = ExtractionResult(
-            salary=extraction.get("salary"),
-            bank_transactions=extraction.get("bank_transactions", []),
-            rent_paid=extraction.get("rent_paid"),
-            emi_payments=extraction.get("emi_payments", []),
-            interest_income=extraction.get("interest_income"),
-            capital_gains=cg,
-            annual_savings=extraction.get("annual_savings"),
-            other_spendings=extraction.get("other_spendings", []),
-            document_metadata=meta_list,
-        )
-
-        response = run_analysis(
-            AnalysisRequest(extraction=ext_model),
-            policy=policy_ctx,
-        )
+        response = run_analysis(AnalysisRequest(extraction=extraction), policy=policy_ctx)
         return response.model_dump()
     except Exception as exc:
         logger.exception("AI engine error: %s", exc)
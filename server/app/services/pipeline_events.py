@@ -0,0 +1,211 @@
+"""
+TaxMate — Live Pipeline Events
+==============================
+Pushes pipeline progress to clients instead of having them poll the full
+record.  Every pipeline._update that changes pipeline_stage or
+insights_status makes the result store publish a small event (see
+result_store "Stage events"); this module turns those into per-task streams
+for the SSE and WebSocket endpoints.
+
+One store subscription per process, drained by a single thread, fans events
+out to the asyncio queues of the open streams — an idle stream costs a queue,
+not a thread.
+
+A stream yields (event, data) pairs:
+  stage    — {"task_id", "pipeline_stage", ["queue_position"]}: first the
+             current stage, then every transition
+  ping     — {} every PIPELINE_EVENTS_HEARTBEAT_SECONDS without a transition
+  result   — the full pipeline record, once, at complete / failed
+  insights — {"task_id", "insights_status", "ollama"} once the insights
+             follow-up of a complete task settles; then the stream ends
+
+On each heartbeat the stream also re-reads the field it is waiting on, so it
+still makes progress when a transition was published in a process this one does
+not hear from (the sql and memory stores publish in-process only).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services.result_store import ResultStore, result_store
+
+logger = logging.getLogger(__name__)
+
+_TERMINAL          = ("complete", "failed")
+_INSIGHTS_WAITING  = ("queued", "running")
+
+_PING = object()      # _watch sentinels
+_GONE = object()
+
+
+class TaskNotFoundError(Exception):
+    """Raised when a stream is opened for a task the user does not have."""
+
+
+class PipelineEventHub:
+    """Routes store stage events to the asyncio queues listening on each task."""
+
+    def __init__(self, store: ResultStore):
+        self._store = store
+        self._lock = threading.Lock()
+        self._listeners: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+
+    def listen(self, task_id: str) -> asyncio.Queue:
+        """Queue receiving the task's stage events; call from the event loop."""
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            self._listeners.setdefault(task_id, []).append((asyncio.get_running_loop(), queue))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._pump, name="pipeline-events", daemon=True)
+                self._thread.start()
+        return queue
+
+    def unlisten(self, task_id: str, queue: asyncio.Queue) -> None:
+        with self._lock:
+            listeners = [entry for entry in self._listeners.get(task_id, []) if entry[1] is not queue]
+            if listeners:
+                self._listeners[task_id] = listeners
+            else:
+                self._listeners.pop(task_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tasks":   len(self._listeners),
+                "streams": sum(map(len, self._listeners.values())),
+            }
+
+    def shutdown(self) -> None:
+        self._closed.set()
+
+    def _pump(self) -> None:
+        try:
+            subscription = self._store.subscribe()
+        except Exception as exc:
+            logger.error("Pipeline event subscription unavailable (%s) — streams fall back to heartbeats.", exc)
+            return
+        try:
+            while not self._closed.is_set():
+                try:
+                    event = subscription.get(timeout=1.0)
+                except Exception as exc:
+                    logger.warning("Pipeline event subscription failed: %s — retrying", exc)
+                    self._closed.wait(1.0)
+                    continue
+                if event is None:
+                    continue
+                with self._lock:
+                    listeners = list(self._listeners.get(event.get("task_id"), ()))
+                for loop, queue in listeners:
+                    try:
+                        loop.call_soon_threadsafe(queue.put_nowait, event)
+                    except RuntimeError:        # loop already closed
+                        pass
+        finally:
+            subscription.close()
+
+
+event_hub = PipelineEventHub(result_store)
+
+
+def _stage(record: Dict[str, Any], position: Optional[int]) -> Dict[str, Any]:
+    data = {"task_id": record.get("task_id"), "pipeline_stage": record.get("pipeline_stage")}
+    if position is not None:
+        data["queue_position"] = position
+    return data
+
+
+async def _watch(
+    queue: asyncio.Queue,
+    user_id: int,
+    task_id: str,
+    field: str,
+    value: Any,
+) -> AsyncIterator[Any]:
+    """
+    Yield each new value of the record's `field` — from events, or from a
+    re-read on every heartbeat — plus _PING for quiet heartbeats and _GONE
+    (then stop) if the record disappears.
+    """
+    while True:
+        try:
+            event = await asyncio.wait_for(queue.get(), settings.PIPELINE_EVENTS_HEARTBEAT_SECONDS)
+            if field not in event or event[field] == value:
+                continue
+            value = event[field]
+        except asyncio.TimeoutError:
+            record = await run_in_threadpool(result_store.get, user_id, task_id)
+            if record is None:                      # deleted or expired meanwhile
+                yield _GONE
+                return
+            if record.get(field) == value:
+                yield _PING
+                continue
+            value = record.get(field)
+        yield value
+
+
+async def pipeline_events(
+    user_id: int,
+    task_id: str,
+    queue_position: Optional[Callable[[str], Optional[int]]] = None,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream one task's progress as (event, data) pairs until it completes or
+    fails and its insights have settled.  `queue_position` (task_id →
+    position or None) annotates the initial "queued" stage.  Raises
+    TaskNotFoundError before yielding anything.
+    """
+    queue = event_hub.listen(task_id)          # before the first read, so no transition is missed
+    try:
+        record = await run_in_threadpool(result_store.get, user_id, task_id)
+        if record is None:
+            raise TaskNotFoundError(task_id)
+        stage = record.get("pipeline_stage")
+        position = queue_position(task_id) if queue_position and stage == "queued" else None
+        yield "stage", _stage(record, position)
+
+        if stage not in _TERMINAL:
+            async for stage in _watch(queue, user_id, task_id, "pipeline_stage", stage):
+                if stage is _PING:
+                    yield "ping", {}
+                elif stage is _GONE:
+                    return
+                elif stage in _TERMINAL:
+                    break
+                else:
+                    yield "stage", {"task_id": task_id, "pipeline_stage": stage}
+
+        record = await run_in_threadpool(result_store.get, user_id, task_id)
+        if record is None:
+            return
+        yield "result", record
+
+        insights = record.get("insights_status")
+        if insights not in _INSIGHTS_WAITING:
+            return
+        async for insights in _watch(queue, user_id, task_id, "insights_status", insights):
+            if insights is _PING:
+                yield "ping", {}
+            elif insights is _GONE:
+                return
+            elif insights not in _INSIGHTS_WAITING:
+                break
+        record = await run_in_threadpool(result_store.get, user_id, task_id)
+        if record is not None:
+            yield "insights", {
+                "task_id":         task_id,
+                "insights_status": record.get("insights_status"),
+                "ollama":          record.get("ollama"),
+            }
+    finally:
+        event_hub.unlisten(task_id, queue)
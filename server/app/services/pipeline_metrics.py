@@ -0,0 +1,143 @@
+"""
+TaxMate — Pipeline Metrics
+==========================
+Process-wide timing and throughput metrics for the document pipeline,
+rendered in the Prometheus text exposition format (GET /metrics).
+
+Series
+------
+taxmate_pipeline_stage_seconds{stage,document_type,file_type}   summary
+    Stage durations; quantiles 0.5 / 0.95 / 0.99 over the most recent
+    PIPELINE_METRICS_WINDOW samples of each label set, plus _sum / _count
+    since start.  Stages: ocr, validating, calculating, analyzing, insights.
+taxmate_pipeline_queue_wait_seconds{file_type}                  summary
+    Upload accepted → first stage started.
+taxmate_pipeline_in_flight{stage}                               gauge
+taxmate_pipeline_tasks_total{outcome}                           counter
+    Finished pipelines by outcome (complete / failed).
+
+Every uvicorn worker and Celery worker keeps its own registry; Prometheus
+aggregates _sum / _count across them (quantiles are per process).
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Tuple
+
+from app.core.config import settings
+
+_QUANTILES = (0.5, 0.95, 0.99)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels: str) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _render_labels(labels: Labels, **extra: str) -> str:
+    pairs = list(labels) + sorted(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _quantile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class _Summary:
+    """Sliding-window quantiles plus cumulative sum / count, per label set."""
+
+    def __init__(self, name: str, help_text: str, window: int):
+        self.name = name
+        self.help = help_text
+        self._window = window
+        self._samples: Dict[Labels, Deque[float]] = {}
+        self._sum: Dict[Labels, float] = {}
+        self._count: Dict[Labels, int] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        samples = self._samples.get(labels)
+        if samples is None:
+            samples = self._samples[labels] = deque(maxlen=self._window)
+        samples.append(value)
+        self._sum[labels] = self._sum.get(labels, 0.0) + value
+        self._count[labels] = self._count.get(labels, 0) + 1
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} summary"
+        for labels, samples in sorted(self._samples.items()):
+            ordered = sorted(samples)
+            for q in _QUANTILES:
+                yield f"{self.name}{_render_labels(labels, quantile=str(q))} {_quantile(ordered, q):.6f}"
+            yield f"{self.name}_sum{_render_labels(labels)} {self._sum[labels]:.6f}"
+            yield f"{self.name}_count{_render_labels(labels)} {self._count[labels]}"
+
+
+class _Gauge:
+    def __init__(self, name: str, help_text: str, kind: str = "gauge"):
+        self.name = name
+        self.help = help_text
+        self._kind = kind
+        self._values: Dict[Labels, float] = {}
+
+    def add(self, labels: Labels, delta: float) -> None:
+        self._values[labels] = self._values.get(labels, 0) + delta
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self._kind}"
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_render_labels(labels)} {value:g}"
+
+
+class PipelineMetrics:
+    """Thread-safe registry fed by pipeline.StageClock."""
+
+    def __init__(self, window: int):
+        self._lock = threading.Lock()
+        self._stage_seconds = _Summary(
+            "taxmate_pipeline_stage_seconds", "Pipeline stage duration in seconds.", window,
+        )
+        self._queue_wait = _Summary(
+            "taxmate_pipeline_queue_wait_seconds", "Time from upload accepted to the first stage starting.", window,
+        )
+        self._in_flight = _Gauge("taxmate_pipeline_in_flight", "Pipelines currently in each stage.")
+        self._tasks = _Gauge("taxmate_pipeline_tasks_total", "Finished pipelines by outcome.", kind="counter")
+
+    def stage_started(self, stage: str) -> None:
+        with self._lock:
+            self._in_flight.add(_labels(stage=stage), 1)
+
+    def stage_finished(self, stage: str, seconds: float, document_type: str, file_type: str) -> None:
+        with self._lock:
+            self._in_flight.add(_labels(stage=stage), -1)
+            self._stage_seconds.observe(
+                _labels(stage=stage, document_type=document_type, file_type=file_type), seconds,
+            )
+
+    def queue_wait(self, seconds: float, file_type: str) -> None:
+        with self._lock:
+            self._queue_wait.observe(_labels(file_type=file_type), max(0.0, seconds))
+
+    def task_finished(self, outcome: str) -> None:
+        with self._lock:
+            self._tasks.add(_labels(outcome=outcome), 1)
+
+    def render(self) -> str:
+        with self._lock:
+            lines: List[str] = []
+            for metric in (self._stage_seconds, self._queue_wait, self._in_flight, self._tasks):
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+pipeline_metrics = PipelineMetrics(settings.PIPELINE_METRICS_WINDOW)
@@ -0,0 +1,180 @@
+"""
+TaxMate — Pipeline Recovery
+===========================
+Resumes pipelines that a restart or crash interrupted, from their last
+checkpoint (see services/pipeline.py "Checkpoints"), and clears UPLOAD_DIR of
+uploads nothing will read again.
+
+Runs in the API processes when PIPELINE_EXECUTOR="scheduler".  With Celery,
+unacknowledged stage tasks are redelivered by the broker instead (acks_late)
+and resume from the same checkpoints.
+
+Pass (at startup, then every third of PIPELINE_LEASE_SECONDS)
+---------------------------------------------------------------
+1. renew — extend the lease of every task this process's scheduler holds
+2. take over — for each unfinished record whose lease lapsed, claim it with
+   result_store.update_if on lease_expires (so when several workers start
+   together, exactly one wins each task) and hand it to the scheduler:
+     complete, insights queued / running → resume_insights
+     otherwise → resume, with the spilled upload if the task has no
+                 checkpoint yet and the file is still in UPLOAD_DIR
+   Resumed work is admitted against the scheduler's queue limits: a task is
+   only claimed while there is room for it, and whatever does not fit is
+   left for a later pass (or another worker).
+3. sweep — delete files in UPLOAD_DIR older than UPLOAD_ORPHAN_SECONDS that
+   no unfinished task still needs
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services import pipeline
+from app.services.result_store import ResultStore, result_store
+from app.services.scheduler import QueueFullError
+from app.services.upload_receiver import spill_path
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineRecovery:
+    """Lease renewal, takeover of lapsed tasks and the orphaned-upload sweep, on one daemon thread."""
+
+    def __init__(self, store: ResultStore, scheduler, lease_seconds: int, orphan_seconds: int):
+        self._store = store
+        self._scheduler = scheduler         # scheduler.PipelineScheduler
+        self._interval = max(1.0, lease_seconds / 3)
+        self._orphan_seconds = orphan_seconds
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        self._counts = {"passes": 0, "renewed": 0, "lost": 0, "resumed": 0, "deferred": 0, "swept": 0}
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="pipeline-recovery", daemon=True)
+                self._thread.start()
+
+    def shutdown(self) -> None:
+        self._closed.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"instance": pipeline.INSTANCE_ID, "interval_seconds": self._interval, **self._counts}
+
+    def run_once(self) -> None:
+        """One renew → take over → sweep pass."""
+        self._renew()
+        unfinished = self._store.list_unfinished()
+        self._take_over(unfinished)
+        self._sweep(unfinished)
+        self._count("passes")
+
+    # ── Steps ──────────────────────────────────────────────────────────────────
+
+    def _loop(self) -> None:
+        while not self._closed.is_set():
+            try:
+                self.run_once()
+            except Exception as exc:
+                logger.exception("Pipeline recovery pass failed: %s", exc)
+            self._closed.wait(self._interval)
+
+    def _renew(self) -> None:
+        for task_id, user_id in self._scheduler.held().items():
+            if self._store.update_if(user_id, task_id, "lease_owner", pipeline.INSTANCE_ID, pipeline.lease_fields()):
+                self._count("renewed")
+            else:
+                # Deleted by its user, or taken over after this process stalled past its lease
+                logger.info("[pipeline:%s] Lease not renewed — the record is gone or owned elsewhere", task_id)
+                self._count("lost")
+
+    def _take_over(self, unfinished: List[Tuple[int, Dict[str, Any]]]) -> None:
+        now = time.time()
+        held = self._scheduler.held()
+        for user_id, record in unfinished:
+            task_id = record.get("task_id")
+            expires = record.get("lease_expires")
+            if not task_id or task_id in held or (expires is not None and expires > now):
+                continue
+            insights = record.get("pipeline_stage") == pipeline.STAGE_COMPLETE
+            if not (self._scheduler.has_insight_capacity() if insights else self._scheduler.has_capacity()):
+                self._count("deferred")     # no room now; still lapsed on the next pass
+                continue
+            if not self._store.update_if(user_id, task_id, "lease_expires", expires, pipeline.lease_fields()):
+                continue                    # renewed meanwhile, or another process won it
+            logger.warning(
+                "[pipeline:%s] Resuming interrupted task (stage %s, checkpoint %s, previous owner %s)",
+                task_id, record.get("pipeline_stage"), record.get("checkpoint"), record.get("lease_owner"),
+            )
+            try:
+                self._resume(user_id, task_id, record)
+            except QueueFullError:
+                # Filled up since the check; the claimed lease is never renewed, so it lapses again
+                logger.info("[pipeline:%s] Scheduler full — resuming on a later pass", task_id)
+                self._count("deferred")
+                continue
+            self._count("resumed")
+
+    def _resume(self, user_id: int, task_id: str, record: Dict[str, Any]) -> None:
+        """Hand a claimed task to the scheduler.  Raises QueueFullError."""
+        filename = record.get("filename") or ""
+        if record.get("pipeline_stage") == pipeline.STAGE_COMPLETE:
+            self._scheduler.resume_insights(task_id, filename, user_id)
+            return
+        source = None
+        if record.get("checkpoint") is None:
+            path = spill_path(task_id, filename)
+            source = path if os.path.exists(path) else None
+        self._scheduler.resume(task_id, source, filename, user_id, record.get("source_digest"))
+
+    def _sweep(self, unfinished: List[Tuple[int, Dict[str, Any]]]) -> None:
+        needed = {
+            os.path.basename(spill_path(record.get("task_id") or "", record.get("filename") or ""))
+            for _, record in unfinished
+            if record.get("checkpoint") is None
+        }
+        cutoff = time.time() - self._orphan_seconds
+        try:
+            entries = list(os.scandir(settings.UPLOAD_DIR))
+        except OSError as exc:
+            logger.warning("Could not scan %s for orphaned uploads: %s", settings.UPLOAD_DIR, exc)
+            return
+        for entry in entries:
+            if entry.name.startswith(".") or entry.name in needed:
+                continue
+            try:
+                if not entry.is_file() or entry.stat().st_mtime > cutoff:
+                    continue                # still streaming in, or not yet picked up
+                os.remove(entry.path)
+            except OSError as exc:
+                logger.warning("Could not remove orphaned upload %s: %s", entry.path, exc)
+                continue
+            logger.info("Removed orphaned upload %s", entry.name)
+            self._count("swept")
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+
+def _build_recovery() -> Optional[PipelineRecovery]:
+    if not settings.PIPELINE_RECOVERY_ENABLED or settings.PIPELINE_EXECUTOR != "scheduler":
+        return None
+    from app.services.scheduler import pipeline_scheduler
+    return PipelineRecovery(
+        result_store,
+        pipeline_scheduler,
+        lease_seconds=settings.PIPELINE_LEASE_SECONDS,
+        orphan_seconds=settings.UPLOAD_ORPHAN_SECONDS,
+    )
+
+
+# None when recovery is disabled or Celery runs the pipeline
+pipeline_recovery = _build_recovery()
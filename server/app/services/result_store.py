@@ -0,0 +1,872 @@
+"""
+TaxMate — Pipeline Result Store
+===============================
+Where pipeline records live between upload and the dashboard reading them.
+A record is the flat dict built by pipeline.initial_record and grown by
+pipeline._update (pipeline_stage, extraction, calculations, ollama …).
+
+Backends (RESULT_STORE)
+-----------------------
+sql    — the app's SQLAlchemy database.  Durable, shared by every uvicorn
+         worker.  Each top-level field is its own row and only changed
+         fields are written; an in-process LRU front cache (bounded by
+         RESULT_CACHE_MAX_BYTES of JSON) answers polls, re-reading only the
+         fields written since its cached version.
+redis  — REDIS_URL.  One hash per task (field → JSON) and one sorted set
+         per user indexing their task ids by creation time; both keys expire
+         with the record, so Redis does the purging.  Stage transitions are
+         published on a per-user channel, so whichever worker holds a
+         client's connection can push the update.
+memory — process-local, for tests and single-process development.
+
+Records expire RESULT_TTL_SECONDS after their last update.  Expired records
+are invisible immediately and purged from the backing store at most every
+RESULT_PURGE_INTERVAL_SECONDS.
+
+Stage events
+------------
+subscribe(user_id) yields {"task_id", "updated_at", …} each time one of the
+user's records changes pipeline_stage or insights_status (the changed ones
+are included); subscribe() yields every user's events.  The sql and memory backends deliver events only within the
+process that wrote them; redis delivers them to every worker.
+
+Recovery
+--------
+list_unfinished() returns every live record still in progress (not complete
+or failed, or complete with its insights queued / running) and update_if()
+is an atomic compare-and-set on one field — together they let a restarted
+process find interrupted tasks and take them over exactly once (see
+services/recovery.py).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.models.pipeline_result import PipelineResultField, PipelineTask
+
+try:
+    import redis
+    _REDIS_OK = True
+except ImportError:
+    _REDIS_OK = False
+
+logger = logging.getLogger(__name__)
+
+_TASKS  = PipelineTask.__table__
+_FIELDS = PipelineResultField.__table__
+
+_EVENT_FIELDS         = ("pipeline_stage", "insights_status")
+_TERMINAL_STAGES      = ("complete", "failed")
+_INSIGHTS_WAITING     = ("queued", "running")
+_SUBSCRIBER_QUEUE_MAX = 256     # undelivered local events per subscriber before new ones are dropped
+
+
+class StageSubscription:
+    """Stream of one user's stage events, as returned by ResultStore.subscribe()."""
+
+    def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Next event, or None if none arrived within `timeout` seconds."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+
+class ResultStore:
+    """Interface every pipeline result backend implements."""
+
+    def create(self, user_id: int, task_id: str, record: Dict[str, Any]) -> None:
+        """Store a new record (replacing any record with the same task_id)."""
+        raise NotImplementedError
+
+    def update(self, user_id: int, task_id: str, changes: Dict[str, Any]) -> None:
+        """Merge `changes` into a record, writing only fields whose value changed."""
+        raise NotImplementedError
+
+    def update_if(self, user_id: int, task_id: str, field: str, expected: Any, changes: Dict[str, Any]) -> bool:
+        """
+        Atomically merge `changes` into an existing record if its `field`
+        (None when absent) equals `expected`; True if they were applied.
+        """
+        raise NotImplementedError
+
+    def get(self, user_id: int, task_id: str) -> Optional[Dict[str, Any]]:
+        """The record, or None if it does not exist, expired or belongs to another user."""
+        raise NotImplementedError
+
+    def list_user(self, user_id: int) -> Dict[str, Dict[str, Any]]:
+        """All live records of one user, keyed by task_id, oldest first."""
+        raise NotImplementedError
+
+    def list_unfinished(self) -> List[Tuple[int, Dict[str, Any]]]:
+        """(user_id, record) of every live record of any user that is still in progress."""
+        raise NotImplementedError
+
+    def delete(self, user_id: int, task_id: str) -> bool:
+        """Remove a record; False if there was none for this user."""
+        raise NotImplementedError
+
+    def purge_expired(self) -> int:
+        """Drop every expired record now; returns how many were removed."""
+        raise NotImplementedError
+
+    def subscribe(self, user_id: Optional[int] = None) -> StageSubscription:
+        """Receive an event whenever one of the user's records (any record if None) changes an _EVENT_FIELDS field."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+def _changed(current: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in changes.items() if k not in current or current[k] != v}
+
+
+def _unfinished(record: Dict[str, Any]) -> bool:
+    stage = record.get("pipeline_stage")
+    if stage not in _TERMINAL_STAGES:
+        return True
+    return stage == "complete" and record.get("insights_status") in _INSIGHTS_WAITING
+
+
+def _loads(text: Optional[str]) -> Any:
+    return json.loads(text) if text is not None else None
+
+
+def _stage_event(task_id: str, changed: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The event for a write of `changed`, or None if it touched no _EVENT_FIELDS."""
+    fields = {name: changed[name] for name in _EVENT_FIELDS if name in changed}
+    if not fields:
+        return None
+    return {"task_id": task_id, **fields, "updated_at": time.time()}
+
+
+class _LocalSubscription(StageSubscription):
+    def __init__(self, bus: "_LocalBus", user_id: Optional[int]):
+        self._bus = bus
+        self._user_id = user_id
+        self.queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(_SUBSCRIBER_QUEUE_MAX)
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._bus.unsubscribe(self._user_id, self)
+
+
+class _LocalBus:
+    """In-process fan-out of stage events to the subscribers of each user (None: all users)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[Optional[int], List[_LocalSubscription]] = {}
+
+    def subscribe(self, user_id: Optional[int]) -> _LocalSubscription:
+        subscription = _LocalSubscription(self, user_id)
+        with self._lock:
+            self._subscribers.setdefault(user_id, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id: Optional[int], subscription: _LocalSubscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def publish(self, user_id: int, event: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, []) + self._subscribers.get(None, [])
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                pass                        # stalled consumer; it can still poll the record
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(map(len, self._subscribers.values()))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Memory backend
+# ─────────────────────────────────────────────────────────────────────────────
+
+class MemoryResultStore(ResultStore):
+    """Process-local store: task_id → (user_id, expires_at, record), plus a per-user index."""
+
+    def __init__(self, ttl_seconds: int):
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._records: Dict[str, Tuple[int, float, Dict[str, Any]]] = {}
+        self._by_user: Dict[int, Dict[str, None]] = {}      # insertion-ordered task ids
+        self._bus = _LocalBus()
+
+    def create(self, user_id, task_id, record):
+        with self._lock:
+            self._drop_locked(task_id)
+            self._records[task_id] = (user_id, time.time() + self._ttl, dict(record))
+            self._by_user.setdefault(user_id, {})[task_id] = None
+        event = _stage_event(task_id, record)
+        if event is not None:
+            self._bus.publish(user_id, event)
+
+    def update(self, user_id, task_id, changes):
+        with self._lock:
+            entry = self._live_locked(user_id, task_id)
+            record = entry[2] if entry else {}
+            diff = _changed(record, changes)
+            if not diff and entry:
+                return
+            record.update(diff)
+            self._records[task_id] = (user_id, time.time() + self._ttl, record)
+            self._by_user.setdefault(user_id, {})[task_id] = None
+        event = _stage_event(task_id, diff)
+        if event is not None:
+            self._bus.publish(user_id, event)
+
+    def update_if(self, user_id, task_id, field, expected, changes):
+        with self._lock:
+            entry = self._live_locked(user_id, task_id)
+            if entry is None or entry[2].get(field) != expected:
+                return False
+            record = entry[2]
+            diff = _changed(record, changes)
+            record.update(diff)
+            self._records[task_id] = (user_id, time.time() + self._ttl, record)
+        event = _stage_event(task_id, diff)
+        if event is not None:
+            self._bus.publish(user_id, event)
+        return True
+
+    def get(self, user_id, task_id):
+        with self._lock:
+            entry = self._live_locked(user_id, task_id)
+            return dict(entry[2]) if entry else None
+
+    def list_user(self, user_id):
+        with self._lock:
+            out = {}
+            for task_id in list(self._by_user.get(user_id, ())):
+                entry = self._live_locked(user_id, task_id)
+                if entry:
+                    out[task_id] = dict(entry[2])
+            return out
+
+    def list_unfinished(self):
+        now = time.time()
+        with self._lock:
+            return [
+                (user_id, dict(record))
+                for user_id, expires_at, record in self._records.values()
+                if expires_at > now and _unfinished(record)
+            ]
+
+    def delete(self, user_id, task_id):
+        with self._lock:
+            if self._live_locked(user_id, task_id) is None:
+                return False
+            self._drop_locked(task_id)
+            return True
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [t for t, (_, expires_at, _) in self._records.items() if expires_at <= now]
+            for task_id in expired:
+                self._drop_locked(task_id)
+            return len(expired)
+
+    def subscribe(self, user_id=None):
+        return self._bus.subscribe(user_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend":      "memory",
+                "records":      len(self._records),
+                "users":        len(self._by_user),
+                "subscribers":  len(self._bus),
+            }
+
+    def _live_locked(self, user_id: int, task_id: str):
+        entry = self._records.get(task_id)
+        if entry is None or entry[0] != user_id:
+            return None
+        if entry[1] <= time.time():
+            self._drop_locked(task_id)
+            return None
+        return entry
+
+    def _drop_locked(self, task_id: str) -> None:
+        entry = self._records.pop(task_id, None)
+        if entry is not None:
+            tasks = self._by_user.get(entry[0], {})
+            tasks.pop(task_id, None)
+            if not tasks:
+                self._by_user.pop(entry[0], None)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SQL backend + LRU front cache
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _FrontCache:
+    """LRU of task_id → (user_id, version, record, size), bounded by total JSON bytes."""
+
+    def __init__(self, max_bytes: int):
+        self._max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[int, int, Dict[str, Any], int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, task_id: str):
+        entry = self._entries.get(task_id)
+        if entry is not None:
+            self._entries.move_to_end(task_id)
+        return entry
+
+    def put(self, task_id: str, user_id: int, version: int, record: Dict[str, Any], size: int) -> None:
+        self.pop(task_id)
+        if size > self._max_bytes:
+            return
+        self._entries[task_id] = (user_id, version, record, size)
+        self._bytes += size
+        while self._bytes > self._max_bytes:
+            _, (_, _, _, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+            self.evictions += 1
+
+    def pop(self, task_id: str) -> None:
+        entry = self._entries.pop(task_id, None)
+        if entry is not None:
+            self._bytes -= entry[3]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+
+class SqlResultStore(ResultStore):
+    """
+    Durable store on the app database.  Writes go straight to SQL (field rows
+    are upserted only when their value changed); reads check the task's
+    version — one primary-key lookup — and serve the cached copy, topping it
+    up with the fields written since if another worker moved it on.
+    """
+
+    def __init__(self, engine: Engine, ttl_seconds: int, cache_max_bytes: int, purge_interval: int):
+        self._engine = engine
+        self._ttl = ttl_seconds
+        self._purge_interval = purge_interval
+        self._next_purge = 0.0
+        self._lock = threading.Lock()
+        self._cache = _FrontCache(cache_max_bytes)
+        self._bus = _LocalBus()
+        self._tables_ready = False
+
+    def _db(self) -> Engine:
+        """The engine, with the pipeline tables created on first use (not at import)."""
+        if not self._tables_ready:
+            with self._lock:
+                if not self._tables_ready:
+                    PipelineTask.metadata.create_all(self._engine, tables=[_TASKS, _FIELDS])
+                    self._tables_ready = True
+        return self._engine
+
+    # ── Writes ─────────────────────────────────────────────────────────────────
+
+    def create(self, user_id, task_id, record):
+        now = time.time()
+        encoded = {name: json.dumps(value) for name, value in record.items()}
+        with self._db().begin() as conn:
+            conn.execute(delete(_FIELDS).where(_FIELDS.c.task_id == task_id))
+            conn.execute(delete(_TASKS).where(_TASKS.c.task_id == task_id))
+            conn.execute(insert(_TASKS).values(
+                task_id=task_id, user_id=user_id, version=1,
+                pipeline_stage=record.get("pipeline_stage") or "",
+                created_at=now, updated_at=now, expires_at=now + self._ttl,
+            ))
+            if encoded:
+                conn.execute(insert(_FIELDS), [
+                    {"task_id": task_id, "name": name, "value_json": text, "version": 1}
+                    for name, text in encoded.items()
+                ])
+        with self._lock:
+            self._cache.put(task_id, user_id, 1, dict(record), sum(map(len, encoded.values())))
+        event = _stage_event(task_id, record)
+        if event is not None:
+            self._bus.publish(user_id, event)
+        self._maybe_purge(now)
+
+    def update(self, user_id, task_id, changes):
+        now = time.time()
+        with self._db().begin() as conn:
+            if not self._lock_row(conn, user_id, task_id, now):
+                diff = None
+            else:
+                # Compared and written under the row lock, so no concurrent
+                # update / update_if can land between the read and the write
+                stored = dict(conn.execute(
+                    select(_FIELDS.c.name, _FIELDS.c.value_json)
+                    .where(_FIELDS.c.task_id == task_id, _FIELDS.c.name.in_(list(changes)))
+                ).all())
+                diff = _changed({name: _loads(text) for name, text in stored.items()}, changes)
+                if diff:
+                    version, encoded = self._write(conn, task_id, diff, now)
+        if diff is None:
+            self.create(user_id, task_id, changes)
+        elif diff:
+            self._written(user_id, task_id, version, diff, encoded, now)
+
+    def update_if(self, user_id, task_id, field, expected, changes):
+        now = time.time()
+        with self._db().begin() as conn:
+            if not self._lock_row(conn, user_id, task_id, now):
+                return False
+            current = conn.execute(
+                select(_FIELDS.c.value_json).where(_FIELDS.c.task_id == task_id, _FIELDS.c.name == field)
+            ).scalar()
+            if _loads(current) != expected:
+                return False
+            version, encoded = self._write(conn, task_id, changes, now)
+        self._written(user_id, task_id, version, changes, encoded, now)
+        return True
+
+    def _lock_row(self, conn, user_id: int, task_id: str, now: float) -> bool:
+        """
+        Take the task header's row lock for the rest of the transaction (the
+        portable equivalent of SELECT ... FOR UPDATE, which SQLite lacks);
+        False if the user has no live task by that id.
+        """
+        return bool(conn.execute(
+            update(_TASKS)
+            .where(_TASKS.c.task_id == task_id, _TASKS.c.user_id == user_id, _TASKS.c.expires_at > now)
+            .values(updated_at=now)
+        ).rowcount)
+
+    def _write(self, conn, task_id: str, diff: Dict[str, Any], now: float) -> Tuple[int, Dict[str, str]]:
+        """Write `diff` under a new task version; returns (version, field → JSON)."""
+        encoded = {name: json.dumps(value) for name, value in diff.items()}
+        header = {"version": _TASKS.c.version + 1, "updated_at": now, "expires_at": now + self._ttl}
+        if "pipeline_stage" in diff:
+            header["pipeline_stage"] = diff["pipeline_stage"] or ""
+        conn.execute(update(_TASKS).where(_TASKS.c.task_id == task_id).values(**header))
+        version = conn.execute(select(_TASKS.c.version).where(_TASKS.c.task_id == task_id)).scalar_one()
+        for name, text in encoded.items():
+            written = conn.execute(
+                update(_FIELDS)
+                .where(_FIELDS.c.task_id == task_id, _FIELDS.c.name == name)
+                .values(value_json=text, version=version)
+            ).rowcount
+            if not written:
+                conn.execute(insert(_FIELDS).values(
+                    task_id=task_id, name=name, value_json=text, version=version,
+                ))
+        return version, encoded
+
+    def _written(
+        self, user_id: int, task_id: str, version: int, diff: Dict[str, Any], encoded: Dict[str, str], now: float,
+    ) -> None:
+        """Bring the front cache up to a committed write and publish its stage event."""
+        with self._lock:
+            entry = self._cache.get(task_id)
+            if entry is not None and entry[1] == version - 1:
+                record = {**entry[2], **diff}
+                size = entry[3] + sum(map(len, encoded.values()))   # upper bound; refreshed on reload
+                self._cache.put(task_id, user_id, version, record, size)
+            else:
+                self._cache.pop(task_id)                          # another writer interleaved
+        event = _stage_event(task_id, diff)
+        if event is not None:
+            self._bus.publish(user_id, event)
+        self._maybe_purge(now)
+
+    def delete(self, user_id, task_id):
+        with self._db().begin() as conn:
+            removed = conn.execute(
+                delete(_TASKS).where(_TASKS.c.task_id == task_id, _TASKS.c.user_id == user_id)
+            ).rowcount
+            if removed:
+                conn.execute(delete(_FIELDS).where(_FIELDS.c.task_id == task_id))
+        with self._lock:
+            self._cache.pop(task_id)
+        return bool(removed)
+
+    def purge_expired(self):
+        now = time.time()
+        expired = select(_TASKS.c.task_id).where(_TASKS.c.expires_at <= now)
+        with self._db().begin() as conn:
+            task_ids = list(conn.execute(expired).scalars())
+            if task_ids:
+                conn.execute(delete(_FIELDS).where(_FIELDS.c.task_id.in_(task_ids)))
+                conn.execute(delete(_TASKS).where(_TASKS.c.task_id.in_(task_ids)))
+        with self._lock:
+            for task_id in task_ids:
+                self._cache.pop(task_id)
+        if task_ids:
+            logger.info("Purged %d expired pipeline result(s).", len(task_ids))
+        return len(task_ids)
+
+    def _maybe_purge(self, now: float) -> None:
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self._purge_interval
+        try:
+            self.purge_expired()
+        except Exception as exc:
+            logger.warning("Pipeline result purge failed: %s", exc)
+
+    # ── Reads ──────────────────────────────────────────────────────────────────
+
+    def get(self, user_id, task_id):
+        with self._db().connect() as conn:
+            header = conn.execute(
+                select(_TASKS.c.version)
+                .where(_TASKS.c.task_id == task_id, _TASKS.c.user_id == user_id, _TASKS.c.expires_at > time.time())
+            ).first()
+            if header is None:
+                with self._lock:
+                    self._cache.pop(task_id)
+                return None
+            records = self._fresh(conn, user_id, [(task_id, header.version)])
+        return records[task_id]
+
+    def list_user(self, user_id):
+        with self._db().connect() as conn:
+            headers = conn.execute(
+                select(_TASKS.c.task_id, _TASKS.c.version)
+                .where(_TASKS.c.user_id == user_id, _TASKS.c.expires_at > time.time())
+                .order_by(_TASKS.c.created_at)
+            ).all()
+            return self._fresh(conn, user_id, [(h.task_id, h.version) for h in headers])
+
+    def list_unfinished(self):
+        waiting = select(_FIELDS.c.task_id).where(
+            _FIELDS.c.name == "insights_status",
+            _FIELDS.c.value_json.in_([json.dumps(status) for status in _INSIGHTS_WAITING]),
+        )
+        with self._db().connect() as conn:
+            headers = conn.execute(
+                select(_TASKS.c.task_id, _TASKS.c.user_id, _TASKS.c.version)
+                .where(
+                    _TASKS.c.expires_at > time.time(),
+                    or_(
+                        _TASKS.c.pipeline_stage.not_in(_TERMINAL_STAGES),
+                        and_(_TASKS.c.pipeline_stage == "complete", _TASKS.c.task_id.in_(waiting)),
+                    ),
+                )
+                .order_by(_TASKS.c.created_at)
+            ).all()
+            by_user: Dict[int, List[Tuple[str, int]]] = {}
+            for h in headers:
+                by_user.setdefault(h.user_id, []).append((h.task_id, h.version))
+            out: List[Tuple[int, Dict[str, Any]]] = []
+            for user_id, user_headers in by_user.items():
+                out.extend((user_id, record) for record in self._fresh(conn, user_id, user_headers).values())
+        return out
+
+    def _fresh(self, conn, user_id: int, headers: Iterable[Tuple[str, int]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Records at the given versions: cached copies where current, cached
+        copies topped up with newer fields where stale, full loads otherwise.
+        """
+        out: Dict[str, Dict[str, Any]] = {}
+        stale: Dict[str, Tuple[int, int]] = {}          # task_id → (cached version, current version)
+        with self._lock:
+            for task_id, version in headers:
+                entry = self._cache.get(task_id)
+                if entry is not None and entry[0] == user_id and entry[1] == version:
+                    self._cache.hits += 1
+                    out[task_id] = dict(entry[2])
+                else:
+                    self._cache.misses += 1
+                    cached_version = entry[1] if entry is not None and entry[1] < version else 0
+                    stale[task_id] = (cached_version, version)
+                    out[task_id] = None
+
+        if stale:
+            rows: Dict[str, List[Tuple[str, str]]] = {task_id: [] for task_id in stale}
+            floor = min(cached for cached, _ in stale.values())
+            for row in conn.execute(
+                select(_FIELDS.c.task_id, _FIELDS.c.name, _FIELDS.c.value_json, _FIELDS.c.version)
+                .where(_FIELDS.c.task_id.in_(list(stale)), _FIELDS.c.version > floor)
+            ):
+                if row.version > stale[row.task_id][0]:
+                    rows[row.task_id].append((row.name, row.value_json))
+
+            with self._lock:
+                for task_id, (cached_version, version) in stale.items():
+                    entry = self._cache.get(task_id) if cached_version else None
+                    if entry is not None and entry[1] == cached_version:
+                        record, size = dict(entry[2]), entry[3]
+                    else:
+                        record, size = {}, 0
+                    for name, text in rows[task_id]:
+                        record[name] = json.loads(text)
+                        size += len(text)
+                    self._cache.put(task_id, user_id, version, record, size)
+                    out[task_id] = dict(record)
+        return out
+
+    def subscribe(self, user_id=None):
+        return self._bus.subscribe(user_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend":        "sql",
+                "cached_records": len(self._cache),
+                "cached_bytes":   self._cache.bytes,
+                "cache_hits":     self._cache.hits,
+                "cache_misses":   self._cache.misses,
+                "evictions":      self._cache.evictions,
+                "subscribers":    len(self._bus),
+            }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Redis backend
+# ─────────────────────────────────────────────────────────────────────────────
+
+_OWNER = "__user_id"        # reserved hash field holding the record's owner
+
+
+def _text(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class _RedisSubscription(StageSubscription):
+    def __init__(self, pubsub, channel: str, pattern: bool = False):
+        self._pubsub = pubsub
+        if pattern:
+            self._pubsub.psubscribe(channel)
+        else:
+            self._pubsub.subscribe(channel)
+
+    def get(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            message = self._pubsub.get_message(ignore_subscribe_messages=True, timeout=max(0.0, remaining))
+            if message is not None and message["type"] in ("message", "pmessage"):
+                return json.loads(_text(message["data"]))
+            if remaining <= 0:
+                return None
+
+    def close(self):
+        self._pubsub.close()
+
+
+class RedisResultStore(ResultStore):
+    """
+    Shared store for multi-worker deployments.
+
+      {prefix}task:{task_id}        hash  field → JSON, plus the owner's user id
+      {prefix}user:{user_id}:tasks  zset  task_id scored by creation time
+      {prefix}pipeline:{user_id}    pub/sub channel of stage events
+
+    Every write refreshes the expiry of the task hash and of its user's index.
+    Index entries of tasks that expired individually are pruned on read.
+    `client` is any redis-py compatible client (a fakeredis instance in tests).
+    """
+
+    def __init__(self, client, ttl_seconds: int, prefix: str = "taxmate:"):
+        self._client = client
+        self._ttl = ttl_seconds
+        self._prefix = prefix
+
+    def _task_key(self, task_id: str) -> str:
+        return f"{self._prefix}task:{task_id}"
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self._prefix}user:{user_id}:tasks"
+
+    def _channel(self, user_id: int) -> str:
+        return f"{self._prefix}pipeline:{user_id}"
+
+    # ── Writes ─────────────────────────────────────────────────────────────────
+
+    def create(self, user_id, task_id, record):
+        pipe = self._client.pipeline(transaction=True)
+        self._queue_create(pipe, user_id, task_id, record)
+        pipe.execute()
+
+    def update(self, user_id, task_id, changes):
+        key = self._task_key(task_id)
+        names = list(changes)
+        encoded = {name: json.dumps(value) for name, value in changes.items()}
+
+        def apply(pipe) -> None:
+            owner, *current = pipe.hmget(key, [_OWNER, *names])
+            pipe.multi()
+            if owner is None or int(owner) != user_id:
+                self._queue_create(pipe, user_id, task_id, changes)
+                return
+            diff = {name: encoded[name] for name, old in zip(names, current) if _text(old) != encoded[name]}
+            if not diff:
+                return
+            pipe.hset(key, mapping=diff)
+            self._queue_touch(pipe, user_id, task_id)
+            event = _stage_event(task_id, {name: changes[name] for name in diff})
+            if event is not None:
+                pipe.publish(self._channel(user_id), json.dumps(event))
+
+        self._client.transaction(apply, key)
+
+    def update_if(self, user_id, task_id, field, expected, changes):
+        key = self._task_key(task_id)
+        encoded = {name: json.dumps(value) for name, value in changes.items()}
+
+        def apply(pipe) -> bool:
+            owner, current = pipe.hmget(key, [_OWNER, field])
+            pipe.multi()
+            if owner is None or int(owner) != user_id or _loads(current) != expected:
+                return False
+            pipe.hset(key, mapping=encoded)
+            self._queue_touch(pipe, user_id, task_id)
+            event = _stage_event(task_id, changes)
+            if event is not None:
+                pipe.publish(self._channel(user_id), json.dumps(event))
+            return True
+
+        return self._client.transaction(apply, key, value_from_callable=True)
+
+    def delete(self, user_id, task_id):
+        key = self._task_key(task_id)
+        owner = self._client.hget(key, _OWNER)
+        if owner is None or int(owner) != user_id:
+            return False
+        pipe = self._client.pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.zrem(self._user_key(user_id), task_id)
+        return bool(pipe.execute()[0])
+
+    def purge_expired(self):
+        return 0                            # keys expire in Redis itself
+
+    def _queue_create(self, pipe, user_id: int, task_id: str, record: Dict[str, Any]) -> None:
+        key = self._task_key(task_id)
+        pipe.delete(key)
+        pipe.hset(key, mapping={_OWNER: user_id, **{name: json.dumps(value) for name, value in record.items()}})
+        pipe.zadd(self._user_key(user_id), {task_id: time.time()})
+        self._queue_touch(pipe, user_id, task_id)
+        event = _stage_event(task_id, record)
+        if event is not None:
+            pipe.publish(self._channel(user_id), json.dumps(event))
+
+    def _queue_touch(self, pipe, user_id: int, task_id: str) -> None:
+        pipe.expire(self._task_key(task_id), self._ttl)
+        pipe.expire(self._user_key(user_id), self._ttl)
+
+    # ── Reads ──────────────────────────────────────────────────────────────────
+
+    def get(self, user_id, task_id):
+        return self._decode(user_id, self._client.hgetall(self._task_key(task_id)))
+
+    def list_user(self, user_id):
+        user_key = self._user_key(user_id)
+        task_ids = [_text(t) for t in self._client.zrange(user_key, 0, -1)]
+        if not task_ids:
+            return {}
+        pipe = self._client.pipeline(transaction=False)
+        for task_id in task_ids:
+            pipe.hgetall(self._task_key(task_id))
+        out, gone = {}, []
+        for task_id, raw in zip(task_ids, pipe.execute()):
+            record = self._decode(user_id, raw)
+            if record is None:
+                gone.append(task_id)
+            else:
+                out[task_id] = record
+        if gone:
+            self._client.zrem(user_key, *gone)
+        return out
+
+    def list_unfinished(self):
+        keys = list(self._client.scan_iter(match=f"{self._prefix}task:*", count=1000))
+        if not keys:
+            return []
+        pipe = self._client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hmget(key, [_OWNER, "pipeline_stage", "insights_status"])
+        candidates = []
+        for key, (owner, stage, insights) in zip(keys, pipe.execute()):
+            if owner is not None and _unfinished({"pipeline_stage": _loads(stage), "insights_status": _loads(insights)}):
+                candidates.append((int(owner), key))
+
+        pipe = self._client.pipeline(transaction=False)
+        for _, key in candidates:
+            pipe.hgetall(key)
+        out = []
+        for (user_id, _), raw in zip(candidates, pipe.execute()):
+            record = self._decode(user_id, raw)
+            if record is not None:                  # expired between the two reads
+                out.append((user_id, record))
+        return out
+
+    def _decode(self, user_id: int, raw: Dict[Any, Any]) -> Optional[Dict[str, Any]]:
+        fields = {_text(name): _text(value) for name, value in raw.items()}
+        owner = fields.pop(_OWNER, None)
+        if owner is None or int(owner) != user_id:
+            return None
+        return {name: json.loads(value) for name, value in fields.items()}
+
+    def subscribe(self, user_id=None):
+        if user_id is None:
+            return _RedisSubscription(self._client.pubsub(), f"{self._prefix}pipeline:*", pattern=True)
+        return _RedisSubscription(self._client.pubsub(), self._channel(user_id))
+
+    def stats(self):
+        return {"backend": "redis", "prefix": self._prefix, "keys": self._client.dbsize()}
+
+
+def _redis_client(url: str):
+    """redis-py client for REDIS_URL; ``fakeredis://`` gives an in-process fake (pip install fakeredis)."""
+    if url.startswith("fakeredis://"):
+        import fakeredis
+        return fakeredis.FakeRedis(decode_responses=True)
+    return redis.Redis.from_url(url, decode_responses=True)
+
+
+def _build_store() -> ResultStore:
+    if settings.RESULT_STORE == "memory":
+        return MemoryResultStore(settings.RESULT_TTL_SECONDS)
+    if settings.RESULT_STORE == "redis":
+        if _REDIS_OK:
+            return RedisResultStore(
+                _redis_client(settings.REDIS_URL),
+                ttl_seconds=settings.RESULT_TTL_SECONDS,
+                prefix=settings.RESULT_REDIS_PREFIX,
+            )
+        logger.warning("RESULT_STORE=redis but the redis package is not installed — using the sql store.")
+    from app.db.session import engine
+    return SqlResultStore(
+        engine,
+        ttl_seconds=settings.RESULT_TTL_SECONDS,
+        cache_max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+        purge_interval=settings.RESULT_PURGE_INTERVAL_SECONDS,
+    )
+
+
+result_store: ResultStore = _build_store()
@@ -0,0 +1,363 @@
+"""
+TaxMate — Pipeline Scheduler
+============================
+Runs document pipelines on dedicated, bounded worker pools instead of the
+request worker's BackgroundTasks threadpool.
+
+Pools
+-----
+ocr — PIPELINE_OCR_WORKERS threads (0 → half the CPU cores) run stages 1–5
+      (extraction, validation, tax calculation, rule-based analysis) — the
+      task is complete when they finish.  They share the GIL with request
+      handling, so by default they take only half the cores; multi-page
+      PDFs are parsed in ocr_service's process pool, and PIPELINE_EXECUTOR
+      ="celery" moves all of this out of the API process.
+llm — PIPELINE_LLM_WORKERS threads run the insights follow-up (Ollama) of
+      completed tasks.  I/O-bound — they mostly wait on the model — so the
+      pool can be wider without taking CPU from extraction.
+
+Backpressure
+------------
+At most PIPELINE_QUEUE_MAX accepted jobs wait for an OCR worker.  submit()
+on a full queue raises QueueFullError carrying a Retry-After estimate (queue
+depth × recent OCR-stage time / workers), which the upload endpoint turns
+into a 503.  Waiting jobs report their 1-based queue position.
+At most PIPELINE_LLM_QUEUE_MAX insights jobs wait for an llm worker; an OCR
+worker whose task completes while they are all taken waits for a slot, so a
+stalled model backs up into the OCR queue and from there into 503s.
+
+Recovery
+--------
+held() lists every task the scheduler has accepted and not yet finished —
+queued, running or waiting on insights — so services/recovery.py can keep
+their leases alive.  Tasks it takes over from a dead process come back
+through resume() / resume_insights(), which are admitted against the same
+limits as new work (QueueFullError when full — recovery checks
+has_capacity() / has_insight_capacity() before claiming a task).
+On shutdown, queued jobs are kept for the next process to resume.
+
+With PIPELINE_EXECUTOR="celery" the module-level pipeline_scheduler is a
+task_queue.CeleryPipelineExecutor instead, with the same interface.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services import pipeline
+from app.services.ocr_service import DocumentSource, delete_upload
+from app.services.upload_receiver import spill_path
+
+logger = logging.getLogger(__name__)
+
+_EWMA_WEIGHT      = 0.2     # weight of the newest OCR-stage duration in the running average
+_MAX_RETRY_AFTER  = 600     # seconds
+_SLOT_WAIT        = 1.0     # seconds between shutdown checks while waiting for an llm slot
+
+
+class QueueFullError(Exception):
+    """Raised when PIPELINE_QUEUE_MAX jobs are already waiting."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Pipeline queue is full — retry in {retry_after}s.")
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Job:
+    task_id: str
+    source: Optional[DocumentSource]    # None: resumed with its upload gone
+    filename: str
+    user_id: int
+    digest: Optional[str]
+    queued_at: float            # epoch seconds, for the queue-wait timing
+
+
+class PipelineScheduler:
+    """Bounded FIFO queue in front of the ocr pool, feeding the llm pool."""
+
+    def __init__(self, queue_max: int, ocr_workers: int, llm_workers: int, llm_queue_max: int):
+        self._queue_max = queue_max
+        self._ocr_workers = ocr_workers or max(1, (os.cpu_count() or 1) // 2)
+        self._llm_workers = max(1, llm_workers)
+        # queued + running insights jobs; a slot is taken before submitting to the llm pool
+        self._llm_slots = threading.BoundedSemaphore(self._llm_workers + max(0, llm_queue_max))
+        self._queue: Deque[_Job] = deque()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._llm_pool: Optional[ThreadPoolExecutor] = None
+        self._held: Dict[str, int] = {}     # task_id → user_id, accepted until finished
+        self._running = 0
+        self._avg_seconds: Optional[float] = None
+        self._closed = False
+        self._counts = {"accepted": 0, "rejected": 0, "finished": 0, "crashed": 0, "insights": 0, "resumed": 0}
+
+    # ── Public API ─────────────────────────────────────────────────────────────
+
+    def submit(
+        self,
+        task_id: str,
+        source: DocumentSource,
+        filename: str,
+        user_id: int,
+        digest: Optional[str] = None,
+    ) -> int:
+        """Queue a pipeline run; returns its queue position.  Raises QueueFullError."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("pipeline scheduler is shut down")
+            if len(self._queue) >= self._queue_max:
+                self._counts["rejected"] += 1
+                raise QueueFullError(self._retry_after_locked())
+            self._enqueue_locked(_Job(task_id, source, filename, user_id, digest, time.time()))
+            self._counts["accepted"] += 1
+            return len(self._queue)
+
+    def resume(
+        self,
+        task_id: str,
+        source: Optional[DocumentSource],
+        filename: str,
+        user_id: int,
+        digest: Optional[str] = None,
+    ) -> None:
+        """Queue an interrupted task; it restarts from its checkpoint.  Raises QueueFullError."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("pipeline scheduler is shut down")
+            if len(self._queue) >= self._queue_max:
+                raise QueueFullError(self._retry_after_locked())
+            self._enqueue_locked(_Job(task_id, source, filename, user_id, digest, time.time()))
+            self._counts["resumed"] += 1
+
+    def resume_insights(self, task_id: str, filename: str, user_id: int) -> None:
+        """Re-run the insights follow-up of a complete task whose job was lost.  Raises QueueFullError."""
+        job = _Job(task_id, None, filename, user_id, None, time.time())
+        if not self._llm_slots.acquire(blocking=False):
+            raise QueueFullError(settings.PIPELINE_RETRY_AFTER_SECONDS)
+        with self._cond:
+            if self._closed:
+                self._llm_slots.release()
+                raise RuntimeError("pipeline scheduler is shut down")
+            self._start_locked()
+            self._held[task_id] = user_id
+            self._counts["resumed"] += 1
+        self._submit_insights(job, None)
+
+    def held(self) -> Dict[str, int]:
+        """task_id → user_id of every task accepted and not yet finished."""
+        with self._cond:
+            return dict(self._held)
+
+    def has_capacity(self) -> bool:
+        with self._cond:
+            return len(self._queue) < self._queue_max
+
+    def has_insight_capacity(self) -> bool:
+        """True if an insights job could be queued now (best effort — resume_insights re-checks)."""
+        if not self._llm_slots.acquire(blocking=False):
+            return False
+        self._llm_slots.release()
+        return True
+
+    def retry_after(self) -> int:
+        with self._cond:
+            return self._retry_after_locked()
+
+    def position(self, task_id: str) -> Optional[int]:
+        """1-based position of a waiting task, or None once a worker picked it up."""
+        with self._cond:
+            for n, job in enumerate(self._queue, 1):
+                if job.task_id == task_id:
+                    return n
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "queued":           len(self._queue),
+                "queue_max":        self._queue_max,
+                "running":          self._running,
+                "ocr_workers":      self._ocr_workers,
+                "llm_workers":      self._llm_workers,
+                "avg_ocr_seconds":  round(self._avg_seconds, 3) if self._avg_seconds is not None else None,
+                **self._counts,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop accepting jobs; workers finish what is running and exit.  Queued
+        jobs are left for recovery — uploads still in memory are spilled to
+        UPLOAD_DIR so they survive the restart — or, with recovery disabled,
+        dropped and their spilled uploads deleted.
+        """
+        with self._cond:
+            self._closed = True
+            dropped = list(self._queue)
+            self._queue.clear()
+            self._cond.notify_all()
+        for job in dropped:
+            if settings.PIPELINE_RECOVERY_ENABLED:
+                _keep_upload(job)
+            else:
+                delete_upload(job.source)
+        if dropped:
+            logger.warning("Pipeline scheduler shut down with %d queued job(s) not started.", len(dropped))
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        if self._llm_pool is not None:
+            self._llm_pool.shutdown(wait=wait)
+
+    # ── Workers ────────────────────────────────────────────────────────────────
+
+    def _enqueue_locked(self, job: _Job) -> None:
+        self._queue.append(job)
+        self._held[job.task_id] = job.user_id
+        self._start_locked()
+        self._cond.notify()
+
+    def _start_locked(self) -> None:
+        """Lazily start the ocr threads and llm pool on first submit."""
+        if self._threads:
+            return
+        self._llm_pool = ThreadPoolExecutor(max_workers=self._llm_workers, thread_name_prefix="pipeline-llm")
+        for n in range(self._ocr_workers):
+            thread = threading.Thread(target=self._ocr_worker, name=f"pipeline-ocr-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _ocr_worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                job = self._queue.popleft()
+                self._running += 1
+
+            start = time.perf_counter()
+            insight_request = None
+            try:
+                db = SessionLocal()
+                try:
+                    insight_request = pipeline.run_processing_stages(
+                        job.source, job.filename, job.user_id, job.task_id, db, job.digest, job.queued_at,
+                    )
+                finally:
+                    db.close()
+            except Exception as exc:
+                self._crashed(job, exc)
+            finally:
+                self._finished_ocr(time.perf_counter() - start)
+
+            if insight_request is None:
+                self._release(job)
+                continue
+            if not self._wait_llm_slot():
+                # Shutting down: the record says insights "queued", so recovery picks it up
+                self._release(job)
+                return
+            self._submit_insights(job, insight_request)
+
+    def _wait_llm_slot(self) -> bool:
+        """Block until an insights slot frees up; False if the scheduler shuts down first."""
+        while not self._llm_slots.acquire(timeout=_SLOT_WAIT):
+            with self._cond:
+                if self._closed:
+                    return False
+        return True
+
+    def _submit_insights(self, job: _Job, insight_request: Optional[pipeline.InsightRequest]) -> None:
+        """Hand a job holding an llm slot to the llm pool; the slot is freed when it finishes."""
+        try:
+            self._llm_pool.submit(self._run_insights, job, insight_request)
+        except RuntimeError as exc:              # llm pool already shut down
+            self._llm_slots.release()
+            self._crashed(job, exc, insights=True)
+            self._release(job)
+
+    def _run_insights(self, job: _Job, insight_request: Optional[pipeline.InsightRequest]) -> None:
+        """Insights follow-up; a None request is rebuilt from the record (resume_insights)."""
+        try:
+            if insight_request is None:
+                db = SessionLocal()
+                try:
+                    insight_request = pipeline.resume_insight_request(job.user_id, job.task_id, db)
+                finally:
+                    db.close()
+            if insight_request is not None:
+                pipeline.run_insight_stage(job.user_id, job.task_id, insight_request)
+        except Exception as exc:
+            self._crashed(job, exc, insights=True)
+        finally:
+            self._llm_slots.release()
+        with self._cond:
+            self._counts["insights"] += 1
+        self._release(job)
+
+    def _release(self, job: _Job) -> None:
+        with self._cond:
+            self._held.pop(job.task_id, None)
+
+    def _crashed(self, job: _Job, exc: Exception, insights: bool = False) -> None:
+        logger.exception("[pipeline:%s] Worker crashed: %s", job.task_id, exc)
+        with self._cond:
+            self._counts["crashed"] += 1
+        if insights:
+            pipeline.record_insights_failure(job.user_id, job.task_id, f"Insights crashed: {exc}")
+        else:
+            pipeline.record_failure(job.user_id, job.task_id, f"Pipeline crashed: {exc}")
+
+    def _finished_ocr(self, seconds: float) -> None:
+        with self._cond:
+            self._running -= 1
+            self._counts["finished"] += 1
+            if self._avg_seconds is None:
+                self._avg_seconds = seconds
+            else:
+                self._avg_seconds += _EWMA_WEIGHT * (seconds - self._avg_seconds)
+
+    def _retry_after_locked(self) -> int:
+        if self._avg_seconds is None:
+            return settings.PIPELINE_RETRY_AFTER_SECONDS
+        estimate = self._avg_seconds * len(self._queue) / self._ocr_workers
+        return max(1, min(_MAX_RETRY_AFTER, math.ceil(estimate)))
+
+
+def _keep_upload(job: _Job) -> None:
+    """Spill a queued in-memory upload to UPLOAD_DIR so recovery can resume it after a restart."""
+    if not isinstance(job.source, (bytes, bytearray, memoryview)):
+        return                              # already on disk
+    try:
+        with open(spill_path(job.task_id, job.filename), "wb") as f:
+            f.write(job.source)
+    except OSError as exc:
+        logger.warning("[pipeline:%s] Could not keep the queued upload: %s", job.task_id, exc)
+
+
+def _build_scheduler():
+    if settings.PIPELINE_EXECUTOR == "celery":
+        from app.services.task_queue import CeleryPipelineExecutor
+        return CeleryPipelineExecutor()
+    return PipelineScheduler(
+        queue_max=settings.PIPELINE_QUEUE_MAX,
+        ocr_workers=settings.PIPELINE_OCR_WORKERS,
+        llm_workers=settings.PIPELINE_LLM_WORKERS,
+        llm_queue_max=settings.PIPELINE_LLM_QUEUE_MAX,
+    )
+
+
+# PipelineScheduler, or task_queue.CeleryPipelineExecutor when PIPELINE_EXECUTOR="celery"
+pipeline_scheduler = _build_scheduler()
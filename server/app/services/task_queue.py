@@ -0,0 +1,247 @@
+"""
+TaxMate — Celery Pipeline Executor
+==================================
+Optional execution mode (PIPELINE_EXECUTOR="celery") that runs the document
+pipeline as Celery tasks instead of on the in-process scheduler, so OCR
+capacity scales with dedicated worker processes rather than API workers.
+
+Queues
+------
+ocr  — taxmate.pipeline.ocr   stages 1–2 (OCR + extraction, validation)
+calc — taxmate.pipeline.calc  stages 3–5 (tax calculation, rule analysis, complete)
+llm  — taxmate.pipeline.llm   insights follow-up (Ollama) of a completed task
+
+Each task enqueues the next only if its stage's fail-safe gate passed, so a
+document that fails OCR or validation never reaches calculation or the LLM.
+A crash in the llm task marks only the insights failed.
+Tasks are acknowledged only once they finish, so the broker redelivers those
+of a worker that died; the ocr task then resumes from the record's
+checkpoint (pipeline "Checkpoints") instead of re-running OCR.
+Hand-offs are JSON.  The upload never travels in the message: one kept in
+memory is spilled to UPLOAD_DIR first and only its path and digest are sent,
+so UPLOAD_DIR must be on storage shared by the API and the ocr workers.
+The typed stage hand-offs (pipeline
+ExtractedDocument / InsightRequest) cross as to_payload() and are
+re-validated with from_payload() on the other side — the one place the
+in-process pipeline serialises them.  Progress goes to result_store, which therefore
+has to be "sql" or "redis" unless tasks run eagerly.
+
+Workers (from server/):
+    celery -A app.services.task_queue:celery_app worker -Q ocr -c 4
+    celery -A app.services.task_queue:celery_app worker -Q calc,llm -c 8
+
+Backpressure
+------------
+Uploads get a 503 once PIPELINE_QUEUE_MAX ocr messages wait in the broker
+(queue depth read at most once a second), or when the broker is unreachable.
+
+CELERY_TASK_ALWAYS_EAGER=true runs every stage in the submitting thread with
+no broker — for tests and single-process development.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services import pipeline
+from app.services.ocr_service import DocumentSource, delete_upload, load_source
+from app.services.upload_receiver import spill_path
+
+try:
+    from celery import Celery
+    _CELERY_OK = True
+except ImportError:
+    _CELERY_OK = False
+
+logger = logging.getLogger(__name__)
+
+QUEUE_OCR  = "ocr"
+QUEUE_CALC = "calc"
+QUEUE_LLM  = "llm"
+
+_DEPTH_TTL = 1.0            # seconds a broker queue-depth reading is reused
+
+
+# ── Source hand-off ───────────────────────────────────────────────────────────
+
+def _spill(task_id: str, filename: str, source: DocumentSource) -> str:
+    """The upload's path, writing an in-memory one to UPLOAD_DIR first."""
+    if isinstance(source, str):
+        return source
+    path = spill_path(task_id, filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        with open(path, "wb") as f:
+            f.write(load_source(source))
+    except BaseException:
+        delete_upload(path)
+        raise
+    return path
+
+
+@contextmanager
+def _failsafe(user_id: int, task_id: str, insights: bool = False) -> Iterator[None]:
+    """Record an unexpected crash as a failed pipeline (or insights) instead of leaving it mid-stage."""
+    try:
+        yield
+    except Exception as exc:
+        logger.exception("[pipeline:%s] Celery task crashed: %s", task_id, exc)
+        if insights:
+            pipeline.record_insights_failure(user_id, task_id, f"Insights crashed: {exc}")
+        else:
+            pipeline.record_failure(user_id, task_id, f"Pipeline crashed: {exc}")
+
+
+# ── Celery app + stage tasks ──────────────────────────────────────────────────
+
+celery_app: Optional["Celery"] = None
+
+if _CELERY_OK:
+    celery_app = Celery("taxmate", broker=settings.CELERY_BROKER_URL)
+    celery_app.conf.update(
+        task_routes={
+            "taxmate.pipeline.ocr":  {"queue": QUEUE_OCR},
+            "taxmate.pipeline.calc": {"queue": QUEUE_CALC},
+            "taxmate.pipeline.llm":  {"queue": QUEUE_LLM},
+        },
+        task_serializer="json",
+        accept_content=["json"],
+        task_ignore_result=True,            # state lives in result_store
+        worker_prefetch_multiplier=1,       # stages are long; don't hoard them
+        task_acks_late=True,                # redeliver what a dead worker was running
+        task_reject_on_worker_lost=True,
+        task_always_eager=settings.CELERY_TASK_ALWAYS_EAGER,
+    )
+
+    @celery_app.task(name="taxmate.pipeline.ocr")
+    def ocr_stage(
+        task_id: str,
+        user_id: int,
+        filename: str,
+        source: str,
+        digest: Optional[str] = None,
+        queued_at: Optional[float] = None,
+    ) -> None:
+        with _failsafe(user_id, task_id):
+            extracted = pipeline.run_extraction_stages(
+                source, filename, user_id, task_id, digest, queued_at,
+            )
+            if extracted is not None:
+                calc_stage.delay(task_id, user_id, extracted.to_payload())
+
+    @celery_app.task(name="taxmate.pipeline.calc")
+    def calc_stage(task_id: str, user_id: int, extracted: Dict[str, Any]) -> None:
+        insight_request = None
+        with _failsafe(user_id, task_id):
+            db = SessionLocal()
+            try:
+                insight_request = pipeline.run_calculation_stages(
+                    user_id, task_id, pipeline.ExtractedDocument.from_payload(extracted), db,
+                )
+            finally:
+                db.close()
+        if insight_request is not None:
+            with _failsafe(user_id, task_id, insights=True):     # the task is already complete
+                llm_stage.delay(task_id, user_id, insight_request.to_payload())
+
+    @celery_app.task(name="taxmate.pipeline.llm")
+    def llm_stage(task_id: str, user_id: int, insight_request: Dict[str, Any]) -> None:
+        with _failsafe(user_id, task_id, insights=True):
+            pipeline.run_insight_stage(user_id, task_id, pipeline.InsightRequest.from_payload(insight_request))
+
+
+# ── Executor ──────────────────────────────────────────────────────────────────
+
+class CeleryPipelineExecutor:
+    """
+    Drop-in for PipelineScheduler on the upload path.  Waiting happens in the
+    broker, so there is no local queue position; a broker that cannot be
+    reached, or an upload that cannot be spilled, is reported as
+    QueueFullError, which the API turns into a 503.
+    """
+
+    def __init__(self):
+        if not _CELERY_OK:
+            raise RuntimeError("PIPELINE_EXECUTOR=celery but the celery package is not installed")
+        if settings.RESULT_STORE == "memory" and not settings.CELERY_TASK_ALWAYS_EAGER:
+            logger.warning("RESULT_STORE=memory is not shared with Celery workers — use sql or redis.")
+        self._lock = threading.Lock()
+        self._counts = {"accepted": 0, "rejected": 0}
+        self._depth: Optional[int] = None       # ocr messages waiting; None: broker unreachable
+        self._depth_expires = 0.0
+
+    def submit(
+        self,
+        task_id: str,
+        source: DocumentSource,
+        filename: str,
+        user_id: int,
+        digest: Optional[str] = None,
+    ) -> Optional[int]:
+        """Enqueue the ocr stage.  Blocking (disk + broker I/O, or the whole pipeline when eager)."""
+        path = None
+        try:
+            path = _spill(task_id, filename, source)
+            ocr_stage.delay(task_id, user_id, filename, path, digest, time.time())
+        except Exception as exc:
+            if settings.CELERY_TASK_ALWAYS_EAGER:
+                raise
+            from app.services.scheduler import QueueFullError   # scheduler imports this module
+            logger.error("[pipeline:%s] Could not hand the upload to Celery: %s", task_id, exc)
+            if path is not None and path is not source:
+                delete_upload(path)
+            with self._lock:
+                self._counts["rejected"] += 1
+            raise QueueFullError(settings.PIPELINE_RETRY_AFTER_SECONDS) from exc
+        with self._lock:
+            self._counts["accepted"] += 1
+        return None
+
+    def has_capacity(self) -> bool:
+        """True while fewer than PIPELINE_QUEUE_MAX ocr messages wait in the broker.  Blocking."""
+        if settings.CELERY_TASK_ALWAYS_EAGER:
+            return True
+        depth = self._ocr_depth()
+        return depth is not None and depth < settings.PIPELINE_QUEUE_MAX
+
+    def _ocr_depth(self) -> Optional[int]:
+        now = time.monotonic()
+        with self._lock:
+            if now < self._depth_expires:
+                return self._depth
+        try:
+            with celery_app.connection_for_read() as conn:
+                queue = celery_app.amqp.queues[QUEUE_OCR].bind(conn.default_channel)
+                depth = queue.queue_declare().message_count
+        except Exception as exc:
+            logger.warning("Could not read the Celery %s queue depth: %s", QUEUE_OCR, exc)
+            depth = None
+        with self._lock:
+            self._depth, self._depth_expires = depth, now + _DEPTH_TTL
+        return depth
+
+    def retry_after(self) -> int:
+        return settings.PIPELINE_RETRY_AFTER_SECONDS
+
+    def position(self, task_id: str) -> Optional[int]:
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "executor":  "celery",
+                "eager":     settings.CELERY_TASK_ALWAYS_EAGER,
+                "queues":    [QUEUE_OCR, QUEUE_CALC, QUEUE_LLM],
+                "ocr_depth": self._depth,
+                **self._counts,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        pass                                # queued work stays in the broker
@@ -80,8 +80,9 @@ class TaxEngine:
 
         # ── Resolve policy values ──────────────────────────────────────────
         if policy is not None:
-            # Accept either a Pydantic model or a plain dict
-            _p = policy if isinstance(policy, dict) else policy.model_dump()
+            # Accept either a Pydantic model or a plain dict — dict(model) is a
+            # shallow field view; the engine only reads it, so no deep dump
+            _p = policy if isinstance(policy, dict) else dict(policy)
             old = _p.get("old_regime", {})
             new = _p.get("new_regime", {})
             self._policy_id         = _p.get("policy_id")
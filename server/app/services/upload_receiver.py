@@ -0,0 +1,234 @@
+"""
+TaxMate — Streaming Upload Receiver
+===================================
+Reads a multipart/form-data document upload straight off the ASGI request
+stream instead of letting the framework buffer the whole body first.
+
+- The body is consumed chunk by chunk as it arrives; the only blocking work
+  (writing large uploads to disk) runs in the threadpool, so one slow or
+  large upload never stalls the event loop.
+- UPLOAD_MAX_BYTES is enforced while reading — an oversized upload is
+  rejected the moment it crosses the limit, not after it has been stored.
+- The SHA-256 content hash is computed in the same pass, so the extraction
+  cache never re-reads the document.
+- Uploads up to UPLOAD_IN_MEMORY_MAX_BYTES stay in memory and never touch
+  disk; larger ones spill to UPLOAD_DIR/{task_id}{ext}.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from typing import BinaryIO, Collection, List, Optional, Union
+
+from python_multipart import MultipartParser
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import parse_options_header
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Headroom over UPLOAD_MAX_BYTES for the multipart envelope (boundaries,
+# part headers, other form fields) when checking a declared Content-Length.
+_ENVELOPE_BYTES = 64 * 1024
+
+
+# ─── Custom exceptions ────────────────────────────────────────────────────────
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload crosses UPLOAD_MAX_BYTES."""
+
+
+class UploadFormatError(Exception):
+    """Raised for a malformed body, a missing file part or a disallowed file type."""
+
+
+def spill_path(task_id: str, filename: str) -> str:
+    """Where an upload that does not stay in memory is written: UPLOAD_DIR/{task_id}{ext}."""
+    return os.path.join(settings.UPLOAD_DIR, f"{task_id}{os.path.splitext(filename)[1].lower()}")
+
+
+def _too_large() -> UploadTooLargeError:
+    return UploadTooLargeError(
+        f"File exceeds the {settings.UPLOAD_MAX_BYTES / (1024 * 1024):g} MB upload limit."
+    )
+
+
+@dataclass
+class ReceivedUpload:
+    filename: str
+    source: Union[str, bytes]   # the document's bytes, or the path it was spilled to
+    digest: str                 # SHA-256 hex of the document
+    size: int
+
+
+class _FileSink:
+    """
+    Collects the file part.  Chunks are size-checked and hashed as the parser
+    emits them and buffered in memory; past the in-memory threshold the buffer
+    moves to the spill file and later chunks are written in the threadpool.
+    """
+
+    def __init__(self, spill_path: str):
+        self.spill_path = spill_path
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self._buffer = bytearray()
+        self._pending: List[bytes] = []
+        self._file: Optional[BinaryIO] = None
+
+    def feed(self, data: bytes) -> None:
+        """Parser callback — synchronous, so it only queues the chunk."""
+        self.size += len(data)
+        if self.size > settings.UPLOAD_MAX_BYTES:
+            raise _too_large()
+        self.hash.update(data)
+        self._pending.append(data)
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        chunks, self._pending = self._pending, []
+        if self._file is None:
+            for chunk in chunks:
+                self._buffer += chunk
+            if len(self._buffer) <= settings.UPLOAD_IN_MEMORY_MAX_BYTES:
+                return
+            self._file = await run_in_threadpool(open, self.spill_path, "wb")
+            chunks, self._buffer = [bytes(self._buffer)], bytearray()
+        await run_in_threadpool(self._file.writelines, chunks)
+
+    async def finish(self) -> Union[str, bytes]:
+        await self.flush()
+        if self._file is None:
+            return bytes(self._buffer)
+        await run_in_threadpool(self._file.close)
+        return self.spill_path
+
+    async def discard(self) -> None:
+        self._buffer = bytearray()
+        if self._file is not None:
+            await run_in_threadpool(self._file.close)
+            await run_in_threadpool(_remove_quietly, self.spill_path)
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError as exc:
+        logger.warning("Could not remove partial upload %s: %s", path, exc)
+
+
+class _UploadParser:
+    """python-multipart callbacks that route the `field_name` file part into a _FileSink."""
+
+    def __init__(self, boundary: bytes, field_name: str, task_id: str, allowed_extensions: Collection[str]):
+        self._field_name = field_name
+        self._task_id = task_id
+        self._allowed = allowed_extensions
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._in_file = False
+        self.filename = ""
+        self.sink: Optional[_FileSink] = None
+        self.complete = False
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin":       self.on_part_begin,
+            "on_part_data":        self.on_part_data,
+            "on_part_end":         self.on_part_end,
+            "on_header_field":     self.on_header_field,
+            "on_header_value":     self.on_header_value,
+            "on_header_end":       self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        })
+
+    def on_part_begin(self) -> None:
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        if self.sink is not None or b"filename" not in options:
+            return                  # other form fields / extra files are ignored
+        if options.get(b"name", b"").decode("latin-1") != self._field_name:
+            return
+        filename = options[b"filename"].decode("utf-8", "replace")
+        ext = os.path.splitext(filename)[1].lower()
+        if ext not in self._allowed:
+            raise UploadFormatError(
+                f"Unsupported file type '{ext}'. Allowed: {', '.join(sorted(self._allowed))}"
+            )
+        self.filename = filename
+        self.sink = _FileSink(spill_path(self._task_id, filename))
+        self._in_file = True
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self.sink.feed(data[start:end])
+
+    def on_part_end(self) -> None:
+        if self._in_file:
+            self._in_file = False
+            self.complete = True
+
+
+async def receive_upload(
+    request: Request,
+    task_id: str,
+    allowed_extensions: Collection[str],
+    field_name: str = "file",
+) -> ReceivedUpload:
+    """
+    Stream the `field_name` file part of a multipart request into memory or
+    its spill file.  Raises UploadTooLargeError / UploadFormatError; a partly
+    written spill file is removed on any failure, including a client disconnect.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadFormatError("Expected a multipart/form-data upload.")
+
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > settings.UPLOAD_MAX_BYTES + _ENVELOPE_BYTES:
+        raise _too_large()
+
+    upload = _UploadParser(params[b"boundary"], field_name, task_id, allowed_extensions)
+    try:
+        async for chunk in request.stream():
+            upload.parser.write(chunk)
+            if upload.sink is not None:
+                await upload.sink.flush()
+        upload.parser.finalize()
+        if upload.sink is None or not upload.complete:
+            raise UploadFormatError(f"No '{field_name}' file part in the upload.")
+        source = await upload.sink.finish()
+    except MultipartParseError as exc:
+        if upload.sink is not None:
+            await upload.sink.discard()
+        raise UploadFormatError(f"Malformed multipart body: {exc}") from exc
+    except BaseException:
+        if upload.sink is not None:
+            await upload.sink.discard()
+        raise
+
+    return ReceivedUpload(
+        filename=upload.filename,
+        source=source,
+        digest=upload.sink.hash.hexdigest(),
+        size=upload.sink.size,
+    )
@@ -0,0 +1,213 @@
+"""
+Synthetic document corpus for the extraction benchmarks.
+
+Writes small, valid PDFs by hand (no PDF library needed) so the benchmarks
+can run anywhere pdfplumber is installed.  Pages are either prose-like
+(salary slip / rent receipt) or a ruled transaction table (bank statement).
+Image documents (phone-photo receipts, scanned salary slips) need Pillow.
+"""
+
+from __future__ import annotations
+
+import random
+from datetime import date, timedelta
+from typing import List, Tuple
+
+# (x, y, text) triples and ((x0, y0), (x1, y1)) line segments for one page
+_Text = Tuple[float, float, str]
+_Line = Tuple[Tuple[float, float], Tuple[float, float]]
+
+
+def _escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _content_stream(texts: List[_Text], lines: List[_Line]) -> bytes:
+    ops = ["0.5 w"]
+    for (x0, y0), (x1, y1) in lines:
+        ops.append(f"{x0:.1f} {y0:.1f} m {x1:.1f} {y1:.1f} l S")
+    for x, y, s in texts:
+        ops.append(f"BT /F1 9 Tf {x:.1f} {y:.1f} Td ({_escape(s)}) Tj ET")
+    return "\n".join(ops).encode("latin-1", "replace")
+
+
+def write_pdf(path: str, pages: List[Tuple[List[_Text], List[_Line]]]) -> None:
+    """Write `pages` (text runs + ruling lines per page) as an A4 PDF."""
+    objects: List[bytes] = []
+    n_pages = len(pages)
+    font_id = 3
+    first_page_id = 4
+    kids = " ".join(f"{first_page_id + 2 * i} 0 R" for i in range(n_pages))
+
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {n_pages} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for i, (texts, lines) in enumerate(pages):
+        content_id = first_page_id + 2 * i + 1
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> "
+            f"/Contents {content_id} 0 R >>".encode()
+        )
+        stream = _content_stream(texts, lines)
+        objects.append(
+            f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream"
+        )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{n} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref_at = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for off in offsets:
+        out += f"{off:010d} 00000 n \n".encode()
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref_at}\n%%EOF\n"
+    ).encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def statement_page(rng: random.Random, start: date, rows: int = 40) -> Tuple[List[_Text], List[_Line]]:
+    """A ruled bank-statement page: Date | Narration | Amount | Balance."""
+    cols = [40, 120, 400, 480, 560]
+    top, step = 800, 18
+    texts: List[_Text] = [(cols[0] + 3, top - 13, "Txn Date"), (cols[1] + 3, top - 13, "Narration"),
+                          (cols[2] + 3, top - 13, "Amount"), (cols[3] + 3, top - 13, "Balance")]
+    balance = rng.uniform(20_000, 200_000)
+    for r in range(1, rows + 1):
+        y = top - step * r - 13
+        d = start + timedelta(days=r)
+        amt = round(rng.uniform(100, 25_000), 2)
+        balance += amt if rng.random() < 0.3 else -amt
+        narration = rng.choice(["UPI/GROCERY MART", "NEFT SALARY CREDIT", "IMPS TRANSFER",
+                                "ATM WITHDRAWAL", "EMI HOME LOAN HDFC Bank", "POS FUEL STATION"])
+        texts += [(cols[0] + 3, y, d.strftime("%d/%m/%Y")), (cols[1] + 3, y, narration),
+                  (cols[2] + 3, y, f"{amt:,.2f}"), (cols[3] + 3, y, f"{balance:,.2f}")]
+    bottom = top - step * (rows + 1)
+    lines: List[_Line] = [((cols[0], top - step * r), (cols[-1], top - step * r)) for r in range(rows + 2)]
+    lines += [((x, top), (x, bottom)) for x in cols]
+    return texts, lines
+
+
+def prose_page(
+    rng: random.Random, title: str, lines_of_text: int = 45, framed: bool = False,
+) -> Tuple[List[_Text], List[_Line]]:
+    """
+    A text-only page (payslip narrative / receipt / terms).  `framed` adds a
+    page border, a title rule, dashed separators and a signature line, as
+    printed receipts often have — hundreds of ruling segments, but no table.
+    """
+    words = ["salary", "allowance", "payable", "employee", "period", "month", "house", "rent",
+             "received", "towards", "premises", "declaration", "policy", "statement", "terms"]
+    texts: List[_Text] = [(40, 800, title)]
+    for i in range(lines_of_text):
+        sentence = " ".join(rng.choice(words) for _ in range(12))
+        texts.append((40, 780 - 16 * i, f"{sentence} Rs. {rng.randint(1_000, 90_000):,}"))
+    if not framed:
+        return texts, []
+    left, right, top, bottom = 30, 565, 815, 40
+    lines: List[_Line] = [
+        ((left, top), (right, top)), ((left, bottom), (right, bottom)),
+        ((left, top), (left, bottom)), ((right, top), (right, bottom)),
+        ((40, 795), (300, 795)),                # title rule
+        ((400, 60), (540, 60)),                 # signature line
+    ]
+    for i in range(8, lines_of_text, 9):        # dashed separator every 9 lines
+        y = 774 - 16 * i
+        lines += [((40 + 6 * j, y), (43 + 6 * j, y)) for j in range(85)]
+    return texts, lines
+
+
+def bank_statement(path: str, pages: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    start = date(2024, 4, 1)
+    write_pdf(path, [statement_page(rng, start + timedelta(days=40 * p)) for p in range(pages)])
+
+
+def mixed_document(
+    path: str, pages: int, tabular_every: int = 4, seed: int = 11, framed: bool = False,
+) -> None:
+    """Mostly prose pages with a ruled table every `tabular_every` pages."""
+    rng = random.Random(seed)
+    start = date(2024, 4, 1)
+    write_pdf(path, [
+        statement_page(rng, start) if p % tabular_every == 0
+        else prose_page(rng, f"Page {p + 1}", framed=framed)
+        for p in range(pages)
+    ])
+
+
+def _labelled_pdf(path: str, rng: random.Random, title: str, fields: List[str], filler_lines: int) -> None:
+    """A one-page text document: title, labelled values, then filler prose."""
+    texts, _ = prose_page(rng, title, lines_of_text=filler_lines)
+    texts = [texts[0]] + [(40, 780 - 16 * i, line) for i, line in enumerate(fields)] + [
+        (x, y - 16 * len(fields), s) for x, y, s in texts[1:]
+    ]
+    write_pdf(path, [(texts, [])])
+
+
+def salary_slip_pdf(path: str, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    _labelled_pdf(path, rng, "Employee Payslip for the month of March 2025", [
+        f"Basic Salary: Rs. {rng.randint(30, 90) * 1000:,}",
+        f"House Rent Allowance: Rs. {rng.randint(10, 40) * 1000:,}",
+        f"Provident Fund: Rs. {rng.randint(1, 5) * 1800:,}",
+        f"Net Pay: Rs. {rng.randint(40, 120) * 1000:,}.00",
+    ], filler_lines=20)
+
+
+def rent_receipt_pdf(path: str, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    _labelled_pdf(path, rng, "Rent Receipt", [
+        f"Received from the tenant the monthly rent for {rng.choice(['April', 'May', 'June'])} 2024",
+        f"Monthly Rent: Rs. {rng.randint(8, 60) * 1000:,}",
+        f"Landlord PAN: ABCDE{rng.randint(1000, 9999)}F",
+    ], filler_lines=15)
+
+
+def receipt_photo(path: str, seed: int = 0) -> None:
+    """A 12 MP phone photo (JPEG, EXIF-free) of a till receipt on a grey desk."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    rng = random.Random(seed)
+    image = Image.new("RGB", (3024, 4032), (rng.randint(90, 140),) * 3)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((700, 300, 2300, 3800), fill=(245, 242, 235))
+    font = ImageFont.load_default(size=56)
+    y = 380
+    for line in ["GROCERY MART", f"Bill No {rng.randint(1000, 9999)}", "-" * 24]:
+        draw.text((780, y), line, fill=(30, 30, 30), font=font)
+        y += 90
+    for _ in range(rng.randint(12, 25)):
+        draw.text((780, y), f"Item {rng.randint(10, 99)}  Rs. {rng.randint(20, 900)}.00",
+                  fill=(30, 30, 30), font=font)
+        y += 90
+    draw.text((780, y + 60), f"TOTAL  Rs. {rng.randint(1_000, 9_000)}.00", fill=(0, 0, 0), font=font)
+    image.save(path, "JPEG", quality=90)
+
+
+def salary_slip_scan(path: str, seed: int = 0, dpi: int = 150) -> None:
+    """An A4 salary slip scanned at `dpi` (PNG with DPI metadata)."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    rng = random.Random(seed)
+    width, height = int(8.27 * dpi), int(11.69 * dpi)
+    image = Image.new("L", (width, height), 250)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=max(10, dpi // 8))
+    rows = [
+        "Employee Payslip for the month of March 2025",
+        f"Basic Salary: Rs. {rng.randint(30, 90) * 1000:,}",
+        f"House Rent Allowance: Rs. {rng.randint(10, 40) * 1000:,}",
+        f"Conveyance Allowance: Rs. {rng.randint(1, 3) * 800:,}",
+        f"Provident Fund: Rs. {rng.randint(1, 5) * 1800:,}",
+        "Professional Tax: Rs. 200",
+        f"Net Pay: Rs. {rng.randint(40, 120) * 1000:,}.00",
+    ]
+    for i, row in enumerate(rows):
+        draw.text((dpi // 2, dpi // 2 + i * dpi // 3), row, fill=20, font=font)
+    image.save(path, "PNG", dpi=(dpi, dpi))
@@ -0,0 +1,64 @@
+"""
+Benchmark: generic vs column-sniffing cell parsing on large statements.
+
+    cd server && python -m benchmarks.bench_column_parsing [rows ...]
+
+Builds an in-memory CSV bank export (one date format, a year of dates,
+mostly distinct amounts) and times ``_parse_csv_transactions`` with the
+generic ``_parse_date`` / ``_parse_amount`` per cell ("before") and with the
+per-column parsers from ``_date_column`` / ``_amount_column`` ("after").  Both must return identical
+transactions.
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from app.services import ocr_service as ocr
+
+
+def _rows(n: int, seed: int = 5):
+    rng = random.Random(seed)
+    start = date(2024, 4, 1)
+    rows = [["Txn Date", "Narration", "Withdrawal Amount", "Closing Balance"]]
+    for i in range(n):
+        day = start + timedelta(days=i * 365 // n)
+        rows.append([
+            day.strftime("%d/%m/%Y"),
+            f"UPI/{rng.randint(10**9, 10**10)}/MERCHANT {rng.randint(1, 500)}",
+            f"{rng.uniform(10, 90_000):,.2f}",
+            f"{rng.uniform(0, 500_000):,.2f}",
+        ])
+    return rows
+
+
+def _time(rows, generic: bool, repeat: int = 3):
+    date_column, amount_column = ocr._date_column, ocr._amount_column
+    if generic:
+        ocr._date_column, ocr._amount_column = (lambda: ocr._parse_date), (lambda: ocr._parse_amount)
+    try:
+        best, out = float("inf"), None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            out = ocr._parse_csv_transactions(rows)
+            best = min(best, time.perf_counter() - t0)
+    finally:
+        ocr._date_column, ocr._amount_column = date_column, amount_column
+    return best, out
+
+
+def main(sizes) -> None:
+    print(f"{'rows':>8} {'txns':>8} {'before s':>9} {'after s':>9} {'speedup':>8}")
+    for n in sizes:
+        rows = _rows(n)
+        before, expected = _time(rows, generic=True)
+        after, got = _time(rows, generic=False)
+        assert got == expected
+        print(f"{n:>8} {len(got):>8} {before:>9.3f} {after:>9.3f} {before / after:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000])
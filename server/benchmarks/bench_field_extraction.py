@@ -0,0 +1,130 @@
+"""
+Micro-benchmark: per-document scalar field extraction, before vs after the
+one-pass tokenizer.
+
+    cd server && python -m benchmarks.bench_field_extraction [lines ...]
+
+"before" re-implements the previous extractors — several IGNORECASE
+``re.search`` calls per field plus a full ``_largest_amount`` rescan for each
+keyword fallback.  "after" builds one ``_DocTokens`` and runs the five
+extractors on it.  Both must produce identical fields.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import sys
+import time
+
+from app.services import ocr_service as ocr
+
+_V = r"\s*[:\-₹Rs\.]*\s*([\d,]+(?:\.\d{1,2})?)"
+_LEGACY = {
+    "salary": [r"(?:net\s*pay|take\s*home|in\s*hand)" + _V,
+               r"(?:gross\s*salary|gross\s*pay|ctc)" + _V,
+               r"(?:basic\s*salary|basic\s*pay)" + _V],
+    "rent": [r"(?:rent\s*paid|monthly\s*rent|house\s*rent|rental\s*amount)" + _V,
+             r"(?:amount|total)" + _V + r"\s*(?:towards\s*rent|as\s*rent)"],
+    "interest": [r"(?:interest\s*(?:income|earned|credited|received)|fd\s*interest|savings\s*interest)" + _V,
+                 r"([\d,]+(?:\.\d{1,2})?)\s*(?:credited\s*as\s*interest|as\s*interest\s*income)"],
+    "savings": [r"(?:total\s*(?:80c\s*)?(?:investments?|deductions?|savings?)|annual\s*savings?)" + _V,
+                r"(?:80c|80\s*c)" + _V],
+}
+_LEGACY_KW = {"salary": ocr._KW_SALARY, "rent": ocr._KW_RENT,
+              "interest": ocr._KW_INTEREST, "savings": ocr._KW_INVEST}
+_LEGACY_CG = {k: re.compile(p + _V, re.IGNORECASE) for k, p in {
+    "stcg": r"(?:stcg|short[\s\-]?term\s*(?:capital\s*)?gain)",
+    "ltcg": r"(?:ltcg|long[\s\-]?term\s*(?:capital\s*)?gain)",
+    "stocks": r"(?:equity|shares|stocks?)\s*(?:gain|profit|proceeds)",
+    "mf": r"(?:mutual\s*fund|mf|elss)\s*(?:redemption|gain|profit|proceeds)",
+}.items()}
+
+
+def _legacy_largest(text):
+    amounts = []
+    for m in ocr._RE_AMOUNT.finditer(text):
+        try:
+            amounts.append(float(m.group(1).replace(",", "")))
+        except ValueError:
+            pass
+    return max(amounts) if amounts else None
+
+
+def _legacy_scalar(text, field):
+    for pat in _LEGACY[field]:
+        m = re.search(pat, text, re.IGNORECASE)
+        if m:
+            try:
+                return float(m.group(1).replace(",", ""))
+            except ValueError:
+                pass
+    if any(kw in text.lower() for kw in _LEGACY_KW[field]):
+        return _legacy_largest(text)
+    return None
+
+
+def _legacy_capital_gains(text):
+    def first(pat):
+        m = pat.search(text)
+        if m:
+            try:
+                return float(m.group(1).replace(",", ""))
+            except ValueError:
+                pass
+        return None
+    stocks = first(_LEGACY_CG["stocks"]) or first(_LEGACY_CG["stcg"]) or first(_LEGACY_CG["ltcg"])
+    mfs = first(_LEGACY_CG["mf"])
+    if stocks is None and mfs is None and any(kw in text.lower() for kw in ocr._KW_CAP_GAINS):
+        stocks = _legacy_largest(text)
+    return {"stocks": stocks, "mutual_funds": mfs}
+
+
+def before(text):
+    return (_legacy_scalar(text, "salary"), _legacy_scalar(text, "rent"),
+            _legacy_scalar(text, "interest"), _legacy_scalar(text, "savings"),
+            _legacy_capital_gains(text))
+
+
+def after(text):
+    tokens = ocr._DocTokens(text)
+    return (ocr._extract_salary(text, tokens), ocr._extract_rent(text, tokens),
+            ocr._extract_interest_income(text, tokens), ocr._extract_annual_savings(text, tokens),
+            ocr._extract_capital_gains(text, tokens))
+
+
+def _document(lines: int, seed: int = 3) -> str:
+    rng = random.Random(seed)
+    body = [
+        "Employee Payslip for the month of March 2025",
+        f"Basic Salary: Rs. {rng.randint(30, 90) * 1000:,}",
+        f"House Rent Allowance (HRA) {rng.randint(10, 40) * 1000:,}",
+    ]
+    for _ in range(lines):
+        body.append(rng.choice([
+            f"{rng.randint(1, 28):02d}/0{rng.randint(1, 9)}/2024 UPI/GROCERY MART {rng.uniform(50, 9000):,.2f}",
+            f"Particulars of deduction {rng.randint(100, 5000)} professional tax",
+            "Leave balance carried forward as per company policy",
+            f"Conveyance allowance INR {rng.randint(800, 3200)}",
+        ]))
+    body.append(f"Net Pay : ₹{rng.randint(40, 120) * 1000:,}.00")
+    return "\n".join(body)
+
+
+def main(sizes) -> None:
+    print(f"{'lines':>7} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for lines in sizes:
+        text = _document(lines)
+        assert before(text) == after(text), (before(text), after(text))
+        repeat = max(3, 2000 // max(lines, 1))
+        timings = []
+        for fn in (before, after):
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                fn(text)
+            timings.append((time.perf_counter() - t0) * 1000 / repeat)
+        print(f"{lines:>7} {timings[0]:>10.2f} {timings[1]:>10.2f} {timings[0] / timings[1]:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [50, 500, 5000])
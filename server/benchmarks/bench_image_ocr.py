@@ -0,0 +1,95 @@
+"""
+Benchmark: image OCR throughput, raw pytesseract vs the pooled engine.
+
+    cd server && python -m benchmarks.bench_image_ocr [image_dir] [concurrency]
+
+Uses every .jpg/.jpeg/.png/.tif in `image_dir`, or a synthetic corpus of
+12 MP receipt photos and 150 DPI salary-slip scans when none is given.
+"before" is the old path — ``pytesseract.image_to_string`` on the
+full-resolution image, one call at a time; "after" submits the corpus from
+`concurrency` request threads to ``image_ocr.ocr_image_file``.  Preprocessing
+cost and the pixel count handed to Tesseract are reported separately, so the
+downscaling win is visible even where no tesseract binary is installed.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from app.core.config import settings
+from app.services import image_ocr
+from benchmarks._corpus import receipt_photo, salary_slip_scan
+
+_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tif", ".tiff")
+
+
+def _corpus(directory: str, images: int = 8) -> None:
+    for i in range(images):
+        if i % 2:
+            salary_slip_scan(os.path.join(directory, f"slip_{i}.png"), seed=i)
+        else:
+            receipt_photo(os.path.join(directory, f"receipt_{i}.jpg"), seed=i)
+
+
+def _preprocess_stats(paths):
+    t0 = time.perf_counter()
+    before_px = after_px = 0
+    for path in paths:
+        with Image.open(path) as image:
+            before_px += image.width * image.height
+            out = image_ocr.preprocess(image)
+            after_px += out.width * out.height
+    return (time.perf_counter() - t0) * 1000 / len(paths), before_px / 1e6, after_px / 1e6
+
+
+def _before(paths) -> float:
+    import pytesseract
+    t0 = time.perf_counter()
+    for path in paths:
+        with Image.open(path) as image:
+            pytesseract.image_to_string(image)
+    return time.perf_counter() - t0
+
+
+def _after(paths, concurrency: int) -> float:
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as requests:
+        list(requests.map(image_ocr.ocr_image_file, paths))
+    return time.perf_counter() - t0
+
+
+def main(image_dir: str, concurrency: int) -> None:
+    paths = sorted(
+        os.path.join(image_dir, name) for name in os.listdir(image_dir)
+        if name.lower().endswith(_EXTENSIONS)
+    )
+    ms, mp_in, mp_out = _preprocess_stats(paths)
+    print(f"images={len(paths)}  workers={settings.OCR_IMAGE_WORKERS}  "
+          f"engine={'tesserocr' if image_ocr._TESSEROCR_OK else 'pytesseract'}")
+    print(f"preprocess: {ms:.1f} ms/image, {mp_in:.1f} MP in → {mp_out:.1f} MP to tesseract")
+
+    if shutil.which("tesseract") is None and not image_ocr._TESSEROCR_OK:
+        print("tesseract binary not found — skipping recognition timings")
+        return
+    before = _before(paths)
+    after = _after(paths, concurrency)
+    print(f"{'':>8} {'total s':>8} {'img/s':>7}")
+    print(f"{'before':>8} {before:>8.2f} {len(paths) / before:>7.2f}")
+    print(f"{'after':>8} {after:>8.2f} {len(paths) / after:>7.2f}   ({before / after:.2f}x)")
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    if len(sys.argv) > 1:
+        main(sys.argv[1], concurrency)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            _corpus(tmp)
+            main(tmp, concurrency)
@@ -0,0 +1,73 @@
+"""
+Benchmark: PDF backends per document class — speed and field accuracy.
+
+    cd server && python -m benchmarks.bench_pdf_backends [docs_per_class] [min_accuracy]
+
+Runs every available backend in ``pdf_backends.BACKENDS`` over a synthetic
+corpus of salary slips, rent receipts and ruled bank statements, extracts
+fields from each result exactly as ``process_document`` would, and scores
+accuracy as the share of documents whose fields match pdfplumber's.  The
+suggested route per class is the fastest backend at or above
+`min_accuracy` — ``ocr_service._PDF_ROUTES`` holds the defaults chosen this
+way.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+
+from app.services import ocr_service as ocr
+from app.services import pdf_backends
+from benchmarks._corpus import bank_statement, rent_receipt_pdf, salary_slip_pdf
+
+_CLASSES = {
+    "salary slip":    salary_slip_pdf,
+    "rent receipt":   rent_receipt_pdf,
+    "bank statement": lambda path, seed: bank_statement(path, pages=2, seed=seed),
+}
+
+
+def _fields(backend, path: str, doc_type: str):
+    pages = backend.extract_pages(path, list(range(backend.page_count(path))))
+    text = "".join(t + "\n" for _, t, _, _ in pages if t)
+    tables = [table for _, _, ts, _ in pages for table in ts]
+    return ocr._run_extractors(doc_type, text, tables, ocr._DocTokens(text))
+
+
+def main(docs: int, min_accuracy: float) -> None:
+    backends = [b for b in pdf_backends.BACKENDS.values() if b.available]
+    reference = pdf_backends.BACKENDS["pdfplumber"]
+    print(f"backends: {', '.join(b.name for b in backends)}   min accuracy {min_accuracy:.0%}")
+    print(f"{'class':<16} {'backend':<11} {'ms/doc':>8} {'accuracy':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, make in _CLASSES.items():
+            paths = [os.path.join(tmp, f"{label.replace(' ', '_')}_{i}.pdf") for i in range(docs)]
+            for seed, path in enumerate(paths):
+                make(path, seed)
+            expected = {}
+            for path in paths:
+                text = "".join(t for _, t, _, _ in reference.extract_pages(path, [0]))
+                doc_type = ocr._classify_document(text)
+                expected[path] = (doc_type, _fields(reference, path, doc_type))
+
+            scores = []
+            for backend in backends:
+                t0 = time.perf_counter()
+                results = {p: _fields(backend, p, expected[p][0]) for p in paths}
+                ms = (time.perf_counter() - t0) * 1000 / docs
+                accuracy = sum(results[p] == expected[p][1] for p in paths) / docs
+                scores.append((ms, accuracy, backend.name))
+                print(f"{label:<16} {backend.name:<11} {ms:>8.1f} {accuracy:>9.0%}")
+            ok = [s for s in scores if s[1] >= min_accuracy]
+            best = min(ok)[2] if ok else reference.name
+            print(f"{'':<16} → route {expected[paths[0]][0]!r} to {best}")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 1.0,
+    )
@@ -0,0 +1,49 @@
+"""
+Benchmark: inline vs page-sharded PDF extraction.
+
+    cd server && python -m benchmarks.bench_pdf_pages [pages ...]
+
+Generates synthetic multi-page bank statements and times
+``ocr_service._extract_raw_pdf`` with sharding disabled and enabled.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+
+from app.core.config import settings
+from app.services import ocr_service
+from benchmarks._corpus import bank_statement
+
+
+def _time(path: str, concurrency: int, repeat: int = 3) -> float:
+    settings.OCR_PDF_PAGE_CONCURRENCY = concurrency
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        raw = ocr_service._extract_raw_pdf(path)
+        best = min(best, time.perf_counter() - t0)
+        assert raw.parse_error is None, raw.parse_error
+    return best
+
+
+def main(page_counts) -> None:
+    settings.PDF_BACKEND = "pdfplumber"
+    shards = settings.OCR_PDF_PAGE_CONCURRENCY
+    print(f"workers={settings.OCR_PDF_WORKERS or os.cpu_count()}  page_concurrency={shards}")
+    print(f"{'pages':>6} {'inline s':>10} {'sharded s':>10} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in page_counts:
+            path = os.path.join(tmp, f"statement_{pages}.pdf")
+            bank_statement(path, pages)
+            ocr_service._extract_raw_pdf(path)          # warm the pool
+            inline = _time(path, concurrency=1)
+            sharded = _time(path, concurrency=shards)
+            print(f"{pages:>6} {inline:>10.3f} {sharded:>10.3f} {inline / sharded:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [4, 10, 20, 40])
@@ -0,0 +1,208 @@
+"""
+Benchmark: dict round-trips vs the typed ExtractionResult hand-off between stages.
+
+    cd server && python -m benchmarks.bench_stage_handoff [transactions ...]
+
+Builds one statement-sized ExtractionResult and an active policy, then runs
+the in-process work between OCR and the insights call both ways:
+
+before — process_document dumps the model to a dict; validation and the
+         calculation read the dict, TaxEngine dumps the policy again, the
+         rule engine rebuilds CapitalGains / DocumentMetadata /
+         ExtractionResult (re-validating every transaction) from the dict,
+         and the insights request carries yet another policy dump.
+after  — pipeline's helpers on the model itself; one JSON dump for the
+         record and the extraction cache.
+
+Both must produce identical calculations and analysis.  Prints the
+per-task total and a per-step breakdown for each size.
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import time
+from typing import Any, Dict
+
+from app.schemas.analysis import AnalysisRequest
+from app.schemas.extraction import (
+    BankTransaction, CapitalGains, DocumentMetadata, EMIPayment, ExtractionResult, OtherSpending,
+)
+from app.schemas.tax_policy import ActivePolicyContext
+from app.services import pipeline
+from app.services.ai_engine import run_analysis
+from app.services.tax_engine import TaxEngine
+
+_STEPS = ("dump", "validate", "calculate", "analyse", "insights")
+
+
+def _extraction(n: int, seed: int = 11) -> ExtractionResult:
+    rng = random.Random(seed)
+    return ExtractionResult(
+        salary=1_450_000.0,
+        bank_transactions=[
+            BankTransaction(date=f"2024-{rng.randint(4, 12):02d}-{rng.randint(1, 28):02d}",
+                            amount=round(rng.uniform(-90_000, 90_000), 2),
+                            description=f"UPI/{rng.randint(10**9, 10**10)}/MERCHANT {rng.randint(1, 500)}")
+            for _ in range(n)
+        ],
+        rent_paid=240_000.0,
+        emi_payments=[
+            EMIPayment(date=f"2024-{m:02d}-05", amount=32_500.0, lender="HDFC BANK") for m in range(4, 13)
+        ],
+        interest_income=18_400.0,
+        capital_gains=CapitalGains(stocks=56_000.0, mutual_funds=12_000.0),
+        annual_savings=150_000.0,
+        other_spendings=[OtherSpending(category="insurance", amount=25_000.0)],
+        document_metadata=[
+            DocumentMetadata(document_type="Bank Statements", status="parsed"),
+            DocumentMetadata(document_type="Form 16", status="parsed"),
+        ],
+    )
+
+
+def _policy() -> ActivePolicyContext:
+    return ActivePolicyContext(
+        policy_id=1, financial_year="FY 2025-26", version="1.0",
+        effective_from="2025-04-01", effective_to="2026-03-31", filing_deadline="2026-07-31",
+        standard_deduction=75_000,
+        deduction_limits={"80C": 150_000, "80D_general": 25_000, "80D_senior": 50_000, "80CCD1B": 50_000},
+        old_regime={"slabs": [{"min": 0, "max": 250_000, "rate": 0.0}, {"min": 250_000, "max": 500_000, "rate": 0.05},
+                              {"min": 500_000, "max": 1_000_000, "rate": 0.2}, {"min": 1_000_000, "max": None, "rate": 0.3}],
+                    "rebate_limit": 500_000, "rebate_amount": 12_500},
+        new_regime={"slabs": [{"min": 0, "max": 400_000, "rate": 0.0}, {"min": 400_000, "max": 800_000, "rate": 0.05},
+                              {"min": 800_000, "max": 1_200_000, "rate": 0.1}, {"min": 1_200_000, "max": 1_600_000, "rate": 0.15},
+                              {"min": 1_600_000, "max": 2_000_000, "rate": 0.2}, {"min": 2_000_000, "max": 2_400_000, "rate": 0.25},
+                              {"min": 2_400_000, "max": None, "rate": 0.3}],
+                    "rebate_limit": 1_200_000, "rebate_amount": 60_000},
+        cess_rate=0.04,
+        eligibility_flags={"new_regime_default": True},
+    )
+
+
+# ── before: the dict hand-off ─────────────────────────────────────────────────
+
+def _legacy_has_financial_data(extraction: Dict[str, Any]) -> bool:
+    candidates = [extraction.get(k) for k in (
+        "salary", "rent_paid", "interest_income", "annual_savings",
+        "bank_transactions", "emi_payments", "other_spendings",
+    )]
+    cg = extraction.get("capital_gains", {})
+    if isinstance(cg, dict):
+        candidates += [cg.get("stocks"), cg.get("mutual_funds")]
+    return any((v is not None and v != [] and v != {}) for v in candidates if v is not None)
+
+
+def _legacy_calculations(extraction: Dict[str, Any], policy: ActivePolicyContext) -> Dict[str, Any]:
+    income, deductions = {}, {}
+    if extraction.get("salary"):
+        income["salary"] = float(extraction["salary"])
+    if extraction.get("interest_income"):
+        income["interest"] = float(extraction["interest_income"])
+    cg = extraction.get("capital_gains", {})
+    if cg.get("stocks"):
+        income["capital_gains_stocks"] = float(cg["stocks"])
+    if cg.get("mutual_funds"):
+        income["capital_gains_mf"] = float(cg["mutual_funds"])
+    if extraction.get("annual_savings"):
+        deductions["80C_savings"] = min(float(extraction["annual_savings"]), 150000.0)
+    if extraction.get("rent_paid") and extraction.get("salary"):
+        deductions["hra"] = min(float(extraction["rent_paid"]), float(extraction["salary"]) * 0.40)
+    # TaxEngine used to call policy.model_dump() itself
+    result = TaxEngine(age=30, income_details=income, deductions=deductions, policy=policy.model_dump()).get_recommendation()
+    result["status"] = "calculated"
+    return result
+
+
+def _legacy_analysis(extraction: Dict[str, Any], policy: ActivePolicyContext) -> Dict[str, Any]:
+    cg_raw = extraction.get("capital_gains", {})
+    ext_model = ExtractionResult(
+        salary=extraction.get("salary"),
+        bank_transactions=extraction.get("bank_transactions", []),
+        rent_paid=extraction.get("rent_paid"),
+        emi_payments=extraction.get("emi_payments", []),
+        interest_income=extraction.get("interest_income"),
+        capital_gains=CapitalGains(stocks=cg_raw.get("stocks"), mutual_funds=cg_raw.get("mutual_funds")),
+        annual_savings=extraction.get("annual_savings"),
+        other_spendings=extraction.get("other_spendings", []),
+        document_metadata=[
+            DocumentMetadata(document_type=m.get("document_type", "Unknown"), status=m.get("status", "failed"))
+            for m in extraction.get("document_metadata", [])
+        ],
+    )
+    return run_analysis(AnalysisRequest(extraction=ext_model), policy=policy).model_dump()
+
+
+def _before(result: ExtractionResult, policy: ActivePolicyContext, clock: Dict[str, float]):
+    t = time.perf_counter()
+    extraction = result.model_dump()
+    t = _lap(clock, "dump", t)
+    assert _legacy_has_financial_data(extraction)
+    t = _lap(clock, "validate", t)
+    calculations = _legacy_calculations(extraction, policy)
+    t = _lap(clock, "calculate", t)
+    analysis = _legacy_analysis(extraction, policy)
+    t = _lap(clock, "analyse", t)
+    request = {"extraction_summary": extraction, "calculations": calculations,
+               "policy_context": policy.model_dump(), "document_types": ["Bank Statements"]}
+    _lap(clock, "insights", t)
+    return calculations, analysis, request
+
+
+# ── after: the typed hand-off ─────────────────────────────────────────────────
+
+def _after(result: ExtractionResult, policy: ActivePolicyContext, clock: Dict[str, float]):
+    t = time.perf_counter()
+    result.model_dump(mode="json")                      # the record / cache copy
+    t = _lap(clock, "dump", t)
+    assert pipeline._has_financial_data(result)
+    t = _lap(clock, "validate", t)
+    calculations = pipeline._run_calculations(result, policy)
+    t = _lap(clock, "calculate", t)
+    analysis = pipeline._run_ai_engine(result, policy)
+    t = _lap(clock, "analyse", t)
+    request = pipeline.InsightRequest(result, calculations, policy, ("Bank Statements",), "csv", {})
+    _lap(clock, "insights", t)
+    return calculations, analysis, request
+
+
+def _lap(clock: Dict[str, float], step: str, since: float) -> float:
+    now = time.perf_counter()
+    clock[step] = clock.get(step, 0.0) + (now - since)
+    return now
+
+
+def _time(fn, result, policy, repeat: int):
+    best, best_clock, out = float("inf"), {}, None
+    for _ in range(repeat):
+        clock: Dict[str, float] = {}
+        t0 = time.perf_counter()
+        out = fn(result, policy, clock)
+        elapsed = time.perf_counter() - t0
+        if elapsed < best:
+            best, best_clock = elapsed, clock
+    return best, best_clock, out
+
+
+def main(sizes, repeat: int = 5) -> None:
+    policy = _policy()
+    breakdowns = []
+    print(f"{'txns':>8} {'before ms':>10} {'after ms':>9} {'saved ms':>9} {'speedup':>8}")
+    for n in sizes:
+        result = _extraction(n)
+        before, before_steps, (calc_b, analysis_b, _) = _time(_before, result, policy, repeat)
+        after, after_steps, (calc_a, analysis_a, _) = _time(_after, result, policy, repeat)
+        assert calc_a == calc_b and analysis_a == analysis_b
+        print(f"{n:>8} {before * 1e3:>10.2f} {after * 1e3:>9.2f} {(before - after) * 1e3:>9.2f} {before / after:>7.2f}x")
+        breakdowns.append((n, before_steps, after_steps))
+
+    for n, before_steps, after_steps in breakdowns:
+        print(f"\n{n} transactions — per step (ms)")
+        print(f"{'step':>10} {'before':>9} {'after':>9}")
+        for step in _STEPS:
+            print(f"{step:>10} {before_steps[step] * 1e3:>9.3f} {after_steps[step] * 1e3:>9.3f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100, 1_000, 10_000])
@@ -0,0 +1,89 @@
+"""
+Benchmark: PDF table extraction with and without the per-page pre-check.
+
+    cd server && python -m benchmarks.bench_table_precheck [pages ...]
+
+Generates mostly-prose PDFs (framed receipt-style pages with dashed
+separators) with a ruled statement table every fourth page.  Reports the
+table stage on its own — every page through ``extract_tables`` vs
+``may_have_tables`` first, with page objects already parsed, best of
+several runs — plus what the pre-check itself costs per page (its whole
+overhead on pages that do have tables), and the end-to-end
+``_extract_raw_pdf`` time with OCR_PDF_FORCE_TABLES on and off.  Both modes
+must return the same tables.  End-to-end runs (interleaved, best of five)
+still vary by more than the whole table stage takes on a busy or small
+machine; the table stage and ms/page columns isolate the pre-check.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+
+import pdfplumber
+
+from app.core.config import settings
+from app.services import ocr_service, pdf_backends
+from benchmarks._corpus import mixed_document
+
+
+def _table_stage(path: str, repeat: int = 5):
+    """Seconds spent finding tables without and with the pre-check, and in the pre-check alone."""
+    forced = [0.0] * repeat
+    checked = [0.0] * repeat
+    precheck = [0.0] * repeat
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages:
+            page.chars, page.edges                          # parse objects up front
+            for r in range(repeat):
+                t0 = time.perf_counter()
+                page.extract_tables()
+                forced[r] += time.perf_counter() - t0
+                t0 = time.perf_counter()
+                found = pdf_backends.may_have_tables(page)
+                precheck[r] += time.perf_counter() - t0
+                if found:
+                    page.extract_tables()
+                checked[r] += time.perf_counter() - t0
+            page.flush_cache()
+    return min(forced), min(checked), min(precheck)
+
+
+def _end_to_end(path: str, repeat: int = 5):
+    """Best end-to-end seconds and raw result, tables forced and checked, runs interleaved."""
+    best = {True: float("inf"), False: float("inf")}
+    raw = {}
+    for r in range(repeat):
+        for force in ((True, False) if r % 2 else (False, True)):      # alternate which runs first
+            settings.OCR_PDF_FORCE_TABLES = force
+            t0 = time.perf_counter()
+            raw[force] = ocr_service._extract_raw_pdf(path)
+            best[force] = min(best[force], time.perf_counter() - t0)
+            assert raw[force].parse_error is None, raw[force].parse_error
+    settings.OCR_PDF_FORCE_TABLES = False
+    return best[True], raw[True], best[False], raw[False]
+
+
+def main(page_counts) -> None:
+    settings.OCR_PDF_PAGE_CONCURRENCY = 1       # inline, so the setting reaches every page
+    settings.PDF_BACKEND = "pdfplumber"
+    print(f"{'':>13} {'table stage (s)':^26} {'':>9} {'end to end (s)':^26}")
+    print(f"{'pages':>6} {'tables':>6} {'all':>8} {'checked':>8} {'speedup':>8} {'ms/page':>9} "
+          f"{'all':>8} {'checked':>8} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in page_counts:
+            path = os.path.join(tmp, f"mixed_{pages}.pdf")
+            mixed_document(path, pages, framed=True)
+            stage_all, stage_checked, precheck = _table_stage(path)
+            forced, forced_raw, checked, checked_raw = _end_to_end(path)
+            assert forced_raw.tables == checked_raw.tables
+            print(f"{pages:>6} {len(checked_raw.tables):>6} "
+                  f"{stage_all:>8.3f} {stage_checked:>8.3f} {stage_all / stage_checked:>7.2f}x "
+                  f"{precheck / pages * 1e3:>9.3f} "
+                  f"{forced:>8.3f} {checked:>8.3f} {forced / checked:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1, 2, 4, 12, 24])
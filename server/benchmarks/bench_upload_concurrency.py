@@ -0,0 +1,180 @@
+"""
+Benchmark: latency of other endpoints while large uploads are in flight.
+
+    cd server && python -m benchmarks.bench_upload_concurrency [uploads] [size_mb]
+
+Serves a minimal app over uvicorn in a child process (real sockets, one
+event loop, like one production worker) with a trivial GET /ping and two
+upload routes:
+
+  blocking  — the old handler: ``UploadFile`` parameter, then ``open()`` +
+              ``shutil.copyfileobj`` on the event loop
+  streaming — ``upload_receiver.receive_upload`` (chunked, size-limited,
+              hashed in the same pass, disk writes in the threadpool)
+
+For each route, `uploads` parallel uploads of `size_mb` MB (above the
+in-memory threshold, so both write to disk) run while a client pings
+/ping every 5 ms; p50 / p99 / max ping latency is reported against an idle
+baseline, together with the longest stall of the server's event loop (how
+late a 5 ms sleep inside the server woke up).  On a single-core box the
+client competes with the server for the CPU, so ping latency there is
+dominated by CPU saturation; the loop stall column isolates blocking.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, File, Request, UploadFile
+
+from app.core.config import settings
+from app.services.upload_receiver import receive_upload
+
+_PING_INTERVAL = 0.005
+
+
+async def _watch_loop(stalls: list) -> None:
+    """Record how late the event loop wakes a 5 ms sleep — time it spent blocked."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(_PING_INTERVAL)
+        stalls.append(time.perf_counter() - start - _PING_INTERVAL)
+
+
+def _app(upload_dir: str) -> FastAPI:
+    app = FastAPI()
+    stalls: list = []
+
+    @app.on_event("startup")
+    async def watch():
+        asyncio.get_running_loop().create_task(_watch_loop(stalls))
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/stalls")
+    async def take_stalls():
+        taken = list(stalls)
+        stalls.clear()
+        return taken
+
+    @app.post("/upload/blocking")
+    async def upload_blocking(file: UploadFile = File(...)):
+        file_path = os.path.join(upload_dir, f"{uuid.uuid4()}.pdf")
+        with open(file_path, "wb") as buf:
+            shutil.copyfileobj(file.file, buf)
+        os.remove(file_path)
+        return {"ok": True}
+
+    @app.post("/upload/streaming")
+    async def upload_streaming(request: Request):
+        upload = await receive_upload(request, str(uuid.uuid4()), {".pdf"})
+        if isinstance(upload.source, str):
+            os.remove(upload.source)
+        return {"ok": True, "digest": upload.digest}
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def _ping_until(client: httpx.AsyncClient, done: asyncio.Event) -> list:
+    latencies = []
+    while not done.is_set():
+        start = time.perf_counter()
+        await client.get("/ping")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(_PING_INTERVAL)
+    return latencies
+
+
+async def _run(base_url: str, route: str, uploads: int, payload: bytes) -> tuple:
+    limits = httpx.Limits(max_connections=uploads + 2)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=300) as client:
+        await client.get("/stalls")                        # warm the pool, reset the watcher
+        done = asyncio.Event()
+        pinger = asyncio.create_task(_ping_until(client, done))
+        start = time.perf_counter()
+        if route:
+            responses = await asyncio.gather(*(
+                client.post(route, files={"file": ("statement.pdf", payload, "application/pdf")})
+                for _ in range(uploads)
+            ))
+            assert all(r.status_code == 200 for r in responses), [r.text for r in responses]
+        else:
+            await asyncio.sleep(1.0)
+        elapsed = time.perf_counter() - start
+        done.set()
+        latencies = await pinger
+        stalls = (await client.get("/stalls")).json()
+        return latencies, max(stalls, default=0.0), elapsed
+
+
+def _serve(upload_dir: str, port: int, max_bytes: int) -> None:
+    settings.UPLOAD_DIR = upload_dir
+    settings.UPLOAD_MAX_BYTES = max_bytes
+    uvicorn.run(_app(upload_dir), port=port, log_level="warning")
+
+
+def _wait_for(base_url: str) -> None:
+    for _ in range(200):
+        try:
+            httpx.get(f"{base_url}/ping")
+            return
+        except httpx.TransportError:
+            time.sleep(0.05)
+    raise RuntimeError("benchmark server did not start")
+
+
+def main(uploads: int, size_mb: int) -> None:
+    upload_dir = tempfile.mkdtemp(prefix="bench_upload_")
+    max_bytes = max(settings.UPLOAD_MAX_BYTES, (size_mb + 1) * 1024 * 1024)
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = multiprocessing.Process(target=_serve, args=(upload_dir, port, max_bytes), daemon=True)
+    server.start()
+    _wait_for(base_url)
+
+    payload = os.urandom(size_mb * 1024 * 1024)
+    print(f"{uploads} parallel uploads × {size_mb} MB, pinging every {_PING_INTERVAL * 1000:.0f} ms")
+    print(f"{'route':<12} {'pings':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'loop stall ms':>14} {'uploads s':>10}")
+    try:
+        for label, route in (("idle", None), ("blocking", "/upload/blocking"), ("streaming", "/upload/streaming")):
+            latencies, stall, elapsed = asyncio.run(_run(base_url, route, uploads, payload))
+            ms = [x * 1000 for x in latencies]
+            print(
+                f"{label:<12} {len(ms):>6} {statistics.median(ms):>8.1f} {_percentile(ms, 0.99):>8.1f} "
+                f"{max(ms):>8.1f} {stall * 1000:>14.1f} {elapsed if route else float('nan'):>10.2f}"
+            )
+    finally:
+        server.terminate()
+        server.join()
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 4,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 100,
+    )
@@ -0,0 +1,49 @@
+"""
+Soak benchmark: repeated raw extraction must keep RSS and latency flat.
+
+    cd server && python -m benchmarks.soak_raw_extract [uploads] [report_every]
+
+Parses the same one-page bank statement thousands of times through
+``_extract_raw`` + ``_extract_bank_transactions`` (the path that used to
+accumulate tables on a class-level list) and prints resident memory and
+mean per-document time for each window.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+
+from app.services import ocr_service
+from benchmarks._corpus import bank_statement
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def main(uploads: int, report_every: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.pdf")
+        bank_statement(path, pages=1)
+
+        print(f"{'uploads':>8} {'rss MB':>8} {'ms/doc':>8} {'tables':>7} {'txns':>5}")
+        window_start = time.perf_counter()
+        for n in range(1, uploads + 1):
+            raw = ocr_service._extract_raw(path, "statement.pdf")
+            txns = ocr_service._extract_bank_transactions(raw.text, raw.tables)
+            if n % report_every == 0:
+                ms = (time.perf_counter() - window_start) * 1000 / report_every
+                print(f"{n:>8} {_rss_mb():>8.1f} {ms:>8.2f} {len(raw.tables):>7} {len(txns):>5}")
+                window_start = time.perf_counter()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(args[0] if args else 2000, args[1] if len(args) > 1 else 250)
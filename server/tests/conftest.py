@@ -0,0 +1,41 @@
+"""
+Test settings: every path and database the app touches points into one
+temporary directory, results live in memory and no background recovery
+thread starts.  Set before anything imports app.core.config.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="taxmate-tests-")
+
+os.environ.update({
+    "DATABASE_URL":              f"sqlite:///{os.path.join(_TMP, 'taxmate.db')}",
+    "UPLOAD_DIR":                os.path.join(_TMP, "uploads"),
+    "CHROMA_PERSIST_DIRECTORY":  os.path.join(_TMP, "chroma_db"),
+    "EXTRACTION_CACHE_DIR":      os.path.join(_TMP, "extraction_cache"),
+    "EXTRACTION_CACHE_ENABLED":  "false",
+    "COLUMN_MAPPING_PATH":       "",
+    "RESULT_STORE":              "memory",
+    "PIPELINE_EXECUTOR":         "scheduler",
+    "PIPELINE_RECOVERY_ENABLED": "false",
+})
+
+
+@pytest.fixture(scope="session")
+def database():
+    """The app schema on the temporary SQLite database, with the default tax policy seeded."""
+    import app.main  # noqa: F401  registers every model on Base.metadata
+    from app.db.session import SessionLocal, engine
+    from app.models import base
+    from app.services.policy_engine import seed_default_policy
+
+    base.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seed_default_policy(db)
+    finally:
+        db.close()
+    return engine
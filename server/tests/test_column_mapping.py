@@ -0,0 +1,151 @@
+import json
+import random
+
+import pytest
+
+from app.services import column_mapping
+from app.services.column_mapping import ColumnMap, ColumnMappingStore, header_signature
+
+HEADER = ["Txn Date", "Narration", "Withdrawal Amount", "Balance"]
+MAPPED = ColumnMap(date=0, amount=2, detail=1)
+
+
+def _saved(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_learns_a_header_and_persists_only_its_mapping(tmp_path):
+    path = tmp_path / "mappings.json"
+    store = ColumnMappingStore(str(path))
+
+    assert store.lookup(HEADER, "bank_csv") == MAPPED
+    assert store.is_known(HEADER, "bank_csv")
+    assert _saved(path)["kinds"] == {"bank_csv": {header_signature(HEADER): [0, 2, 1]}}
+
+
+def test_rejected_rows_are_never_written(tmp_path):
+    path = tmp_path / "mappings.json"
+    store = ColumnMappingStore(str(path))
+
+    # A continuation table's first row is a transaction — customer data
+    assert store.lookup(["01/05/2024", "NEFT CREDIT SALARY ACME", "1,000.00"], "bank_table") is None
+    assert store.lookup(["Name", "Address"], "bank_table") is None
+    assert not path.exists()
+
+    store.lookup(HEADER, "bank_table")
+    assert list(_saved(path)["kinds"]["bank_table"]) == [header_signature(HEADER)]
+
+
+def test_rows_with_dates_or_amounts_are_mapped_but_never_learned(tmp_path):
+    path = tmp_path / "mappings.json"
+    store = ColumnMappingStore(str(path))
+
+    # Data rows that satisfy the keyword rules map as the heuristic says ...
+    for row in (["Date 01-04-2024", "Description", "Credit"], ["Date", "Description", "Credit 85,000.00"]):
+        assert store.lookup(row, "bank_csv") == ColumnMap(date=0, amount=2, detail=1)
+        assert not store.is_known(row, "bank_csv")
+    assert not path.exists()                        # ... but never reach the file
+
+
+def test_rejections_are_bounded_in_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(column_mapping, "_MAX_REJECTED", 3)
+    store = ColumnMappingStore(str(tmp_path / "mappings.json"))
+
+    for i in range(5):
+        assert store.lookup([f"col {i}", "other"], "bank_csv") is None
+
+    assert list(store._rejected["bank_csv"]) == [
+        header_signature([f"col {i}", "other"]) for i in (2, 3, 4)
+    ]
+
+
+def test_layouts_are_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(column_mapping, "_MAX_LAYOUTS", 1)
+    path = tmp_path / "mappings.json"
+    store = ColumnMappingStore(str(path))
+
+    store.lookup(HEADER, "bank_csv")
+    second = ["Value Date", "Particulars", "Deposit"]
+    assert store.lookup(second, "bank_csv") == ColumnMap(date=0, amount=2, detail=1)
+    assert not store.is_known(second, "bank_csv")
+    assert len(_saved(path)["kinds"]["bank_csv"]) == 1
+
+
+def test_workers_share_the_file(tmp_path):
+    path = str(tmp_path / "mappings.json")
+    first, second = ColumnMappingStore(path), ColumnMappingStore(path)
+
+    first.lookup(HEADER, "bank_csv")
+    other = ["Value Date", "Particulars", "Deposit"]
+    second.lookup(other, "bank_csv")                # merges with what `first` saved
+
+    assert set(_saved(path)["kinds"]["bank_csv"]) == {header_signature(HEADER), header_signature(other)}
+    assert ColumnMappingStore(path).is_known(HEADER, "bank_csv")
+
+
+def test_legacy_rejections_are_ignored_and_dropped(tmp_path):
+    path = tmp_path / "mappings.json"
+    junk = header_signature(["01/04/2024", "SALARY", "85000.00"])
+    path.write_text(json.dumps({"version": column_mapping._RULES_VERSION, "kinds": {"bank_csv": {junk: None}}}))
+
+    store = ColumnMappingStore(str(path))
+    assert junk not in store._maps["bank_csv"]
+    store.lookup(HEADER, "bank_csv")
+    assert list(_saved(path)["kinds"]["bank_csv"]) == [header_signature(HEADER)]
+
+
+def test_other_rule_versions_are_relearned(tmp_path):
+    path = tmp_path / "mappings.json"
+    path.write_text(json.dumps({
+        "version": column_mapping._RULES_VERSION + 1,
+        "kinds": {"bank_csv": {header_signature(HEADER): [1, 1, 1]}},
+    }))
+    assert ColumnMappingStore(str(path)).lookup(HEADER, "bank_csv") == MAPPED
+
+
+def test_without_a_path_nothing_touches_disk(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = ColumnMappingStore(None)
+
+    assert store.lookup(HEADER, "bank_csv") == MAPPED
+    assert store.lookup(["Name", "Address"], "bank_csv") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+# ── Parity with the keyword heuristic ─────────────────────────────────────────
+
+def _heuristic(header, date_kws, amount_kws, detail_kws):
+    """The per-table header scan the extractors ran before mappings were learned."""
+    header = [str(c).lower().strip() if c else "" for c in header]
+    date_col = amt_col = detail_col = None
+    for i, h in enumerate(header):
+        if any(x in h for x in date_kws):
+            date_col = i
+        if any(x in h for x in amount_kws):
+            if amt_col is None:
+                amt_col = i
+        if any(x in h for x in detail_kws):
+            detail_col = i
+    if date_col is None or amt_col is None:
+        return None
+    return ColumnMap(date_col, amt_col, detail_col)
+
+
+CELLS = ["Txn Date", "Value  Date", "DT", "Narration", "Particulars", "Remarks", "Details",
+         "Withdrawal Amt.", "Deposit", "Debit", "Credit", "EMI", "Instalment", "Lender", "Bank",
+         "Loan A/c", "Towards", "Balance", "Chq No", "", None, 0, 1250.5,
+         "01/04/2024", "01-Apr-2024", "NEFT CREDIT SALARY", "85,000.00", "UPI/DR/12345"]
+
+
+@pytest.mark.parametrize("kind", list(column_mapping._RULES))
+def test_mappings_match_the_keyword_heuristic(kind, tmp_path):
+    rng = random.Random(kind)
+    store = ColumnMappingStore(str(tmp_path / "mappings.json"))
+    rules = column_mapping._RULES[kind]
+
+    for _ in range(500):
+        header = [rng.choice(CELLS) for _ in range(rng.randint(1, 6))]
+        expected = _heuristic(header, *rules)
+        assert store.lookup(header, kind) == expected, header
+        assert store.lookup(header, kind) == expected   # learned / rejected on the first lookup
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from sqlalchemy import inspect
+
+CSV = (
+    b"Date,Description,Debit,Credit,Balance\n"
+    b"01/04/2024,SALARY CREDIT ACME,,85000,90000\n"
+    b"05/04/2024,RENT PAYMENT,20000,,70000\n"
+)
+SERVER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def scheduler(monkeypatch):
+    """A fresh pipeline scheduler per test — the app's shutdown hook closes the one it ran with."""
+    from app.api import documents
+    from app.services import scheduler as module
+
+    fresh = module._build_scheduler()
+    monkeypatch.setattr(module, "pipeline_scheduler", fresh)
+    monkeypatch.setattr(documents, "pipeline_scheduler", fresh)
+    yield fresh
+    fresh.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def event_hub(monkeypatch):
+    """A fresh stream event hub per test, for the same reason."""
+    from app.services import pipeline_events
+
+    fresh = pipeline_events.PipelineEventHub(pipeline_events.result_store)
+    monkeypatch.setattr(pipeline_events, "event_hub", fresh)
+    yield fresh
+    fresh.shutdown()
+
+
+def _login(client, email):
+    client.post("/api/auth/register", json={"email": email, "password": "Passw0rd!x", "full_name": "A"})
+    token = client.post("/api/auth/login", data={"username": email, "password": "Passw0rd!x"}).json()
+    return {"Authorization": f"Bearer {token['access_token']}"}
+
+
+def test_importing_the_app_does_not_touch_the_database(tmp_path):
+    db = tmp_path / "untouched.db"
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db}"}
+    subprocess.run([sys.executable, "-c", "import app.main"], cwd=SERVER, env=env, check=True)
+    assert not db.exists()
+
+
+def test_upload_runs_the_pipeline_to_completion():
+    from app.db.session import engine
+    from app.main import app
+
+    with TestClient(app) as client:                 # startup hooks create and seed the schema
+        assert {"users", "tax_policies", "pipeline_tasks"} <= set(inspect(engine).get_table_names())
+
+        client.post("/api/auth/register", json={"email": "a@b.co", "password": "Passw0rd!x", "full_name": "A"})
+        token = client.post("/api/auth/login", data={"username": "a@b.co", "password": "Passw0rd!x"}).json()
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+        accepted = client.post("/api/documents/upload", files={"file": ("s.csv", CSV, "text/csv")}, headers=headers)
+        assert accepted.status_code == 200, accepted.text
+        task_id = accepted.json()["task_id"]
+
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            record = client.get(f"/api/documents/pipeline/{task_id}", headers=headers).json()
+            if record["pipeline_stage"] in ("complete", "failed") \
+                    and record.get("insights_status") not in ("queued", "running"):
+                break
+            time.sleep(0.1)
+
+    assert record["pipeline_stage"] == "complete", record.get("error")
+    assert record["checkpoint"] == "calculated"
+    assert record["calculations"]
+
+
+def test_upload_writes_the_result_store_off_the_event_loop(monkeypatch):
+    from app.api import documents
+    from app.main import app
+    from app.services.scheduler import QueueFullError
+
+    calls = []
+
+    def spy(name, fn):
+        def run(*args):
+            try:
+                asyncio.get_running_loop()
+                calls.append((name, "event loop"))
+            except RuntimeError:
+                calls.append((name, "worker thread"))
+            return fn(*args)
+        return run
+
+    def full(*args):
+        raise QueueFullError(7)
+
+    monkeypatch.setattr(documents, "initial_record", spy("initial_record", documents.initial_record))
+    monkeypatch.setattr(documents, "discard_record", spy("discard_record", documents.discard_record))
+    monkeypatch.setattr(documents.pipeline_scheduler, "submit", full)   # fills up mid-upload
+
+    with TestClient(app) as client:
+        headers = _login(client, "loop@b.co")
+        rejected = client.post("/api/documents/upload", files={"file": ("s.csv", CSV, "text/csv")}, headers=headers)
+        remaining = client.get("/api/documents/pipeline", headers=headers).json()
+
+    assert rejected.status_code == 503 and rejected.headers["Retry-After"] == "7"
+    assert calls == [("initial_record", "worker thread"), ("discard_record", "worker thread")]
+    assert remaining == {}
+
+
+# ── Live progress streams ─────────────────────────────────────────────────────
+
+def _sse_events(response):
+    events, name = [], None
+    for line in response.iter_lines():
+        if line.startswith("event: "):
+            name = line[len("event: "):]
+        elif line.startswith("data: "):
+            events.append((name, json.loads(line[len("data: "):])))
+    return events
+
+
+def _ws_events(ws):
+    events = []
+    try:
+        while True:
+            message = ws.receive_json()
+            events.append((message["event"], message["data"]))
+    except WebSocketDisconnect as closed:
+        assert closed.code == 1000
+    return events
+
+
+def test_streams_follow_a_task_to_its_terminal_stage(monkeypatch, event_hub):
+    from app.main import app
+    from app.services import pipeline
+
+    extract = pipeline.process_document
+
+    def process_document(*args):
+        deadline = time.time() + 10                 # hold OCR until the stream is listening
+        while not event_hub.stats()["streams"] and time.time() < deadline:
+            time.sleep(0.01)
+        return extract(*args)
+
+    monkeypatch.setattr(pipeline, "process_document", process_document)
+    monkeypatch.setattr(pipeline, "generate_financial_insights", lambda **kwargs: {"status": "pending"})
+
+    with TestClient(app) as client:
+        headers = _login(client, "stream@b.co")
+        task_id = client.post(
+            "/api/documents/upload", files={"file": ("s.csv", CSV, "text/csv")}, headers=headers,
+        ).json()["task_id"]
+
+        with client.stream("GET", f"/api/documents/pipeline/{task_id}/events", headers=headers) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            sse = _sse_events(response)
+
+        token = headers["Authorization"].split()[1]
+        with client.websocket_connect(f"/api/documents/pipeline/{task_id}/ws?token={token}") as ws:
+            ws_events = _ws_events(ws)              # opened after the task settled
+
+    stages = [data["pipeline_stage"] for name, data in sse if name == "stage"]
+    assert stages[0] in ("queued", "ocr") and "calculating" in stages
+    names = [name for name, _ in sse if name != "ping"]
+    assert names[len(stages)] == "result" and names[len(stages) + 1:] in ([], ["insights"])
+    result = dict(sse)["result"]
+    assert result["task_id"] == task_id and result["pipeline_stage"] == "complete"
+    if "insights" in names:
+        assert dict(sse)["insights"]["insights_status"] not in ("queued", "running")
+
+    assert [name for name, _ in ws_events] == ["stage", "result"]
+    assert ws_events[0][1] == {"task_id": task_id, "pipeline_stage": "complete"}
+    assert ws_events[1][1]["calculations"] == result["calculations"]
+
+
+def test_streams_reject_bad_and_mismatched_tokens():
+    from app.main import app
+
+    with TestClient(app) as client:
+        owner = _login(client, "owner@b.co")
+        task_id = client.post(
+            "/api/documents/upload", files={"file": ("s.csv", CSV, "text/csv")}, headers=owner,
+        ).json()["task_id"]
+        other = _login(client, "other@b.co")["Authorization"].split()[1]
+
+        assert client.get(f"/api/documents/pipeline/{task_id}/events?token=not-a-jwt").status_code == 401
+        assert client.get(f"/api/documents/pipeline/{task_id}/events").status_code == 401
+        assert client.get(f"/api/documents/pipeline/{task_id}/events?token={other}").status_code == 404
+
+        for token, code in (("not-a-jwt", 4401), (other, 4404)):
+            try:
+                with client.websocket_connect(f"/api/documents/pipeline/{task_id}/ws?token={token}") as ws:
+                    ws.receive_json()
+            except WebSocketDisconnect as closed:
+                assert closed.code == code
+            else:
+                raise AssertionError(f"socket with token {token!r} was not closed")
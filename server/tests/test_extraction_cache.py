@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+
+from app.services.extraction_cache import ExtractionCache, source_digest
+
+RESULT = {"salary": 85000.0, "bank_transactions": [{"date": "2024-04-01", "amount": 85000.0}]}
+
+
+def _cache(disk_dir, disk_max_bytes: int = 1 << 20, memory_items: int = 16, ttl_seconds: int = 3600):
+    return ExtractionCache(memory_items, str(disk_dir), disk_max_bytes, ttl_seconds)
+
+
+def _disk_total(disk_dir) -> int:
+    return sum(os.path.getsize(os.path.join(disk_dir, n)) for n in os.listdir(disk_dir))
+
+
+def test_directory_is_created_on_first_write(tmp_path):
+    disk_dir = tmp_path / "cache"
+    cache = _cache(disk_dir)
+
+    assert cache.get(source_digest(b"upload")) is None
+    assert cache.stats()["disk_bytes"] == 0
+    assert not disk_dir.exists()
+
+    cache.put(source_digest(b"upload"), RESULT)
+    assert disk_dir.is_dir()
+
+
+def test_results_survive_the_memory_tier(tmp_path):
+    digest = source_digest(b"upload")
+    _cache(tmp_path).put(digest, RESULT)
+
+    fresh = _cache(tmp_path)                        # another worker, or after a restart
+    assert fresh.get(digest) == RESULT
+    assert fresh.get(digest) == RESULT
+    stats = fresh.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 0)
+
+
+def test_callers_get_private_copies(tmp_path):
+    cache = _cache(tmp_path)
+    digest = source_digest(b"upload")
+    cache.put(digest, RESULT)
+
+    cache.get(digest)["salary"] = 0.0
+    assert cache.get(digest) == RESULT
+
+
+def test_disk_total_tracks_concurrent_writes(tmp_path):
+    cache = _cache(tmp_path)
+    cache.stats()                                   # learn the (empty) total
+
+    def write(worker: int) -> None:
+        for i in range(25):
+            cache.put(source_digest(f"{worker}-{i % 10}".encode()), {**RESULT, "n": worker * 100 + i})
+
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert cache.stats()["disk_bytes"] == _disk_total(tmp_path)
+    assert not [n for n in os.listdir(tmp_path) if n.endswith(".tmp")]
+
+
+def test_disk_tier_is_bounded_oldest_first(tmp_path):
+    payload = {"blob": "x" * 1000}
+    cache = _cache(tmp_path, disk_max_bytes=3500, memory_items=1)
+    digests = [source_digest(str(i).encode()) for i in range(6)]
+    for i, digest in enumerate(digests):
+        cache.put(digest, payload)
+        os.utime(cache._path(cache._key(digest)), (time.time() - 60 + i,) * 2)     # distinct ages
+        cache._disk_sweep()
+
+    assert _disk_total(tmp_path) <= 3500
+    assert cache.stats()["disk_bytes"] == _disk_total(tmp_path)
+    kept = [d for d in digests if os.path.exists(cache._path(cache._key(d)))]
+    assert kept and kept == digests[-len(kept):]
+
+
+def test_expired_entries_miss(tmp_path):
+    cache = _cache(tmp_path, ttl_seconds=-1)
+    digest = source_digest(b"upload")
+    cache.put(digest, RESULT)
+
+    assert cache.get(digest) is None
+    assert not os.path.exists(cache._path(cache._key(digest)))
@@ -0,0 +1,254 @@
+import random
+
+import pytest
+
+from app.core.config import settings
+from app.services import ocr_service
+from app.services.ocr_service import _CATEGORY_KEYWORDS, _KeywordScan
+
+
+# ── Keyword scan ──────────────────────────────────────────────────────────────
+
+def _substring_scores(text):
+    """The classifier's original scoring: one `kw in text.lower()` test per keyword."""
+    lower = text.lower()
+    return {cat: sum(1 for kw in kws if kw in lower) for cat, kws in _CATEGORY_KEYWORDS.items()}
+
+
+def _substring_classify(text):
+    scores = _substring_scores(text)
+    best = max(scores, key=lambda k: scores[k])
+    return best if scores[best] > 0 else "Other Spending Proofs"
+
+
+DOCUMENTS = [
+    "",
+    "Nothing to see here",
+    "INTEREST INCOME on Fixed Deposit — Interest Credited to a/c",
+    "interest income interest earned interest",           # "interest" alone is not a keyword
+    "Capital Gains statement: STCG 1,200 LTCG 3,400, Capital Gain total",
+    "Pay Slip / PAYSLIP — Net Pay 52,000 Gross Pay 60,000 Basic Pay 30,000 CTC",
+    "EMI Paid 12,000 towards Home Loan; Equated Monthly instalment; emi",
+    "House Rent receipt — Landlord: A. Tenant: B. HRA claimed. Rental period Apr",
+    "Bank Statement  NEFT/RTGS/IMPS/UPI debit credit balance transactions",
+    "80CCD(1B) NPS; 80C: PPF, EPF, ELSS, LIC premium, Insurance Premium, Provident Fund",
+    "salaryrentemi",                                      # keywords run together
+    "Long Term / short term — Mutual Fund Redemption Proceeds, Equity",
+    "İNTEREST EARNED on Savings Interest",                 # non-ASCII case mapping changes length
+]
+
+
+def _keyword_soup(rng):
+    vocabulary = sorted({kw for kws in _CATEGORY_KEYWORDS.values() for kw in kws})
+    words = []
+    for _ in range(rng.randint(0, 12)):
+        word = rng.choice(vocabulary + ["interest", "loan", "pay", "the", "₹", "income"])
+        word = "".join(c.upper() if rng.random() < 0.3 else c for c in word)
+        words.append(word)
+    return rng.choice(["", " ", "\n", "-"]).join(words)
+
+
+@pytest.mark.parametrize("text", DOCUMENTS + [_keyword_soup(random.Random(seed)) for seed in range(200)])
+def test_keyword_scan_matches_substring_counting(text):
+    scan = _KeywordScan(text)
+
+    assert {cat: scan.count(cat) for cat in _CATEGORY_KEYWORDS} == _substring_scores(text)
+    assert ocr_service._classify_document(text, scan) == _substring_classify(text)
+
+
+# ── Field extractors ──────────────────────────────────────────────────────────
+
+EXTRACTORS = ("_extract_salary", "_extract_rent", "_extract_interest_income",
+              "_extract_annual_savings", "_extract_capital_gains")
+NO_GAINS = {"stocks": None, "mutual_funds": None}
+
+# text → (salary, rent, interest income, annual savings, capital gains), as the
+# original per-field regex extractors returned them
+BASELINE = {
+    # Labelled values
+    "ACME Corp\nPay Slip for April 2024\nBasic Pay: 30,000\nHRA 12,000\n"
+    "Gross Pay : Rs. 60,000.00\nNet Pay ₹ 52,450.50\n":
+        (52450.5, 60000.0, None, None, NO_GAINS),
+    "Offer letter\nCTC - 12,00,000\nTake home 84,000 per month\n":
+        (84000.0, None, None, None, NO_GAINS),
+    "RENT RECEIPT\nReceived from Mr. A a sum of Rs 18,000 towards rent\nMonthly Rent: 18,000\nLandlord: B\n":
+        (None, 18000.0, None, None, NO_GAINS),
+    "Receipt no 44\nAmount: 22,500 towards rent for May\n":
+        (None, 22500.0, None, None, NO_GAINS),
+    "Interest Certificate\nFixed Deposit no 1234\nInterest Earned: 7,845.25\nTDS 784\n":
+        (None, None, 7845.25, None, NO_GAINS),
+    "Savings a/c\n1,250.00 credited as interest on 31/03/2024\n":
+        (None, None, 1250.0, None, NO_GAINS),
+    "Capital Gains Statement\nSTCG: 12,400\nLTCG - 56,000.75\nMutual Fund Redemption 8,000\n":
+        (None, None, None, None, {"stocks": 12400.0, "mutual_funds": 8000.0}),
+    "Equity gain ₹ 3,300 and ELSS proceeds 9,100\nLong-term capital gain 1,000\n":
+        (None, None, None, 9100.0, {"stocks": 3300.0, "mutual_funds": 9100.0}),
+    "Investment Proof\nPPF 1,50,000\nTotal 80C Investments: 1,50,000\nLIC 24,000\n":
+        (None, None, None, 150000.0, NO_GAINS),
+    "Section 80 C: 46,000\nNPS 50,000\n":
+        (None, None, None, 46000.0, NO_GAINS),
+    # Unlabelled — keyword present, largest amount taken
+    "SALARY statement\nEarnings 45,000 Deductions 5,000\nemployee id 2024\n":
+        (45000.0, None, None, None, NO_GAINS),
+    "Landlord acknowledgement\nTenant paid 15,000 on 05/04/2024 and 15,000 on 05/05/2024\n":
+        (None, 15000.0, None, None, NO_GAINS),
+    "Recurring deposit summary\nPrincipal 1,00,000 maturity 1,07,000\n":
+        (None, None, 107000.0, None, NO_GAINS),
+    "capital gains report FY24\nsold 120 units for 44,000\n":
+        (None, None, None, None, {"stocks": 44000.0, "mutual_funds": None}),
+    "ELSS purchase statement\nunits 312 nav 45.20 value 14,102\n":
+        (None, None, None, 14102.0, NO_GAINS),
+    # Neither
+    "Grocery bill\nMilk 60\nBread 45\nTotal due 105\n":
+        (None, None, None, None, NO_GAINS),
+}
+
+
+@pytest.mark.parametrize("text, expected", BASELINE.items())
+def test_extractors_match_the_baseline(text, expected):
+    shared = ocr_service._DocTokens(text)
+
+    assert tuple(getattr(ocr_service, name)(text) for name in EXTRACTORS) == expected
+    assert tuple(getattr(ocr_service, name)(text, shared) for name in EXTRACTORS) == expected
+
+
+
+# ── Extractor dispatch ────────────────────────────────────────────────────────
+
+@pytest.fixture
+def full_runs(monkeypatch):
+    """The fields whose extractor ran in full, in call order."""
+    runs = []
+
+    def spy(name, extractor):
+        def run(text, tables, tokens, full):
+            if full:
+                runs.append(name)
+            return extractor(text, tables, tokens, full)
+        return run
+
+    monkeypatch.setattr(ocr_service, "_FIELD_EXTRACTORS", {
+        name: spy(name, extractor) for name, extractor in ocr_service._FIELD_EXTRACTORS.items()
+    })
+    return runs
+
+
+@pytest.mark.parametrize("doc_type", ocr_service._TYPE_EXTRACTORS)
+def test_only_the_types_own_extractors_run_in_full(doc_type, full_runs):
+    ocr_service._run_extractors(doc_type, "text", [], ocr_service._DocTokens("text"))
+
+    assert set(full_runs) == ocr_service._TYPE_EXTRACTORS[doc_type]
+
+
+def test_exhaustive_mode_runs_every_extractor_in_full(full_runs, monkeypatch):
+    monkeypatch.setattr(settings, "EXTRACTION_EXHAUSTIVE", True)
+    ocr_service._run_extractors("Salary Slips", "text", [], ocr_service._DocTokens("text"))
+
+    assert set(full_runs) == set(ocr_service._FIELD_EXTRACTORS)
+
+
+@pytest.mark.parametrize("exhaustive", [False, True])
+def test_row_based_documents_skip_the_transaction_line_scan(exhaustive, full_runs, monkeypatch):
+    monkeypatch.setattr(settings, "EXTRACTION_EXHAUSTIVE", exhaustive)
+    csv = b"Date,Narration,Amount\n01/04/2024,NEFT CREDIT,85000\n05/04/2024,UPI DEBIT,200\n"
+
+    result = ocr_service.process_document(csv, "s.csv")
+
+    assert result["document_type"] == "Bank Statements"
+    assert len(result["extraction"].bank_transactions) == 2
+    assert "bank_transactions" not in full_runs
+    assert ("emi_payments" in full_runs) and (("salary" in full_runs) == exhaustive)
+
+
+NO_FIELDS = {"salary": None, "rent_paid": None, "interest_income": None, "annual_savings": None,
+             "capital_gains": NO_GAINS, "bank_transactions": [], "emi_payments": [], "other_spendings": []}
+
+# (text, tables) → every field, as the original process_document extracted them
+EXHAUSTIVE_BASELINE = [
+    ("ICICI Bank Account Statement\nDate Narration Amount Balance\n"
+     "01/04/2024 NEFT SALARY ACME 85,000.00 90,000.00\n05/04/2024 UPI RENT LANDLORD 20,000.00 70,000.00\n"
+     "12/04/2024 EMI HOME LOAN HDFC 15,500.00 54,500.00\n30/04/2024 Interest credited 312.00 54,812.00\n"
+     "BOOKS AND STATIONERY 1,450\n",
+     [[["Txn Date", "Particulars", "Debit", "Balance"], ["02/04/2024", "ATM WDL", "2,000", "88,000"],
+       ["bad", "x", "1", "2"]]],
+     {**NO_FIELDS, "salary": 90000.0, "rent_paid": 90000.0, "interest_income": 312.0,
+      "bank_transactions": [{"date": "2024-04-02", "amount": 2000.0, "description": "ATM WDL",
+                             "source": "bank_statement"}],
+      "emi_payments": [{"date": "2024-04-02", "amount": 2000.0, "lender": "Unknown"}],
+      "other_spendings": [{"category": "BOOKS AD STATOEY", "amount": 1450.0}]}),
+    ("Loan account summary\nEMI paid on 10/04/2024 Rs 12,345 towards Car Loan\nOutstanding 4,50,000\n",
+     [[["Date", "EMI Amount", "Lender"], ["10/04/2024", "12,345", "HDFC"], ["10/05/2024", "12,345", None]]],
+     {**NO_FIELDS,
+      "bank_transactions": [{"date": d, "amount": 12345.0, "description": "—", "source": "bank_statement"}
+                            for d in ("2024-04-10", "2024-05-10")],
+      "emi_payments": [{"date": "2024-04-10", "amount": 12345.0, "lender": "HDFC"},
+                       {"date": "2024-05-10", "amount": 12345.0, "lender": "Unknown"}]}),
+    ("Receipt\nMedical insurance for parents 25,000\nDonation to PM relief fund 10,000\nGym 800\n", [],
+     {**NO_FIELDS, "rent_paid": 25000.0,
+      "other_spendings": [{"category": "Donation to PM relief fund", "amount": 10000.0}]}),
+    ("Pay Slip April 2024\nNet Pay 52,000\nHRA 12,000\nRent deducted 1,000\nTransaction ref 99\n", [],
+     {**NO_FIELDS, "salary": 52000.0, "rent_paid": 52000.0}),
+]
+
+
+@pytest.mark.parametrize("text, tables, expected", EXHAUSTIVE_BASELINE)
+def test_exhaustive_mode_restores_the_baseline_output(text, tables, expected, monkeypatch):
+    monkeypatch.setattr(settings, "EXTRACTION_EXHAUSTIVE", True)
+    doc_type = ocr_service._classify_document(text)
+
+    assert ocr_service._run_extractors(doc_type, text, tables, ocr_service._DocTokens(text)) == expected
+
+
+# ── Column date parser ────────────────────────────────────────────────────────
+
+DMY = [f"{d:02d}/{m:02d}/2024" for m in (1, 4, 12) for d in (1, 9, 12, 28)]
+# Ambiguous: every value is a valid date read either way round
+MDY_AMBIGUOUS = [f"{m:02d}/{d:02d}/2024" for m in (1, 4, 12) for d in (2, 5, 11)]
+# The sniffed DD/MM format is wrong: months-first, and the day soon runs past 12
+MDY = MDY_AMBIGUOUS[:8] + ["04/13/2024", "12/31/2024", "02/29/2024"]
+# Off-format cells after a DD/MM format is locked in — all go to the fallback parser
+FALLBACK = DMY[:8] + ["2024-04-01", "01-Apr-2024", "1 Apr 2024", "01 APR 2024", " 01/04/2024 ",
+                      "01/04/2024 10:32", "01-04-2024", "5/4/2024", "", "   ", "—", "Opening balance",
+                      "01/04/24", "31/02/2024"]
+MIXED = ["01/04/2024", "2024-04-02", "03-Apr-2024", "04 Apr 2024", "05-04-2024", "2024-04-06",
+         "07/04/2024", "08Apr2024", "n/a", "09/04/2024", "2024-04-10", "11-Apr-2024"]
+
+
+@pytest.mark.parametrize("column, locks_in", [
+    (DMY, True), (MDY_AMBIGUOUS, True), (MDY, True), (FALLBACK, True), (MIXED, False),
+])
+def test_column_parser_matches_parse_date(column, locks_in):
+    parse = ocr_service._date_column()
+    column = column * 3                                 # memoized repeats too
+
+    assert [parse(cell) for cell in column] == [ocr_service._parse_date(cell) for cell in column]
+    assert (parse._fast is not None) == locks_in
+
+
+def test_cells_the_fast_path_declines_use_the_fallback(monkeypatch):
+    fallback = []
+    generic = ocr_service._parse_date
+
+    def parse_date(raw):
+        fallback.append(raw)
+        return generic(raw)
+
+    monkeypatch.setattr(ocr_service, "_parse_date", parse_date)
+    parse = ocr_service._date_column()
+
+    assert [parse(cell) for cell in FALLBACK] == [generic(cell) for cell in FALLBACK]
+    # The 8 sniffed cells, then every off-format one — padded and impossible
+    # DD/MM dates are still in format, and read as _parse_date reads them
+    assert fallback == [cell for cell in FALLBACK if cell not in (" 01/04/2024 ", "31/02/2024")]
+    fallback.clear()
+    assert [parse(cell) for cell in DMY] == [generic(cell) for cell in DMY]
+    assert fallback == []                               # locked-in format or memo, never the regex
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_shuffled_columns_match_parse_date(seed):
+    rng = random.Random(seed)
+    column = [rng.choice(DMY + MDY + FALLBACK + MIXED) for _ in range(200)]
+    parse = ocr_service._date_column()
+
+    assert [parse(cell) for cell in column] == [ocr_service._parse_date(cell) for cell in column]
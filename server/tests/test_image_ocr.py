@@ -0,0 +1,63 @@
+import io
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from app.core.config import settings  # noqa: E402
+from app.services import image_ocr  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def ocr_settings(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_IMAGE_MAX_PIXELS", 4_000_000)
+    monkeypatch.setattr(settings, "OCR_IMAGE_TARGET_DPI", 300)
+
+
+def _page(size, dpi=None):
+    image = Image.new("L", size, 255)
+    if dpi:
+        image.info["dpi"] = (dpi, dpi)
+    return image
+
+
+@pytest.mark.parametrize("size, dpi, expected_dpi", [
+    ((1600, 2400), 300, 300),          # at the target and within budget: untouched
+    ((800, 1200), 150, 300),           # low-DPI scan: upsampled to the target
+    ((1000, 1400), 150, 254),          # ... but never past the pixel budget
+    ((3000, 4000), 600, 346),          # 12 MP: downscaled to the pixel budget
+    ((800, 1000), None, 300),          # no DPI: taken to be at the target
+])
+def test_preprocess_reports_the_dpi_it_produced(size, dpi, expected_dpi):
+    out = image_ocr.preprocess(_page(size, dpi))
+
+    assert out.mode == "L"
+    assert out.width * out.height <= settings.OCR_IMAGE_MAX_PIXELS * 1.01
+    assert out.info["dpi"] == (expected_dpi, expected_dpi)
+
+
+def test_jpeg_draft_decoding_is_accounted_for():
+    data = io.BytesIO()
+    Image.new("RGB", (4000, 6000), "white").save(data, "JPEG", dpi=(600, 600))
+    data.seek(0)
+
+    out = image_ocr.preprocess(Image.open(data))
+
+    assert out.width * out.height <= settings.OCR_IMAGE_MAX_PIXELS * 1.01
+    assert out.info["dpi"][0] == round(600 * (out.width / 4000))
+
+
+def test_tesseract_is_given_the_preprocessed_dpi(monkeypatch):
+    calls = []
+
+    class FakeTesseract:
+        @staticmethod
+        def image_to_string(image, lang, config):
+            calls.append((image.size, config))
+            return "text"
+
+    monkeypatch.setattr(image_ocr, "_TESSEROCR_OK", False)
+    monkeypatch.setattr(image_ocr, "pytesseract", FakeTesseract, raising=False)
+
+    assert image_ocr._recognize(_page((3000, 4000), 600), psm=6) == "text"
+    assert calls == [((1732, 2309), "--psm 6 --dpi 346")]
@@ -0,0 +1,145 @@
+import os
+import random
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.services import ocr_service, pdf_backends
+from benchmarks import _corpus
+
+pytest.importorskip("pdfplumber")
+
+
+@pytest.fixture
+def pdf_pool(monkeypatch):
+    """A small, fresh page-sharding pool, shut down after the test."""
+    monkeypatch.setattr(settings, "OCR_PDF_WORKERS", 2)
+    monkeypatch.setattr(settings, "OCR_PDF_PAGE_CONCURRENCY", 4)
+    monkeypatch.setattr(ocr_service, "_PDF_POOL", None)
+    yield
+    if ocr_service._PDF_POOL is not None:
+        ocr_service._discard_pdf_pool(ocr_service._PDF_POOL)
+
+
+@pytest.fixture(scope="module")
+def statement(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("pdf") / "statement.pdf")
+    _corpus.bank_statement(path, pages=8)
+    return path
+
+
+# ── Page-sharded extraction ───────────────────────────────────────────────────
+
+def test_sharded_parse_matches_inline(pdf_pool, statement):
+    inline = ocr_service._extract_pdf_pages(statement, list(range(8)), "pdfplumber")
+    sharded = ocr_service._extract_pdf_sharded(statement, 8, "pdfplumber")
+
+    assert sharded == inline
+    assert [idx for idx, _, _, _ in sharded] == list(range(8))
+    assert ocr_service._PDF_POOL._mp_context.get_start_method() in ("forkserver", "spawn")
+
+
+def test_in_memory_uploads_shard_too(pdf_pool, statement):
+    with open(statement, "rb") as f:
+        data = f.read()
+    assert ocr_service._extract_pdf_sharded(data, 8, "pdfplumber") == \
+        ocr_service._extract_pdf_sharded(statement, 8, "pdfplumber")
+
+
+def test_a_dead_worker_falls_back_inline_and_the_pool_is_rebuilt(pdf_pool, statement):
+    expected = ocr_service._extract_pdf_sharded(statement, 8, "pdfplumber")
+    broken = ocr_service._PDF_POOL
+    for pid in list(broken._processes):
+        os.kill(pid, signal.SIGKILL)
+    time.sleep(0.5)
+
+    assert ocr_service._extract_pdf_sharded(statement, 8, "pdfplumber") == expected
+    assert ocr_service._PDF_POOL is None
+
+    assert ocr_service._extract_pdf_sharded(statement, 8, "pdfplumber") == expected
+    assert ocr_service._PDF_POOL is not None and ocr_service._PDF_POOL is not broken
+
+
+def test_parse_errors_propagate_without_an_inline_retry(pdf_pool, tmp_path, monkeypatch):
+    corrupt = tmp_path / "corrupt.pdf"
+    corrupt.write_bytes(b"%PDF-1.4 " + b"not really a pdf " * 200)
+    retries = []
+    monkeypatch.setattr(ocr_service, "_extract_pdf_inline", lambda *a: retries.append(a))
+
+    with pytest.raises(Exception):
+        ocr_service._extract_pdf_sharded(str(corrupt), 8, "pdfplumber")
+    assert retries == []
+    assert ocr_service._PDF_POOL is not None        # a bad upload does not cost the pool
+
+
+def test_raw_pdf_extraction_reads_every_table(pdf_pool, statement, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_PDF_SHARD_MIN_PAGES", 4)
+    raw = ocr_service._extract_raw_pdf(statement)
+
+    assert raw.parse_error is None
+    assert len(raw.tables) == 8
+
+
+# ── Backend routing ───────────────────────────────────────────────────────────
+
+@pytest.fixture(scope="module")
+def covered_statement(tmp_path_factory):
+    """A statement behind three pages of covering letter — classifies as prose on its first pages."""
+    rng = random.Random(3)
+    start = date(2024, 4, 1)
+    path = str(tmp_path_factory.mktemp("pdf") / "covered.pdf")
+    _corpus.write_pdf(path, [_corpus.prose_page(rng, "Covering letter", lines_of_text=10) for _ in range(3)] + [
+        _corpus.statement_page(rng, start + timedelta(days=40 * p)) for p in range(6)
+    ])
+    return path
+
+
+def test_documents_are_routed_by_class(statement, tmp_path, monkeypatch):
+    pytest.importorskip("pypdfium2")
+    monkeypatch.setattr(settings, "PDF_BACKEND", "auto")
+    slip = str(tmp_path / "slip.pdf")
+    _corpus.salary_slip_pdf(slip)
+
+    assert ocr_service._route_pdf(slip).name == "pdfium"
+    assert ocr_service._route_pdf(statement).name == "pdfplumber"
+
+    with open(slip, "rb") as f:
+        result = ocr_service.process_document(f.read(), "slip.pdf")
+    assert result["extraction"].salary
+
+
+def test_a_misrouted_statement_is_re_read_from_its_tables(covered_statement, monkeypatch):
+    pytest.importorskip("pypdfium2")
+    monkeypatch.setattr(settings, "OCR_PDF_PAGE_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "PDF_BACKEND", "pdfplumber")
+    with open(covered_statement, "rb") as f:
+        data = f.read()
+    expected = ocr_service.process_document(data, "covered.pdf")
+
+    monkeypatch.setattr(settings, "PDF_BACKEND", "auto")
+    assert ocr_service._route_pdf(covered_statement).name == "pdfium"
+    raw = ocr_service._extract_raw_pdf(covered_statement)
+    assert len(raw.tables) == 6
+    routed = ocr_service.process_document(data, "covered.pdf")
+    assert routed["extraction"].bank_transactions == expected["extraction"].bank_transactions
+    assert len(routed["extraction"].bank_transactions) > 0
+
+    # An explicit backend choice is never second-guessed
+    monkeypatch.setattr(settings, "PDF_BACKEND", "pdfium")
+    assert ocr_service._extract_raw_pdf(covered_statement).tables == []
+
+
+def test_pdfium_is_safe_to_call_from_many_threads(covered_statement):
+    pytest.importorskip("pypdfium2")
+    backend = pdf_backends.BACKENDS["pdfium"]
+    with open(covered_statement, "rb") as f:
+        data = f.read()
+    expected = backend.extract_pages(data, list(range(9)))
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: backend.extract_pages(data, list(range(9))), range(32)))
+    assert all(result == expected for result in results)
@@ -0,0 +1,108 @@
+import re
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services import pipeline, pipeline_metrics
+from app.services.pipeline_metrics import PipelineMetrics
+
+CSV = (
+    b"Date,Narration,Amount,Balance\n"
+    b"01/04/2024,SALARY CREDIT ACME,85000,90000\n"
+    b"05/04/2024,RENT PAYMENT,20000,70000\n"
+)
+STAGES = ("ocr", "validating", "calculating", "analyzing", "insights")
+_SAMPLE = re.compile(r"^(\w+)(?:\{(.*)\})? (\S+)$")
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """An empty registry in place of the process-wide one."""
+    fresh = PipelineMetrics(window=100)
+    monkeypatch.setattr(pipeline_metrics, "pipeline_metrics", fresh)
+    monkeypatch.setattr(pipeline, "pipeline_metrics", fresh)
+    return fresh
+
+
+def _scrape():
+    """GET /metrics as {(name, frozenset of label pairs): value}, plus each series' TYPE."""
+    from app.main import app
+
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    samples, types = {}, {}
+    for line in response.text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            types[name] = kind
+        elif not line.startswith("#"):
+            name, labels, value = _SAMPLE.match(line).groups()
+            pairs = frozenset(re.findall(r'(\w+)="([^"]*)"', labels or ""))
+            samples[(name, pairs)] = float(value)
+    return samples, types
+
+
+def _series(samples, name, **labels):
+    return samples[(name, frozenset(labels.items()))]
+
+
+def test_a_pipeline_run_is_scraped_as_stage_summaries_and_counters(database, monkeypatch, registry):
+    from app.db.session import SessionLocal
+
+    monkeypatch.setattr(pipeline, "generate_financial_insights", lambda **kwargs: {"status": "pending"})
+    db = SessionLocal()
+    try:
+        pipeline.initial_record(1, "metrics-ok", "s.csv")
+        pipeline.run_pipeline(CSV, "s.csv", 1, "metrics-ok", db, queued_at=time.time())
+        pipeline.initial_record(1, "metrics-failed", "n.txt")
+        pipeline.run_pipeline(b"\x00\x01", "n.txt", 1, "metrics-failed", db)
+    finally:
+        db.close()
+    timings = pipeline.result_store.get(1, "metrics-ok")["stage_timings"]
+    assert pipeline.result_store.get(1, "metrics-failed")["pipeline_stage"] == pipeline.STAGE_FAILED
+
+    samples, types = _scrape()
+
+    assert types == {
+        "taxmate_pipeline_stage_seconds":      "summary",
+        "taxmate_pipeline_queue_wait_seconds": "summary",
+        "taxmate_pipeline_in_flight":          "gauge",
+        "taxmate_pipeline_tasks_total":        "counter",
+    }
+    for stage in STAGES:
+        labels = {"stage": stage, "document_type": "Bank Statements", "file_type": "csv"}
+        assert _series(samples, "taxmate_pipeline_stage_seconds_count", **labels) == 1
+        total = _series(samples, "taxmate_pipeline_stage_seconds_sum", **labels)
+        assert total == pytest.approx(timings[stage]["seconds"], abs=1e-5)
+        quantiles = [_series(samples, "taxmate_pipeline_stage_seconds", **labels, quantile=q)
+                     for q in ("0.5", "0.95", "0.99")]
+        assert quantiles == [total] * 3                 # one sample: every quantile is it
+        assert _series(samples, "taxmate_pipeline_in_flight", stage=stage) == 0
+
+    failed = [dict(labels) for name, labels in samples
+              if name == "taxmate_pipeline_stage_seconds_count" and ("file_type", "txt") in labels]
+    assert failed == [{"stage": "ocr", "document_type": "Unknown", "file_type": "txt"}]     # stopped at OCR
+    assert _series(samples, "taxmate_pipeline_stage_seconds_count", **failed[0]) == 1
+    assert _series(samples, "taxmate_pipeline_queue_wait_seconds_count", file_type="csv") == 1
+    assert _series(samples, "taxmate_pipeline_tasks_total", outcome="complete") == 1
+    assert _series(samples, "taxmate_pipeline_tasks_total", outcome="failed") == 1
+
+
+def test_quantiles_cover_only_the_window_while_sum_and_count_are_cumulative(monkeypatch):
+    registry = PipelineMetrics(window=4)
+    monkeypatch.setattr(pipeline_metrics, "pipeline_metrics", registry)
+    for seconds in (100.0, 1.0, 2.0, 3.0, 4.0):
+        registry.stage_started("ocr")
+        registry.stage_finished("ocr", seconds, "Bank Statements", "csv")
+
+    samples, _ = _scrape()
+    labels = {"stage": "ocr", "document_type": "Bank Statements", "file_type": "csv"}
+
+    assert [_series(samples, "taxmate_pipeline_stage_seconds", **labels, quantile=q)
+            for q in ("0.5", "0.95", "0.99")] == [3.0, 4.0, 4.0]      # 100 s has left the window
+    assert _series(samples, "taxmate_pipeline_stage_seconds_sum", **labels) == 110.0
+    assert _series(samples, "taxmate_pipeline_stage_seconds_count", **labels) == 5
+    assert _series(samples, "taxmate_pipeline_in_flight", stage="ocr") == 0
@@ -0,0 +1,212 @@
+import io
+import random
+from datetime import date, datetime
+
+import pytest
+
+from app.services import ocr_service
+from app.services.ocr_service import _RawExtract
+
+CSV = (
+    b"Date,Narration,Amount,Balance\n"
+    b"01/04/2024,SALARY CREDIT ACME,85000,90000\n"
+    b"05/04/2024,RENT PAYMENT,20000,70000\n"
+    b"09/04/2024,NEFT TRANSFER HOUSING SOCIETY,3500,66500\n"
+)
+
+
+def _status(result):
+    return result["extraction"].document_metadata[0].status
+
+
+# ── _RawExtract ───────────────────────────────────────────────────────────────
+
+def test_raw_extract_is_slotted_and_never_shared():
+    first, second = _RawExtract(), _RawExtract()
+    first.tables.append([["a"]])
+
+    assert second.tables == []
+    assert not hasattr(first, "__dict__")
+    with pytest.raises(AttributeError):
+        first.pages = []                            # typo'd fields fail loudly
+
+
+def test_rows_stream_from_a_fresh_reader_on_every_call():
+    raw = ocr_service._extract_raw(CSV, "s.csv")
+
+    assert raw.parse_error is None
+    assert "SALARY CREDIT ACME" in raw.text
+    first = [list(rows) for rows in raw.sheets()]
+    assert first == [list(rows) for rows in raw.sheets()]
+    assert first[0][1] == ["01/04/2024", "SALARY CREDIT ACME", "85000", "90000"]
+
+
+def test_a_csv_statement_is_parsed():
+    result = ocr_service.process_document(CSV, "s.csv")
+
+    assert _status(result) == "parsed"
+    assert [(t.date, t.amount) for t in result["extraction"].bank_transactions] == [
+        ("2024-04-01", 85000.0), ("2024-04-05", 20000.0), ("2024-04-09", 3500.0),
+    ]
+
+
+def test_rows_that_fail_to_stream_leave_the_document_partial(monkeypatch):
+    raw = ocr_service._extract_raw(CSV, "s.csv")
+    complete = raw.sheets
+
+    def truncated(rows):
+        yield from list(rows)[:2]
+        raise OSError("upload truncated")
+
+    raw.sheets = lambda: (truncated(rows) for rows in complete())
+    monkeypatch.setattr(ocr_service, "_extract_raw", lambda source, filename: raw)
+    result = ocr_service.process_document(CSV, "s.csv")
+
+    assert _status(result) == "partial"
+    assert result["extraction"].document_metadata[0].document_type == "Bank Statements"
+
+
+# ── Row-based sources ─────────────────────────────────────────────────────────
+
+def _baseline_csv_transactions(rows):
+    """The original whole-file parser: header from the first 5 rows, one global dedup."""
+    if not rows:
+        return []
+    header_idx = 0
+    for i, row in enumerate(rows[:5]):
+        if len([c for c in row if c.strip()]) >= 3:
+            header_idx = i
+            break
+    header = [c.lower().strip() for c in rows[header_idx]]
+    date_col = amt_col = desc_col = None
+    for i, h in enumerate(header):
+        if any(x in h for x in ("date", "dt", "value date")):
+            date_col = i
+        if any(x in h for x in ("amount", "debit", "credit", "withdrawal", "deposit", "txn amount")):
+            if amt_col is None:
+                amt_col = i
+        if any(x in h for x in ("description", "narration", "particulars", "remarks")):
+            desc_col = i
+    if date_col is None or amt_col is None:
+        return []
+    transactions = []
+    for row in rows[header_idx + 1:]:
+        if len(row) <= max(filter(None, [date_col, amt_col, desc_col or 0])):
+            continue
+        iso_date = ocr_service._parse_date(row[date_col])
+        amount   = ocr_service._parse_amount(row[amt_col])
+        desc     = row[desc_col].strip() if desc_col is not None else "—"
+        if iso_date and amount and amount > 0:
+            transactions.append({"date": iso_date, "amount": amount, "description": desc,
+                                 "source": "bank_statement"})
+    return ocr_service._deduplicate(transactions, lambda t: (t["date"], t["amount"], t["description"][:40]))
+
+
+def _transactions(result):
+    return [t.model_dump() for t in result["extraction"].bank_transactions]
+
+
+
+# ── CSV streaming ─────────────────────────────────────────────────────────────
+
+def _statement_rows(n, seed=0):
+    rng = random.Random(seed)
+    rows = [["Statement of account"], ["Value Date", "Narration", "Withdrawal", "Balance"]]
+    for i in range(n):
+        day = date(2024, 4, 1 + i % 28)
+        row = [rng.choice([day.strftime("%d/%m/%Y"), day.isoformat(), day.strftime("%d-%b-%Y"), "—"]),
+               rng.choice(["UPI GROCERY", "RENT PAYMENT", "NEFT SOCIETY", "  ATM  "]),
+               rng.choice(["1,250.00", "20000", "", "-5", "3500.5"]), "0"]
+        rows.append(row)
+        if rng.random() < 0.2:
+            rows.append(list(row))                    # re-exported row
+    return rows
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_chunked_csv_output_matches_the_whole_file_parser(chunk_size):
+    rows = _statement_rows(500)
+    chunks = list(ocr_service._iter_csv_transactions(iter(rows), chunk_size=chunk_size))
+
+    assert all(len(chunk) <= chunk_size for chunk in chunks)
+    assert [t for chunk in chunks for t in chunk] == _baseline_csv_transactions(rows)
+    assert ocr_service._parse_csv_transactions(rows) == _baseline_csv_transactions(rows)
+
+
+def test_duplicates_are_only_caught_within_the_dedup_window():
+    rows = [["Date", "Narration", "Amount"], ["01/04/2024", "RENT", "100"]]
+    rows += [[f"{d:02d}/04/2024", "UPI", "10"] for d in range(2, 6)]
+    rows += [["01/04/2024", "RENT", "100"]]          # repeats a row 5 keys back
+
+    assert len(_baseline_csv_transactions(rows)) == 5
+    assert len(ocr_service._parse_csv_transactions(rows)) == 5
+    windowed = ocr_service._iter_csv_transactions(rows, ocr_service._BoundedSeen(3))
+    assert len([t for chunk in windowed for t in chunk]) == 6
+
+
+# ── XLSX streaming ────────────────────────────────────────────────────────────
+
+openpyxl = pytest.importorskip("openpyxl")
+
+
+def _workbook():
+    wb = openpyxl.Workbook()
+    april = wb.active
+    april.title = "April"
+    april.append(["HDFC Bank — Account Statement"])
+    april.append(["Date", "Narration", "Amount", "Balance"])
+    april.append([datetime(2024, 4, 1), "SALARY CREDIT ACME", 85000, 90000])
+    april.append([datetime(2024, 4, 5), "RENT PAYMENT", 20000.5, 69999.5])
+    april.append([datetime(2024, 4, 5), "RENT PAYMENT", 20000.5, 69999.5])      # re-exported row
+    april.append([None, None, None, None])
+    april.append([date(2024, 4, 9), "UPI GROCERY", "1,250.00", 68749.5])
+    for row in range(8, 40):                                                     # empty trailing rows
+        april.cell(row=row, column=3).number_format = "0.00"
+
+    may = wb.create_sheet("May")
+    may.append(["Txn Date", "Particulars", "Debit", "Credit", "Balance"])
+    may.append(["05/05/2024", "RENT PAYMENT", 20000, None, 48749.5])
+    may.append(["2024-04-01", "SALARY CREDIT ACME", 85000, None, 0])            # repeats April's first row
+    may.append(["31/05/2024", "NEFT SOCIETY", "", "3,500", 45249.5])
+    may.cell(row=30, column=1).number_format = "dd/mm/yyyy"
+
+    wb.create_sheet("Notes")
+    data = io.BytesIO()
+    wb.save(data)
+    return data.getvalue()
+
+
+def _read_workbook(data):
+    """Every sheet's non-empty rows from a full (non-streaming) load, as pandas' openpyxl engine reads it."""
+    def cell(v):
+        if v is None:
+            return ""
+        return v.strftime("%Y-%m-%d") if isinstance(v, (datetime, date)) else str(v)
+
+    wb = openpyxl.load_workbook(io.BytesIO(data), data_only=True)
+    sheets = [[[cell(v) for v in row] for row in ws.iter_rows(values_only=True)] for ws in wb.worksheets]
+    return [[row for row in rows if any(c.strip() for c in row)] for rows in sheets]
+
+
+def test_streamed_xlsx_rows_match_a_full_load():
+    data = _workbook()
+    raw = ocr_service._extract_raw(data, "statement.xlsx")
+
+    assert raw.parse_error is None
+    assert [list(rows) for rows in raw.sheets()] == _read_workbook(data)
+
+
+def test_streamed_xlsx_transactions_match_the_whole_file_parser():
+    data = _workbook()
+    expected = ocr_service._deduplicate(
+        [t for rows in _read_workbook(data) for t in _baseline_csv_transactions(rows)],
+        lambda t: (t["date"], t["amount"], t["description"][:40]),
+    )
+
+    result = ocr_service.process_document(data, "statement.xlsx")
+
+    assert _status(result) == "parsed"
+    assert _transactions(result) == expected
+    assert [(t["date"], t["amount"]) for t in expected] == [
+        ("2024-04-01", 85000.0), ("2024-04-05", 20000.5), ("2024-04-09", 1250.0), ("2024-05-05", 20000.0),
+    ]
@@ -0,0 +1,253 @@
+import os
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from app.core.config import settings
+from app.services import pipeline
+from app.services.recovery import PipelineRecovery
+from app.services.result_store import MemoryResultStore, result_store
+from app.services.scheduler import PipelineScheduler, QueueFullError
+from app.services.upload_receiver import spill_path
+
+CSV = (
+    b"Date,Description,Debit,Credit,Balance\n"
+    b"01/04/2024,SALARY CREDIT ACME,,85000,90000\n"
+    b"05/04/2024,RENT PAYMENT,20000,,70000\n"
+)
+
+
+class FakeScheduler:
+    """Records what recovery hands over instead of running it."""
+
+    def __init__(self, capacity: bool = True, insight_capacity: bool = True, full: bool = False):
+        self.capacity = capacity
+        self.insight_capacity = insight_capacity
+        self.full = full
+        self.resumed = []
+        self.held_tasks = {}
+
+    def held(self):
+        return dict(self.held_tasks)
+
+    def has_capacity(self):
+        return self.capacity
+
+    def has_insight_capacity(self):
+        return self.insight_capacity
+
+    def resume(self, task_id, source, filename, user_id, digest=None):
+        if self.full:
+            raise QueueFullError(30)
+        self.resumed.append(("resume", task_id, source))
+
+    def resume_insights(self, task_id, filename, user_id):
+        if self.full:
+            raise QueueFullError(30)
+        self.resumed.append(("insights", task_id, None))
+
+
+def _crashed(store, task_id: str, user_id: int = 1, **fields):
+    """A record left behind by a process that died holding its lease."""
+    store.create(user_id, task_id, {
+        "task_id": task_id, "filename": "s.csv", "pipeline_stage": "queued", "checkpoint": None,
+        "lease_owner": "dead:1:x", "lease_expires": time.time() - 1, **fields,
+    })
+
+
+@pytest.fixture
+def store():
+    return MemoryResultStore(3600)
+
+
+# ── Take over ─────────────────────────────────────────────────────────────────
+
+def test_lapsed_tasks_are_taken_over_exactly_once(store):
+    for i in range(20):
+        _crashed(store, f"t{i}")
+    schedulers = [FakeScheduler(), FakeScheduler()]
+    recoveries = [PipelineRecovery(store, s, 60, 3600) for s in schedulers]
+    unfinished = store.list_unfinished()
+
+    threads = [threading.Thread(target=r._take_over, args=(unfinished,)) for r in recoveries]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    first, second = ({task_id for _, task_id, _ in s.resumed} for s in schedulers)
+    assert not first & second
+    assert first | second == {f"t{i}" for i in range(20)}
+    assert all(store.get(1, f"t{i}")["lease_owner"] == pipeline.INSTANCE_ID for i in range(20))
+
+
+def test_live_and_held_tasks_are_left_alone(store):
+    store.create(1, "live", {"task_id": "live", "pipeline_stage": "ocr",
+                             "lease_owner": "other", "lease_expires": time.time() + 60})
+    _crashed(store, "mine")
+    scheduler = FakeScheduler()
+    scheduler.held_tasks = {"mine": 1}
+
+    PipelineRecovery(store, scheduler, 60, 3600).run_once()
+
+    assert scheduler.resumed == []
+    assert store.get(1, "live")["lease_owner"] == "other"
+
+
+def test_tasks_resume_from_where_they_stopped(store):
+    spilled = spill_path("spilled", "s.csv")
+    with open(spilled, "wb") as f:
+        f.write(CSV)
+    try:
+        _crashed(store, "spilled")
+        _crashed(store, "lost")                         # in-memory upload died with its process
+        _crashed(store, "extracted", pipeline_stage="calculating", checkpoint="extracted")
+        _crashed(store, "insights", pipeline_stage="complete", checkpoint="calculated", insights_status="running")
+        scheduler = FakeScheduler()
+
+        PipelineRecovery(store, scheduler, 60, 3600).run_once()
+    finally:
+        os.remove(spilled)
+
+    assert sorted(scheduler.resumed) == [
+        ("insights", "insights", None),
+        ("resume", "extracted", None),
+        ("resume", "lost", None),
+        ("resume", "spilled", spilled),
+    ]
+
+
+def test_full_scheduler_defers_without_claiming(store):
+    _crashed(store, "queued")
+    _crashed(store, "insights", pipeline_stage="complete", checkpoint="calculated", insights_status="queued")
+    recovery = PipelineRecovery(store, FakeScheduler(capacity=False, insight_capacity=False), 60, 3600)
+
+    recovery.run_once()
+
+    assert recovery.stats()["deferred"] == 2
+    assert recovery.stats()["resumed"] == 0
+    assert store.get(1, "queued")["lease_owner"] == "dead:1:x"
+    assert store.get(1, "insights")["lease_owner"] == "dead:1:x"
+
+
+def test_scheduler_filling_up_after_the_claim_defers(store):
+    _crashed(store, "t1")
+    recovery = PipelineRecovery(store, FakeScheduler(full=True), 60, 3600)
+
+    recovery.run_once()
+
+    assert recovery.stats()["deferred"] == 1
+    assert recovery.stats()["resumed"] == 0
+    assert store.list_unfinished()[0][1]["task_id"] == "t1"
+
+
+def test_scheduler_rejects_resumes_beyond_its_limits():
+    scheduler = PipelineScheduler(queue_max=0, ocr_workers=1, llm_workers=1, llm_queue_max=0)
+    gate = threading.Event()
+    try:
+        with pytest.raises(QueueFullError):
+            scheduler.resume("t1", None, "s.csv", 1)
+        with mock.patch.object(pipeline, "resume_insight_request", return_value=object()), \
+             mock.patch.object(pipeline, "run_insight_stage", side_effect=lambda *a: gate.wait(5)):
+            scheduler.resume_insights("t2", "s.csv", 1)
+            assert not scheduler.has_insight_capacity()
+            with pytest.raises(QueueFullError):
+                scheduler.resume_insights("t3", "s.csv", 1)
+            gate.set()
+            deadline = time.time() + 5
+            while not scheduler.has_insight_capacity() and time.time() < deadline:
+                time.sleep(0.01)
+        assert scheduler.has_insight_capacity()
+    finally:
+        gate.set()
+        scheduler.shutdown()
+
+
+# ── Renew ─────────────────────────────────────────────────────────────────────
+
+def test_held_leases_are_renewed_until_lost(store):
+    store.create(1, "t1", {"task_id": "t1", "pipeline_stage": "ocr", **pipeline.lease_fields()})
+    before = store.get(1, "t1")["lease_expires"]
+    scheduler = FakeScheduler()
+    scheduler.held_tasks = {"t1": 1}
+    recovery = PipelineRecovery(store, scheduler, 60, 3600)
+
+    time.sleep(0.01)
+    recovery._renew()
+    assert store.get(1, "t1")["lease_expires"] > before
+
+    store.update(1, "t1", {"lease_owner": "someone-else"})
+    recovery._renew()
+    assert recovery.stats()["renewed"] == 1
+    assert recovery.stats()["lost"] == 1
+    assert store.get(1, "t1")["lease_owner"] == "someone-else"
+
+
+# ── Sweep ─────────────────────────────────────────────────────────────────────
+
+def test_sweep_removes_only_old_uploads_nothing_needs(store):
+    def upload(name: str, age: float) -> str:
+        path = os.path.join(settings.UPLOAD_DIR, name)
+        with open(path, "wb") as f:
+            f.write(b"x")
+        os.utime(path, (time.time() - age,) * 2)
+        return path
+
+    orphan = upload("orphan.pdf", 7200)
+    young = upload("young.pdf", 0)
+    _crashed(store, "waiting")
+    needed = spill_path("waiting", "s.csv")
+    upload(os.path.basename(needed), 7200)
+    recovery = PipelineRecovery(store, FakeScheduler(capacity=False), 60, 3600)
+    try:
+        recovery.run_once()
+
+        assert not os.path.exists(orphan)
+        assert os.path.exists(young)
+        assert os.path.exists(needed)
+        assert recovery.stats()["swept"] == 1
+    finally:
+        for path in (young, needed):
+            os.remove(path)
+
+
+# ── End to end ────────────────────────────────────────────────────────────────
+
+def _wait_done(task_id: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        record = result_store.get(1, task_id)
+        if record and record["pipeline_stage"] in ("complete", "failed") \
+                and record.get("insights_status") not in ("queued", "running"):
+            return record
+        time.sleep(0.05)
+    raise AssertionError(f"{task_id} did not finish: {result_store.get(1, task_id)}")
+
+
+def test_checkpointed_stages_are_not_run_again(database):
+    scheduler = PipelineScheduler(queue_max=10, ocr_workers=1, llm_workers=1, llm_queue_max=10)
+    try:
+        pipeline.initial_record(1, "e2e-first", "s.csv")
+        scheduler.submit("e2e-first", CSV, "s.csv", 1)
+        first = _wait_done("e2e-first")
+        assert first["pipeline_stage"] == "complete"
+
+        carried = {"extraction": first["extraction"], "document_type": first["document_type"]}
+        _crashed(result_store, "e2e-extracted", pipeline_stage="calculating", checkpoint="extracted", **carried)
+        _crashed(result_store, "e2e-calculated", pipeline_stage="analyzing", checkpoint="calculated",
+                 calculations=first["calculations"], policy_id=first.get("policy_id"), **carried)
+
+        with mock.patch.object(pipeline, "process_document", side_effect=AssertionError("OCR ran again")), \
+             mock.patch.object(pipeline, "_run_calculations", wraps=pipeline._run_calculations) as calculate:
+            PipelineRecovery(result_store, scheduler, 60, 3600).run_once()
+            resumed = {task_id: _wait_done(task_id) for task_id in ("e2e-extracted", "e2e-calculated")}
+
+        assert calculate.call_count == 1                # e2e-extracted only
+        for record in resumed.values():
+            assert record["pipeline_stage"] == "complete", record.get("error")
+            assert record["calculations"] == first["calculations"]
+            assert record["lease_owner"] == pipeline.INSTANCE_ID
+    finally:
+        scheduler.shutdown()
@@ -0,0 +1,210 @@
+import json
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, update
+
+from app.services import result_store
+from app.services.result_store import MemoryResultStore, RedisResultStore, SqlResultStore
+
+TTL = 3600
+
+
+@pytest.fixture(params=["memory", "sql", "redis"])
+def make_store(request, tmp_path):
+    """Factory for a fresh store of each backend: make_store(ttl_seconds=TTL)."""
+    def make(ttl_seconds: int = TTL):
+        if request.param == "memory":
+            return MemoryResultStore(ttl_seconds)
+        if request.param == "redis":
+            fakeredis = pytest.importorskip("fakeredis")
+            client = fakeredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+            return RedisResultStore(client, ttl_seconds=ttl_seconds)
+        engine = create_engine(f"sqlite:///{tmp_path / 'results.db'}")
+        return SqlResultStore(engine, ttl_seconds=ttl_seconds, cache_max_bytes=1 << 20, purge_interval=0)
+    return make
+
+
+@pytest.fixture
+def store(make_store):
+    return make_store()
+
+
+def test_records_are_per_user(store):
+    store.create(1, "t1", {"task_id": "t1", "pipeline_stage": "queued"})
+    store.update(1, "t1", {"pipeline_stage": "ocr", "progress": 10})
+
+    assert store.get(1, "t1") == {"task_id": "t1", "pipeline_stage": "ocr", "progress": 10}
+    assert store.get(2, "t1") is None
+    assert list(store.list_user(1)) == ["t1"]
+    assert store.list_user(2) == {}
+    assert not store.delete(2, "t1")
+    assert store.delete(1, "t1")
+    assert store.get(1, "t1") is None
+
+
+def test_update_if_applies_only_on_a_match(store):
+    store.create(1, "t1", {"task_id": "t1", "lease_owner": "a", "lease_expires": 100.0})
+
+    assert not store.update_if(1, "t1", "lease_owner", "b", {"lease_owner": "c"})
+    assert store.get(1, "t1")["lease_owner"] == "a"
+
+    assert store.update_if(1, "t1", "lease_owner", "a", {"lease_owner": "b", "lease_expires": 200.0})
+    assert store.get(1, "t1") == {"task_id": "t1", "lease_owner": "b", "lease_expires": 200.0}
+
+
+def test_update_if_treats_a_missing_field_as_none(store):
+    store.create(1, "t1", {"task_id": "t1"})
+    assert not store.update_if(1, "t1", "lease_expires", 100.0, {"lease_owner": "a"})
+    assert store.update_if(1, "t1", "lease_expires", None, {"lease_owner": "a"})
+    assert store.get(1, "t1")["lease_owner"] == "a"
+
+
+def test_update_if_never_creates_a_record(store):
+    assert not store.update_if(1, "t1", "lease_owner", None, {"lease_owner": "a"})
+    assert store.get(1, "t1") is None
+
+    store.create(1, "t1", {"task_id": "t1"})
+    assert not store.update_if(2, "t1", "lease_owner", None, {"lease_owner": "a"})
+    assert store.get(2, "t1") is None
+
+
+def test_update_if_has_exactly_one_winner(store):
+    store.create(1, "t1", {"task_id": "t1", "lease_expires": 100.0})
+    wins = []
+    start = threading.Barrier(8)
+
+    def claim(owner: str) -> None:
+        start.wait()
+        if store.update_if(1, "t1", "lease_expires", 100.0, {"lease_owner": owner, "lease_expires": 200.0}):
+            wins.append(owner)
+
+    threads = [threading.Thread(target=claim, args=(f"w{i}",)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(wins) == 1
+    assert store.get(1, "t1")["lease_owner"] == wins[0]
+
+
+def test_concurrent_updates_lose_no_fields(store):
+    store.create(1, "t1", {"task_id": "t1", "lease_owner": "me", "lease_expires": 0.0})
+    start = threading.Barrier(5)
+
+    def stage(n: int) -> None:
+        start.wait()
+        for i in range(20):
+            store.update(1, "t1", {f"field_{n}": i, "pipeline_stage": f"stage-{i}"})
+
+    def renew() -> None:
+        start.wait()
+        for i in range(1, 21):
+            assert store.update_if(1, "t1", "lease_owner", "me", {"lease_expires": float(i)})
+
+    threads = [threading.Thread(target=stage, args=(n,)) for n in range(4)] + [threading.Thread(target=renew)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    record = store.get(1, "t1")
+    assert {f"field_{n}": record[f"field_{n}"] for n in range(4)} == {f"field_{n}": 19 for n in range(4)}
+    assert record["pipeline_stage"] == "stage-19"
+    assert record["lease_expires"] == 20.0
+
+
+def test_sql_update_compares_and_writes_under_the_row_lock(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'race.db'}")
+    store = SqlResultStore(engine, ttl_seconds=TTL, cache_max_bytes=1 << 20, purge_interval=0)
+    store.create(1, "t1", {"task_id": "t1", "insights_status": "queued"})
+
+    # Another writer is mid-transaction, about to move the field on ...
+    other = engine.connect()
+    txn = other.begin()
+    other.execute(update(result_store._TASKS).values(version=result_store._TASKS.c.version + 1))
+    other.execute(update(result_store._FIELDS).where(result_store._FIELDS.c.name == "insights_status")
+                  .values(value_json=json.dumps("running"), version=2))
+    # ... when this update, which sees nothing to change in the committed record, starts
+    done = threading.Event()
+    worker = threading.Thread(target=lambda: (store.update(1, "t1", {"insights_status": "queued"}), done.set()))
+    worker.start()
+
+    time.sleep(0.2)
+    assert not done.is_set()                         # waits for the row lock instead of skipping the write
+    txn.commit()
+    other.close()
+    worker.join(10)
+
+    assert store.get(1, "t1")["insights_status"] == "queued"     # the later write wins
+
+
+def test_list_unfinished(store):
+    for task_id, fields in {
+        "queued":       {"pipeline_stage": "queued"},
+        "running":      {"pipeline_stage": "calculating"},
+        "insights":     {"pipeline_stage": "complete", "insights_status": "queued"},
+        "done":         {"pipeline_stage": "complete", "insights_status": "ready"},
+        "failed":       {"pipeline_stage": "failed"},
+    }.items():
+        store.create(7, task_id, {"task_id": task_id, **fields})
+
+    unfinished = {record["task_id"]: user_id for user_id, record in store.list_unfinished()}
+    assert unfinished == {"queued": 7, "running": 7, "insights": 7}
+
+
+def test_expired_records_are_invisible(make_store):
+    store = make_store(ttl_seconds=-1)
+    store.create(1, "t1", {"task_id": "t1", "pipeline_stage": "queued"})
+
+    assert store.get(1, "t1") is None
+    assert store.list_unfinished() == []
+    assert not store.update_if(1, "t1", "pipeline_stage", "queued", {"pipeline_stage": "ocr"})
+
+
+def test_stage_changes_are_published(store):
+    subscription = store.subscribe(1)
+    try:
+        store.create(1, "t1", {"task_id": "t1", "pipeline_stage": "queued"})
+        store.update(1, "t1", {"progress": 5})                  # not a stage change
+        store.update_if(1, "t1", "pipeline_stage", "queued", {"pipeline_stage": "ocr"})
+        stages = [subscription.get(timeout=1.0) for _ in range(2)]
+    finally:
+        subscription.close()
+
+    assert [(e["task_id"], e["pipeline_stage"]) for e in stages] == [("t1", "queued"), ("t1", "ocr")]
+
+
+def test_sql_store_creates_its_tables_and_serves_other_writers(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    first = SqlResultStore(engine, ttl_seconds=TTL, cache_max_bytes=1 << 20, purge_interval=0)
+    second = SqlResultStore(engine, ttl_seconds=TTL, cache_max_bytes=1 << 20, purge_interval=0)
+
+    first.create(1, "t1", {"task_id": "t1", "pipeline_stage": "queued"})
+    assert second.get(1, "t1")["pipeline_stage"] == "queued"        # now in second's front cache
+
+    first.update(1, "t1", {"pipeline_stage": "ocr"})
+    assert second.get(1, "t1")["pipeline_stage"] == "ocr"
+    assert second.update_if(1, "t1", "pipeline_stage", "ocr", {"pipeline_stage": "validating"})
+    assert first.get(1, "t1")["pipeline_stage"] == "validating"
+
+
+def test_redis_workers_share_records_and_events():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    first, second = (
+        RedisResultStore(fakeredis.FakeRedis(server=server, decode_responses=True), ttl_seconds=TTL)
+        for _ in range(2)
+    )
+    subscription = second.subscribe()
+    try:
+        first.create(1, "t1", {"task_id": "t1", "pipeline_stage": "queued"})
+        assert second.update_if(1, "t1", "pipeline_stage", "queued", {"pipeline_stage": "ocr"})
+        events = [subscription.get(timeout=1.0) for _ in range(2)]
+    finally:
+        subscription.close()
+
+    assert first.get(1, "t1")["pipeline_stage"] == "ocr"
+    assert [e["pipeline_stage"] for e in events] == ["queued", "ocr"]
@@ -0,0 +1,260 @@
+import os
+import threading
+import time
+from unittest import mock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services import pipeline
+from app.services.result_store import result_store
+from app.services.scheduler import PipelineScheduler, QueueFullError
+from app.services.upload_receiver import spill_path
+
+CSV = b"Date,Description,Amount\n01/04/2024,SALARY CREDIT ACME,85000\n"
+TASK = "with-insights"
+
+
+def _until(condition, timeout: float = 5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def gate():
+    """Released at teardown, so blocked workers always exit."""
+    gate = threading.Event()
+    yield gate
+    gate.set()
+
+
+@pytest.fixture
+def blocked(gate):
+    """A one-worker scheduler whose OCR stages wait on `gate`; task ids in the order they ran."""
+    ran = []
+
+    def stages(source, filename, user_id, task_id, db, digest, queued_at):
+        ran.append(task_id)
+        gate.wait(5)
+        return None
+
+    scheduler = PipelineScheduler(queue_max=2, ocr_workers=1, llm_workers=1, llm_queue_max=0)
+    with mock.patch.object(pipeline, "run_processing_stages", side_effect=stages):
+        scheduler.submit("running", CSV, "s.csv", 1)
+        _until(lambda: ran == ["running"])
+        yield scheduler, ran
+        gate.set()
+        scheduler.shutdown()
+
+
+# ── Backpressure ──────────────────────────────────────────────────────────────
+
+def test_a_full_queue_rejects_submits(blocked):
+    scheduler, _ = blocked
+
+    assert scheduler.submit("b", CSV, "s.csv", 1) == 1
+    assert scheduler.submit("c", CSV, "s.csv", 1) == 2
+    assert not scheduler.has_capacity()
+    with pytest.raises(QueueFullError) as full:
+        scheduler.submit("d", CSV, "s.csv", 1)
+
+    assert full.value.retry_after == settings.PIPELINE_RETRY_AFTER_SECONDS   # nothing timed yet
+    assert scheduler.stats()["rejected"] == 1
+    assert "d" not in scheduler.held()
+
+
+def test_queue_positions_follow_submission_order(blocked, gate):
+    scheduler, ran = blocked
+    scheduler.submit("b", CSV, "s.csv", 1)
+    scheduler.submit("c", CSV, "s.csv", 1)
+
+    assert [scheduler.position(t) for t in ("running", "b", "c")] == [None, 1, 2]
+    assert set(scheduler.held()) == {"running", "b", "c"}
+
+    gate.set()
+    _until(lambda: not scheduler.held())
+    assert ran == ["running", "b", "c"]
+    assert scheduler.position("c") is None
+
+
+def test_retry_after_scales_with_queue_depth_and_stage_time():
+    scheduler = PipelineScheduler(queue_max=10, ocr_workers=2, llm_workers=1, llm_queue_max=0)
+    scheduler._queue.extend([object()] * 4)
+    assert scheduler.retry_after() == settings.PIPELINE_RETRY_AFTER_SECONDS
+
+    scheduler._finished_ocr(10.0)
+    assert scheduler.retry_after() == 20                # 4 waiting × 10 s / 2 workers
+    scheduler._finished_ocr(0.0)
+    assert scheduler.retry_after() == 16                # running average: 10 + 0.2 × (0 − 10)
+    scheduler._finished_ocr(10_000.0)
+    assert scheduler.retry_after() == 600               # capped
+
+
+def test_ocr_workers_wait_for_an_insights_slot(gate):
+    insights = []
+
+    def insight_stage(user_id, task_id, request):
+        insights.append(task_id)
+        gate.wait(5)
+
+    scheduler = PipelineScheduler(queue_max=5, ocr_workers=1, llm_workers=1, llm_queue_max=0)
+    try:
+        with mock.patch.object(pipeline, "run_processing_stages", return_value=object()), \
+             mock.patch.object(pipeline, "run_insight_stage", side_effect=insight_stage):
+            scheduler.submit("a", CSV, "s.csv", 1)
+            _until(lambda: insights == ["a"])
+            assert not scheduler.has_insight_capacity()
+
+            scheduler.submit("b", CSV, "s.csv", 1)          # its OCR finishes, then waits for a slot
+            _until(lambda: scheduler.position("b") is None)
+            scheduler.submit("c", CSV, "s.csv", 1)
+            time.sleep(0.2)
+            assert scheduler.position("c") == 1             # the only OCR worker is held up
+            assert insights == ["a"]
+
+            gate.set()
+            _until(lambda: not scheduler.held())
+        assert insights == ["a", "b", "c"]
+        assert scheduler.has_insight_capacity()
+    finally:
+        scheduler.shutdown()
+
+
+# ── Insights follow-up ────────────────────────────────────────────────────────
+
+@pytest.fixture
+def ollama(gate, monkeypatch):
+    """Stands in for Ollama: records each call with the task's record as it stood, then waits on `gate`."""
+    calls = []
+
+    def generate_financial_insights(**request):
+        calls.append((dict(result_store.get(1, TASK)), request))
+        gate.wait(5)
+        return {"status": "complete", "summary": "Rent receipts would unlock HRA."}
+
+    monkeypatch.setattr(pipeline, "generate_financial_insights", generate_financial_insights)
+    return calls
+
+
+def test_insights_run_after_the_task_is_complete_and_land_on_its_record(database, gate, ollama):
+    scheduler = PipelineScheduler(queue_max=5, ocr_workers=1, llm_workers=1, llm_queue_max=0)
+    pipeline.initial_record(1, TASK, "s.csv")
+    try:
+        scheduler.submit(TASK, CSV, "s.csv", 1)
+        _until(lambda: ollama)
+        seen, request = ollama[0]
+        assert seen["pipeline_stage"] == pipeline.STAGE_COMPLETE and seen["completed_at"]
+        assert seen["insights_status"] == pipeline.INSIGHTS_RUNNING and seen.get("ollama") is None
+        assert request["calculations"] == seen["calculations"]
+        assert result_store.get(1, TASK)["pipeline_stage"] == pipeline.STAGE_COMPLETE
+
+        gate.set()
+        _until(lambda: not scheduler.held())
+    finally:
+        scheduler.shutdown()
+
+    record = result_store.get(1, TASK)
+    assert record["ollama"] == {"status": "complete", "summary": "Rent receipts would unlock HRA."}
+    assert record["insights_status"] == "complete" and record["insights_completed_at"]
+    assert {k: record[k] for k in ("pipeline_stage", "completed_at", "calculations", "analysis")} == \
+           {k: seen[k] for k in ("pipeline_stage", "completed_at", "calculations", "analysis")}
+    assert {"calculating", "analyzing", "insights"} <= set(record["stage_timings"])
+
+
+def test_resumed_insights_are_rebuilt_from_the_complete_record(database, gate, ollama):
+    from app.db.session import SessionLocal
+
+    pipeline.initial_record(1, TASK, "s.csv")
+    db = SessionLocal()
+    try:
+        assert pipeline.run_processing_stages(CSV, "s.csv", 1, TASK, db) is not None
+    finally:
+        db.close()
+    complete = result_store.get(1, TASK)                 # the job was lost here
+    assert complete["insights_status"] == pipeline.INSIGHTS_QUEUED and ollama == []
+
+    gate.set()
+    scheduler = PipelineScheduler(queue_max=5, ocr_workers=1, llm_workers=1, llm_queue_max=0)
+    try:
+        scheduler.resume_insights(TASK, "s.csv", 1)
+        _until(lambda: not scheduler.held())
+    finally:
+        scheduler.shutdown()
+
+    (seen, request), = ollama
+    assert seen["pipeline_stage"] == pipeline.STAGE_COMPLETE
+    assert request["calculations"] == complete["calculations"]
+    assert request["document_types"] == [complete["document_type"]]
+    record = result_store.get(1, TASK)
+    assert record["ollama"]["summary"] == "Rent receipts would unlock HRA."
+    assert record["insights_status"] == "complete"
+    assert record["completed_at"] == complete["completed_at"]
+
+
+# ── Shutdown ──────────────────────────────────────────────────────────────────
+
+def test_shutdown_keeps_queued_uploads_for_recovery(blocked, monkeypatch):
+    scheduler, _ = blocked
+    monkeypatch.setattr(settings, "PIPELINE_RECOVERY_ENABLED", True)
+    on_disk = spill_path("on-disk", "s.csv")
+    with open(on_disk, "wb") as f:
+        f.write(CSV)
+    scheduler.submit("in-memory", memoryview(CSV), "s.csv", 1)
+    scheduler.submit("on-disk", on_disk, "s.csv", 1)
+
+    scheduler.shutdown(wait=False)
+    try:
+        with open(spill_path("in-memory", "s.csv"), "rb") as f:
+            assert f.read() == CSV
+        assert os.path.exists(on_disk)
+        with pytest.raises(RuntimeError):
+            scheduler.submit("late", CSV, "s.csv", 1)
+    finally:
+        for path in (spill_path("in-memory", "s.csv"), on_disk):
+            os.remove(path)
+
+
+def test_shutdown_without_recovery_drops_queued_uploads(blocked, monkeypatch):
+    scheduler, _ = blocked
+    monkeypatch.setattr(settings, "PIPELINE_RECOVERY_ENABLED", False)
+    on_disk = spill_path("on-disk", "s.csv")
+    with open(on_disk, "wb") as f:
+        f.write(CSV)
+    scheduler.submit("in-memory", CSV, "s.csv", 1)
+    scheduler.submit("on-disk", on_disk, "s.csv", 1)
+
+    scheduler.shutdown(wait=False)
+
+    assert not os.path.exists(on_disk)
+    assert not os.path.exists(spill_path("in-memory", "s.csv"))
+
+
+# ── Upload endpoint ───────────────────────────────────────────────────────────
+
+def test_a_full_scheduler_answers_503_before_reading_the_upload(blocked, monkeypatch):
+    from app.api import documents
+    from app.main import app
+
+    scheduler, _ = blocked
+    scheduler.submit("b", CSV, "s.csv", 1)
+    scheduler.submit("c", CSV, "s.csv", 1)
+    scheduler._finished_ocr(7.0)
+    monkeypatch.setattr(documents, "pipeline_scheduler", scheduler)
+    received = []
+    monkeypatch.setattr(documents, "receive_upload", lambda *args: received.append(args))
+
+    with TestClient(app) as client:
+        client.post("/api/auth/register", json={"email": "busy@b.co", "password": "Passw0rd!x", "full_name": "A"})
+        token = client.post("/api/auth/login", data={"username": "busy@b.co", "password": "Passw0rd!x"}).json()
+        response = client.post(
+            "/api/documents/upload", files={"file": ("s.csv", CSV, "text/csv")},
+            headers={"Authorization": f"Bearer {token['access_token']}"},
+        )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "14"      # 2 waiting × 7 s / 1 worker
+    assert received == []
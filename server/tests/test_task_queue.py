@@ -0,0 +1,138 @@
+import os
+
+import pytest
+
+pytest.importorskip("celery")
+
+from app.core.config import settings  # noqa: E402
+from app.services import pipeline, task_queue  # noqa: E402
+from app.services.result_store import result_store  # noqa: E402
+from app.services.scheduler import QueueFullError  # noqa: E402
+from app.services.task_queue import CeleryPipelineExecutor, celery_app  # noqa: E402
+from app.services.upload_receiver import spill_path  # noqa: E402
+
+CSV = (
+    b"Date,Description,Debit,Credit,Balance\n"
+    b"01/04/2024,SALARY CREDIT ACME,,85000,90000\n"
+    b"05/04/2024,RENT PAYMENT,20000,,70000\n"
+)
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    """The in-process memory:// transport in place of the configured broker; yields the ocr queue."""
+    monkeypatch.setattr(celery_app.conf, "broker_url", "memory://")
+    monkeypatch.setattr(task_queue, "_DEPTH_TTL", 0.0)
+    with celery_app.connection_for_read() as conn:
+        queue = conn.SimpleQueue(task_queue.QUEUE_OCR)
+        queue.clear()
+        yield queue
+        queue.clear()
+        queue.close()
+
+
+def _sent(queue):
+    message = queue.get(timeout=1)
+    message.ack()
+    return message.headers["task"], message.payload[0]
+
+
+# ── Executor ──────────────────────────────────────────────────────────────────
+
+def test_uploads_are_sent_by_path_never_inline(broker):
+    executor = CeleryPipelineExecutor()
+    on_disk = spill_path("large", "s.csv")
+    with open(on_disk, "wb") as f:
+        f.write(CSV)
+    try:
+        executor.submit("small", memoryview(CSV), "s.csv", 1, "digest-1")
+        executor.submit("large", on_disk, "s.csv", 1, "digest-2")
+
+        name, (task_id, user_id, filename, path, digest, _) = _sent(broker)
+        assert (name, task_id, digest) == ("taxmate.pipeline.ocr", "small", "digest-1")
+        assert path == spill_path("small", "s.csv")
+        with open(path, "rb") as f:
+            assert f.read() == CSV
+        assert _sent(broker)[1][3:5] == [on_disk, "digest-2"]
+    finally:
+        for path in (spill_path("small", "s.csv"), on_disk):
+            os.remove(path)
+
+
+def test_capacity_is_bounded_by_the_broker_queue(broker, monkeypatch):
+    monkeypatch.setattr(settings, "PIPELINE_QUEUE_MAX", 2)
+    executor = CeleryPipelineExecutor()
+    try:
+        assert executor.has_capacity()
+        executor.submit("a", CSV, "s.csv", 1)
+        assert executor.has_capacity()
+        executor.submit("b", CSV, "s.csv", 1)
+        assert not executor.has_capacity()
+        assert executor.stats()["ocr_depth"] == 2
+
+        _sent(broker)                                   # a worker picks one up
+        assert executor.has_capacity()
+    finally:
+        for task_id in ("a", "b"):
+            os.remove(spill_path(task_id, "s.csv"))
+
+
+def test_an_unreachable_broker_is_a_full_queue(broker, monkeypatch):
+    def unreachable(*args, **kwargs):
+        raise ConnectionError("broker down")
+
+    executor = CeleryPipelineExecutor()
+    monkeypatch.setattr(task_queue.ocr_stage, "delay", unreachable)
+    monkeypatch.setattr(celery_app, "connection_for_read", unreachable)
+
+    with pytest.raises(QueueFullError) as full:
+        executor.submit("t1", CSV, "s.csv", 1)
+
+    assert full.value.retry_after == settings.PIPELINE_RETRY_AFTER_SECONDS
+    assert not os.path.exists(spill_path("t1", "s.csv"))        # the spilled copy is removed
+    assert not executor.has_capacity()
+    assert executor.stats()["rejected"] == 1
+
+
+# ── Fail-safe ─────────────────────────────────────────────────────────────────
+
+def test_a_crashed_stage_fails_the_pipeline():
+    pipeline.initial_record(1, "crashed", "s.csv")
+
+    with task_queue._failsafe(1, "crashed"):
+        raise ValueError("boom")
+
+    record = result_store.get(1, "crashed")
+    assert record["pipeline_stage"] == pipeline.STAGE_FAILED
+    assert record["error"] == "Pipeline crashed: boom"
+
+
+def test_a_crashed_insights_task_fails_only_the_insights():
+    pipeline.initial_record(1, "insights-crashed", "s.csv")
+    result_store.update(1, "insights-crashed", {"pipeline_stage": pipeline.STAGE_COMPLETE})
+
+    with task_queue._failsafe(1, "insights-crashed", insights=True):
+        raise ValueError("boom")
+
+    record = result_store.get(1, "insights-crashed")
+    assert record["pipeline_stage"] == pipeline.STAGE_COMPLETE
+    assert record["insights_status"] == pipeline.INSIGHTS_FAILED
+    assert record["insights_error"] == "Insights crashed: boom"
+
+
+# ── Eager mode ────────────────────────────────────────────────────────────────
+
+def test_eager_mode_runs_every_stage_in_the_caller(database, monkeypatch):
+    monkeypatch.setattr(settings, "CELERY_TASK_ALWAYS_EAGER", True)
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", True)
+    executor = CeleryPipelineExecutor()
+    pipeline.initial_record(1, "eager", "s.csv")
+
+    assert executor.has_capacity()
+    assert executor.submit("eager", CSV, "s.csv", 1) is None
+
+    record = result_store.get(1, "eager")
+    assert record["pipeline_stage"] == pipeline.STAGE_COMPLETE, record.get("error")
+    assert record["calculations"]
+    assert record["insights_status"] not in ("queued", "running")
+    assert not os.path.exists(spill_path("eager", "s.csv"))      # deleted once extracted